@@ -0,0 +1,288 @@
+# 性能の回帰チェック（ベンチマーク）
+#
+# ぷよぷよの盤面処理（check_matches / find_connected_puyos / fall_puyos / handle_floating_puyos / 連鎖の解決）を
+# 用意した盤面（空・半分・16連鎖の全消し）で、ブロック崩しの衝突判定とパーティクル更新を個数を変えて計り、
+# 1秒あたりの回数を出す。状態を書き換える処理は毎回用意した状態から始め、準備の時間は計らない。
+# --save で結果を基準値（JSON）に保存し、次からはそれと比べて --threshold より遅くなったケースがあれば終了コード 1 で終わる。
+# 基準値はマシンごとに取り直すこと（CPU が違うと比べても意味がない）。
+#
+# 使い方:
+#   python -m benchmark --save             # benchmark_baseline.json に基準値を保存
+#   python -m benchmark --threshold 0.1    # 基準値より 10% 以上遅くなったら失敗
+#   python -m benchmark -k brick           # 名前に brick を含むケースだけ
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+
+from brick_effects import ParticleSystem
+from brick_logic import WIDTH, HEIGHT, BALL_RADIUS, MAX_SPEED, MIN_SPEED_Y, BrickGameLogic
+from puyo_engine import BitBoard, resolve_chain, GRID_WIDTH, GRID_HEIGHT, EMPTY
+from puyo_logic import Puyo, PuyoGameLogic, PUYO_COLORS
+
+BASELINE_PATH = "benchmark_baseline.json"
+THRESHOLD = 0.2   # 基準値よりこの割合以上遅くなったら失敗（ばらつきを見込んで少し緩め）
+MIN_TIME = 0.1    # 1回の計測でこの秒数ぶんは回す
+REPEAT = 5        # 計測を繰り返して一番速かった回を採る（timeit と同じ考え方）
+BATCH = 64        # 状態を書き換えないケースで、時計を読まずに続けて回す数
+
+BALL_COUNTS = (1, 16, 64, 256)         # 衝突判定を計るボールの数（32 個以下は Python のループ側）
+PARTICLE_COUNTS = (100, 1000, 10000)   # 更新を計るパーティクルの数
+
+# 盤面（上の行から、0 は空、1〜4 は色番号）
+EMPTY_ROWS = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+
+# 下半分が埋まっていて、4つつながったところのない盤面
+HALF_ROWS = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT // 2)] + [
+    [1, 1, 2, 3, 3, 4],
+    [2, 2, 3, 4, 4, 1],
+    [1, 3, 3, 4, 1, 1],
+    [2, 4, 4, 1, 2, 2],
+    [2, 3, 1, 1, 2, 3],
+    [3, 3, 4, 2, 4, 4],
+]
+
+# HALF_ROWS の下の方に穴をあけて、上のぷよが浮いている盤面（どの列も1〜3段落ちる）
+HOLED_ROWS = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT // 2)] + [
+    [1, 1, 2, 3, 3, 4],
+    [2, 0, 3, 0, 4, 1],
+    [0, 3, 0, 4, 0, 1],
+    [2, 0, 4, 0, 2, 0],
+    [0, 3, 0, 1, 0, 3],
+    [3, 3, 4, 2, 4, 4],
+]
+
+# 16連鎖で全消しになる盤面（6x12 に入るのは 72 個までなので、19連鎖（76 個）は置けない）
+CHAIN_ROWS = [
+    [1, 0, 0, 0, 0, 2],
+    [4, 0, 0, 1, 0, 4],
+    [3, 2, 1, 4, 0, 4],
+    [3, 4, 3, 4, 2, 3],
+    [3, 4, 1, 4, 4, 3],
+    [4, 3, 4, 1, 2, 2],
+    [3, 3, 2, 3, 1, 2],
+    [4, 1, 4, 4, 1, 3],
+    [4, 1, 3, 2, 1, 3],
+    [4, 2, 2, 1, 3, 4],
+    [1, 2, 4, 4, 2, 4],
+    [2, 3, 2, 3, 2, 2],
+]
+
+
+def popped_rows(rows):
+    # 最初に消えるグループを消しただけの（まだ落ちていない）盤面
+    board = BitBoard.from_rows(rows)
+    board.pop_groups(board.check_matches())
+    return board.to_rows()
+
+
+BOARDS = {
+    "empty": EMPTY_ROWS,
+    "half": HALF_ROWS,
+    "chain": CHAIN_ROWS,
+}
+
+# fall_puyos / handle_floating_puyos 用の盤面（settled は落ちるぷよのない盤面で、列を調べるだけの速さを見る）
+FLOATING_BOARDS = {
+    "settled": HALF_ROWS,
+    "half_holes": HOLED_ROWS,
+    "chain_popped": popped_rows(CHAIN_ROWS),
+}
+
+
+# ベンチマーク1件分
+# run(state) を計る。setup() が状態を作る（mutates が False なら1回だけ作って使い回す）
+# setup() は同じオブジェクトを作り直して返すことがあるので、状態を書き換えるケースは1回ずつ準備して計る
+class Case:
+    def __init__(self, name, setup, run, mutates=True):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.mutates = mutates
+
+    def measure(self, min_time=MIN_TIME, repeat=REPEAT):
+        # 1秒あたりの回数（repeat 回計って一番速かったもの）
+        best = 0.0
+        state = None if self.mutates else self.setup()
+        for _ in range(repeat):
+            total = 0.0
+            calls = 0
+            run = self.run
+            while total < min_time:
+                if self.mutates:
+                    state = self.setup()
+                    start = time.perf_counter()
+                    run(state)
+                    total += time.perf_counter() - start
+                    calls += 1
+                else:
+                    start = time.perf_counter()
+                    for _ in range(BATCH):
+                        run(state)
+                    total += time.perf_counter() - start
+                    calls += BATCH
+            best = max(best, calls / total)
+        return best
+
+
+# ---- ぷよぷよ ----
+
+_puyo_logic = PuyoGameLogic(0)
+
+
+def puyo_setup(rows):
+    # 盤面の Puyo を作り直して PuyoGameLogic に読み込む関数を返す
+    def setup():
+        logic = _puyo_logic
+        logic.grid = [[None if color == EMPTY else Puyo(x, y, PUYO_COLORS[color - 1]) for x, color in enumerate(row)]
+                      for y, row in enumerate(rows)]
+        logic.chain_count = 0
+        logic.puyo_pop_state.clear()
+        logic.pop_effects.clear()
+        return logic
+    return setup
+
+
+def resolve_logic_chain(logic):
+    # 表示側と同じ手順で連鎖を最後まで進める（アニメーション待ちなし）
+    while logic.check_matches():
+        logic.fall_puyos()
+
+
+def puyo_cases():
+    cases = []
+    for name, rows in BOARDS.items():
+        # 消えるグループがあると盤面が変わる
+        mutates = bool(BitBoard.from_rows(rows).check_matches())
+        cases.append(Case(f"puyo.check_matches.{name}", puyo_setup(rows), lambda logic: logic.check_matches(), mutates))
+    for name in ("half", "chain"):
+        x, y = 0, GRID_HEIGHT - 1
+        color = PUYO_COLORS[BOARDS[name][y][x] - 1]
+        cases.append(Case(f"puyo.find_connected_puyos.{name}", puyo_setup(BOARDS[name]),
+                          lambda logic, color=color: logic.find_connected_puyos(x, y, color), False))
+    for name, rows in FLOATING_BOARDS.items():
+        cases.append(Case(f"puyo.fall_puyos.{name}", puyo_setup(rows), lambda logic: logic.fall_puyos()))
+        cases.append(Case(f"puyo.handle_floating_puyos.{name}", puyo_setup(rows),
+                          lambda logic: logic.handle_floating_puyos()))
+    for name in ("half", "chain"):
+        rows = BOARDS[name]
+        cases.append(Case(f"puyo.resolve_chain.logic.{name}", puyo_setup(rows), resolve_logic_chain))
+        board = BitBoard.from_rows(rows)
+        # ヘッドレスエンジンの連鎖計算は引数の盤面を変えない
+        cases.append(Case(f"puyo.resolve_chain.engine.{name}", lambda board=board: board, resolve_chain, False))
+    return cases
+
+
+# ---- ブロック崩し ----
+
+def collision_case(count):
+    # count 個のボールを画面中にばらまいた状態から1フレーム進める
+    rng = np.random.default_rng(count)
+    logic = BrickGameLogic(0)
+    balls = logic.balls
+    pos = np.column_stack((rng.uniform(BALL_RADIUS, WIDTH - BALL_RADIUS, count),
+                           rng.uniform(BALL_RADIUS, HEIGHT - 80, count)))
+    angle = rng.uniform(0, 2 * np.pi, count)
+    vel = np.column_stack((np.cos(angle), np.sin(angle))) * MAX_SPEED
+    paddle = logic.paddle_rect()
+
+    def setup():
+        balls.pos[:count] = pos
+        balls.vel[:count] = vel
+        balls.count = count
+        logic.bricks.reset()
+        return logic
+
+    def run(logic):
+        logic.balls.step(logic.bricks, paddle, WIDTH, HEIGHT, MAX_SPEED, 1.0, MIN_SPEED_Y)
+
+    return Case(f"brick.collision.{count}", setup, run)
+
+
+def particle_case(count):
+    # count 個のパーティクルを1フレーム進める（寿命切れの詰め直しも含む）
+    rng = np.random.default_rng(count)
+    particles = ParticleSystem(count, rng)
+    pos = rng.uniform(0, WIDTH, (count, 2)).astype(np.float32)
+    vel = rng.integers(-3, 4, (count, 2)).astype(np.float32)
+    life = rng.integers(1, 41, count).astype(np.int32)
+
+    def setup():
+        particles.pos[:count] = pos
+        particles.vel[:count] = vel
+        particles.life[:count] = life
+        particles.count = count
+        return particles
+
+    return Case(f"brick.particles.{count}", setup, ParticleSystem.update)
+
+
+def brick_cases():
+    return [collision_case(n) for n in BALL_COUNTS] + [particle_case(n) for n in PARTICLE_COUNTS]
+
+
+def all_cases():
+    return puyo_cases() + brick_cases()
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path, results):
+    data = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ぷよぷよとブロック崩しの処理速度の回帰チェック")
+    parser.add_argument("-k", "--filter", default="", help="名前にこの文字列を含むケースだけ計る")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基準値の JSON ファイル")
+    parser.add_argument("--save", action="store_true", help="結果を基準値として保存する（比較はしない）")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="基準値からこの割合以上遅くなったら失敗（0.2 なら 20%%）")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="1回の計測で回す秒数")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="計測の繰り返し回数")
+    args = parser.parse_args(argv)
+
+    baseline = {} if args.save else load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    for case in all_cases():
+        if args.filter not in case.name:
+            continue
+        rate = case.measure(args.min_time, args.repeat)
+        results[case.name] = rate
+        line = f"{case.name:<42}{rate:>12.0f} /s  {1e6 / rate:>9.2f} us"
+        base = baseline.get(case.name)
+        if base:
+            change = rate / base - 1.0
+            line += f"  {change:+7.1%}"
+            if change < -args.threshold:
+                line += "  REGRESSION"
+                regressions.append(case.name)
+        print(line, flush=True)
+
+    if args.save:
+        # -k で一部だけ計ったときは、残りのケースの基準値はそのまま残す
+        save_baseline(args.baseline, {**load_baseline(args.baseline), **results})
+        print(f"saved baseline: {args.baseline}")
+        return 0
+    if not baseline:
+        print(f"no baseline at {args.baseline} (run with --save first)")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,84 +1,66 @@
 import pygame
-import random
 import sys
+import numpy as np
+from brick_logic import (BrickGameLogic, predict_paddle_x, WIDTH, HEIGHT, BALL_RADIUS,
+                         PADDLE_WIDTH, PADDLE_HEIGHT, PADDLE_Y, POWERUP_SIZE)
+from brick_effects import ParticleSystem
+from frame_profiler import FrameProfiler
 
 pygame.init()
 
-# 画面サイズ・ゲーム設定
-WIDTH, HEIGHT = 800, 600
+# 画面設定（盤面の大きさなどゲームの設定は brick_logic.py）
 FPS = 60
-BRICK_ROWS = 5
-BRICK_COLUMNS = 10
-BRICK_WIDTH = 70
-BRICK_HEIGHT = 20
-PADDLE_WIDTH = 100
-PADDLE_HEIGHT = 15
-BALL_RADIUS = 10
 
 WHITE   = (255, 255, 255)
 BLACK   = (0,   0,   0)
 RED     = (255, 0,   0)
 BLUE    = (0,   0,   255)
 YELLOW  = (255, 255, 0)
+GREEN   = (0,   255, 0)
+
+PARTICLE_RADIUS = 3
 
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("Brick Breaker Auto Clear - Avoid Vertical Loop")
 clock = pygame.time.Clock()
 
-# パドル
-paddle = pygame.Rect((WIDTH - PADDLE_WIDTH)//2, HEIGHT-40, PADDLE_WIDTH, PADDLE_HEIGHT)
-
-# ボール
-ball = pygame.Rect(WIDTH//2, HEIGHT//2, BALL_RADIUS*2, BALL_RADIUS*2)
-ball_vel = [4, -4]
-
-# ブロック配置
-brick_padding = 5
-offset_top = 50
-offset_left = (WIDTH - (BRICK_COLUMNS * (BRICK_WIDTH + brick_padding))) // 2
-
-def create_bricks():
-    bricks_local = []
-    for row in range(BRICK_ROWS):
-        row_list = []
-        for col in range(BRICK_COLUMNS):
-            x = offset_left + col*(BRICK_WIDTH+brick_padding)
-            y = offset_top  + row*(BRICK_HEIGHT+brick_padding)
-            row_list.append(pygame.Rect(x, y, BRICK_WIDTH, BRICK_HEIGHT))
-        bricks_local.append(row_list)
-    return bricks_local
-
-bricks = create_bricks()
-
-# スコア
-score = 0
+# フレーム時間の計測（衝突判定は BrickGameLogic の中で個別にも計る。F3 で表示切り替え）
+profiler = FrameProfiler.from_env()
+
+# ゲームの状態（パドル・ボール・ブロック・得点）は BrickGameLogic が持ち、ここでは描画と演出だけを行う
+game = BrickGameLogic(profiler=profiler)
+show_profile = False
+
+ball_sprite = pygame.Surface((BALL_RADIUS*2, BALL_RADIUS*2))
+ball_sprite.set_colorkey(BLACK)
+pygame.draw.ellipse(ball_sprite, YELLOW, ball_sprite.get_rect())
+
+def draw_balls(screen):
+    balls = game.balls
+    corners = (balls.pos[:len(balls)] - BALL_RADIUS).astype(np.int32).tolist()
+    screen.blits([(ball_sprite, corner) for corner in corners], doreturn=False)
+
 pygame.font.init()
 font = pygame.font.SysFont('Arial', 24)
+profile_font = pygame.font.SysFont('Courier', 14)
+
+# パーティクル（動きは brick_effects.ParticleSystem、ここでは1個分の点を先に描いておき、まとめて blits する）
+particle_sprite = pygame.Surface((PARTICLE_RADIUS * 2 + 1, PARTICLE_RADIUS * 2 + 1))
+particle_sprite.set_colorkey(BLACK)
+pygame.draw.circle(particle_sprite, YELLOW, (PARTICLE_RADIUS, PARTICLE_RADIUS), PARTICLE_RADIUS)
+
+particles = ParticleSystem()
 
-# パーティクル管理
-particles = []
 def create_particles(x, y):
-    for _ in range(20):
-        particles.append([
-            x,                   # x座標
-            y,                   # y座標
-            random.randint(-3,3),# x方向速度
-            random.randint(-3,3),# y方向速度
-            random.randint(20,40)# 寿命
-        ])
+    particles.emit(x, y)
 
 def update_particles():
-    for p in particles[:]:
-        p[0] += p[2]
-        p[1] += p[3]
-        p[4] -= 1
-        if p[4] <= 0:
-            particles.remove(p)
+    particles.update()
 
 def draw_particles(screen):
-    for p in particles:
-        px, py, vx, vy, life = p
-        pygame.draw.circle(screen, YELLOW, (int(px), int(py)), 3)
+    offset = particle_sprite.get_width() // 2
+    corners = (particles.pos[:len(particles)].astype(np.int32) - offset).tolist()
+    screen.blits([(particle_sprite, corner) for corner in corners], doreturn=False)
 
 # 壊れたブロックのフェードアウト演出
 broken_bricks = []
@@ -102,131 +84,76 @@ def draw_broken_bricks(screen):
         surf.fill((255, 0, 0, alpha))  # RGBA
         screen.blit(surf, (rx, ry))
 
-def reset_bricks():
-    global bricks
-    bricks = create_bricks()
+def draw_powerups(screen):
+    # パワーアップ（取るとボールが分裂する）
+    for x, y in game.powerups:
+        pygame.draw.circle(screen, GREEN, (int(x), int(y)), POWERUP_SIZE//2)
 
 running = True
 
 while running:
     clock.tick(FPS)
+    profiler.tick()
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+    with profiler.scope("input"):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                show_profile = not show_profile
 
     # -----------------------------------------
-    # パドルをボールの真下に合わせる（自動操作）
+    # 1フレーム進める（パドルはボールの落ちてくる位置へ先回りする自動操作）
     # -----------------------------------------
-    paddle.x = ball.centerx - PADDLE_WIDTH//2
-    # 画面端をはみ出さないように補正
-    if paddle.x < 0:
-        paddle.x = 0
-    if paddle.x + PADDLE_WIDTH > WIDTH:
-        paddle.x = WIDTH - PADDLE_WIDTH
+    with profiler.scope("logic"):
+        game.step(predict_paddle_x(game))
 
-    # -----------------------------------------
-    # ボールの移動
-    # -----------------------------------------
-    ball.x += ball_vel[0]
-    ball.y += ball_vel[1]
-
-    # 壁との衝突判定 (左右)
-    if ball.left < 0:
-        ball.left = 0
-        ball_vel[0] = -ball_vel[0]
-    elif ball.right > WIDTH:
-        ball.right = WIDTH
-        ball_vel[0] = -ball_vel[0]
-
-    # 壁との衝突判定 (上)
-    if ball.top < 0:
-        ball.top = 0
-        ball_vel[1] = -ball_vel[1]
-
-    # 画面下まで落ちたら終了
-    if ball.bottom > HEIGHT:
+    # 全部のボールが画面下まで落ちたら終了
+    if game.game_over:
         running = False
 
-    # 壁衝突後に横速度が 0 に近ければ微調整（真上・真下防止）
-    if abs(ball_vel[0]) < 0.1:
-        ball_vel[0] = random.choice([-1, 1])
-
-    # -----------------------------------------
-    # パドルとの衝突：衝突位置で角度を変える
-    # -----------------------------------------
-    if ball.colliderect(paddle) and ball_vel[1] > 0:
-        # パドル中心を基準に (-1.0 ~ +1.0)
-        relative_x = (ball.centerx - paddle.centerx) / (PADDLE_WIDTH / 2)
-        max_speed = 6
-        ball_vel[0] = relative_x * max_speed
-        ball_vel[1] = -abs(ball_vel[1])  # 上向きに反転
-
-        # 衝突後、横速度が小さ過ぎる場合はランダムにずらす
-        if abs(ball_vel[0]) < 0.3:
-            ball_vel[0] = random.choice([-1.5, 1.5])
+    with profiler.scope("effects"):
+        bricks = game.bricks
+        for row, col in zip(*(index.tolist() for index in game.broken)):
+            brick = pygame.Rect(bricks.cell_rect(row, col))
+            # パーティクル＆演出
+            create_particles(brick.centerx, brick.centery)
+            create_broken_brick_effect(brick)
 
-    # -----------------------------------------
-    # ブロックとの衝突
-    # -----------------------------------------
-    hit_brick = False
-    for row in bricks:
-        for brick in row:
-            if ball.colliderect(brick):
-                # どの方向から衝突したか
-                dx = ball.centerx - brick.centerx
-                dy = ball.centery - brick.centery
-                if abs(dx) > abs(dy):
-                    ball_vel[0] = -ball_vel[0]
-                else:
-                    ball_vel[1] = -ball_vel[1]
-
-                # パーティクル＆演出
-                create_particles(brick.centerx, brick.centery)
-                create_broken_brick_effect(brick)
-                row.remove(brick)
-                score += 100
-                hit_brick = True
-                break
-        if hit_brick:
-            break
-
-    # 衝突後にまた速度チェック（真上/真横防止）
-    if abs(ball_vel[0]) < 0.1:
-        ball_vel[0] = random.choice([-1, 1])
-
-    # 全ブロック破壊したら再配置
-    if all(len(row) == 0 for row in bricks):
-        score += 1000
-        reset_bricks()
-
-    # パーティクル・壊れブロック演出更新
-    update_particles()
-    update_broken_bricks()
+        # パーティクル・壊れブロック演出更新
+        update_particles()
+        update_broken_bricks()
 
     # -----------------------------------------
     # 描画
     # -----------------------------------------
-    screen.fill(BLACK)
+    with profiler.scope("render"):
+        screen.fill(BLACK)
+
+        # パドルとボール
+        paddle = pygame.Rect(int(game.paddle_x), PADDLE_Y, PADDLE_WIDTH, PADDLE_HEIGHT)
+        pygame.draw.rect(screen, BLUE, paddle)
+        draw_balls(screen)
 
-    # パドルとボール
-    pygame.draw.rect(screen, BLUE, paddle)
-    pygame.draw.ellipse(screen, YELLOW, ball)
+        # ブロック
+        for row, col in game.bricks.alive_cells():
+            pygame.draw.rect(screen, RED, game.bricks.cell_rect(row, col))
 
-    # ブロック
-    for row in bricks:
-        for brick in row:
-            pygame.draw.rect(screen, RED, brick)
+        # パーティクル＆壊れブロック
+        draw_particles(screen)
+        draw_broken_bricks(screen)
+        draw_powerups(screen)
 
-    # パーティクル＆壊れブロック
-    draw_particles(screen)
-    draw_broken_bricks(screen)
+        # スコア表示
+        score_text = font.render('Score: ' + str(game.score), True, WHITE)
+        screen.blit(score_text, (10, 10))
 
-    # スコア表示
-    score_text = font.render('Score: ' + str(score), True, WHITE)
-    screen.blit(score_text, (10, 10))
+        # フレーム時間の統計（F3）
+        if show_profile:
+            for i, line in enumerate(profiler.overlay_lines()):
+                screen.blit(profile_font.render(line, True, GREEN), (WIDTH - 320, HEIGHT // 3 + i * 16))
 
-    pygame.display.flip()
+        pygame.display.flip()
 
 pygame.quit()
 sys.exit()
@@ -0,0 +1,53 @@
+# ブロック崩しのパーティクル（GUI 非依存）
+#
+# 位置・速度・寿命を NumPy 配列でまとめて持ち、フレームごとの移動と寿命切れの詰め直しを配列演算で行う。
+# 描画は brick_breaker9.py が pos[:count] をまとめて blits する。
+
+import numpy as np
+
+PARTICLES_PER_BRICK = 20   # ブロック1個を壊したときのパーティクル数
+PARTICLE_CAPACITY = 4096   # 最初に確保しておくパーティクル数（足りなければ倍にする）
+
+
+# パーティクル管理（位置・速度・寿命を NumPy 配列でまとめて持つ）
+class ParticleSystem:
+    def __init__(self, capacity=PARTICLE_CAPACITY, rng=None):
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)   # x, y 座標
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)   # x, y 方向速度
+        self.life = np.zeros(capacity, dtype=np.int32)         # 残り寿命（フレーム）
+        self.count = 0  # 先頭から count 個が生きている
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        capacity = max(needed, len(self.life) * 2)
+        for name in ("pos", "vel", "life"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, x, y, n=PARTICLES_PER_BRICK):
+        # (x, y) から n 個をランダムな速度・寿命で出す
+        end = self.count + n
+        if end > len(self.life):
+            self._grow(end)
+        self.pos[self.count:end] = (x, y)
+        self.vel[self.count:end] = self.rng.integers(-3, 4, size=(n, 2))
+        self.life[self.count:end] = self.rng.integers(20, 41, size=n)
+        self.count = end
+
+    def update(self):
+        # 全パーティクルを一度に動かし、寿命が尽きたものを詰める
+        n = self.count
+        self.pos[:n] += self.vel[:n]
+        self.life[:n] -= 1
+        alive = self.life[:n] > 0
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            self.count = len(keep)
+            self.pos[:self.count] = self.pos[keep]
+            self.vel[:self.count] = self.vel[keep]
+            self.life[:self.count] = self.life[keep]
@@ -0,0 +1,188 @@
+# ブロック崩しのゲームロジック（pygame 非依存）
+#
+# パドル・ボール・ブロック・パワーアップ・得点をまとめて BrickGameLogic に持ち、
+# step() 1回で固定の時間刻み（dt フレーム）だけ進める。描画も実時間の待ちもしないので、
+# brick_breaker9.py の表示にも、brick_sim.py のヘッドレスな一括シミュレーションにもそのまま使える。
+
+import numpy as np
+from brick_physics import BrickGrid, Balls
+from frame_profiler import FrameProfiler
+
+# 画面サイズ・ゲーム設定
+WIDTH, HEIGHT = 800, 600
+BRICK_ROWS = 5
+BRICK_COLUMNS = 10
+BRICK_WIDTH = 70
+BRICK_HEIGHT = 20
+PADDLE_WIDTH = 100
+PADDLE_HEIGHT = 15
+BALL_RADIUS = 10
+
+# ブロック配置
+BRICK_PADDING = 5
+OFFSET_TOP = 50
+OFFSET_LEFT = (WIDTH - (BRICK_COLUMNS * (BRICK_WIDTH + BRICK_PADDING))) // 2
+
+PADDLE_Y = HEIGHT - 40
+BALL_START_VEL = (4, -4)  # 最初のボールの速度（1フレームあたり）
+MAX_SPEED = 6             # パドルで打ち返したときの横速度の最大値
+MIN_SPEED_Y = abs(BALL_START_VEL[1])  # パドルで打ち返したときの縦の速さの下限
+
+MAX_BALLS = 256        # 分裂で増やせるボールの上限（数百個まで増やせる）
+SPLIT_WAYS = 3         # パワーアップを取ったとき1個のボールが何個に分かれるか
+POWERUP_CHANCE = 0.15  # ブロックを壊したときにパワーアップが落ちてくる確率
+POWERUP_SIZE = 14
+POWERUP_SPEED = 3
+
+BRICK_SCORE = 100   # ブロック1個の得点
+CLEAR_BONUS = 1000  # 全ブロックを壊したときのボーナス
+
+AIM_MARGIN = 0.9  # 狙って打ち返すときにパドルのどこまで端を使うか（中心からの割合）
+
+
+def follow_paddle_x(logic):
+    # 自動操作: 下向きのボールのうち一番下にあるものの真下へ（なければ一番下のボール）
+    balls = logic.balls
+    n = len(balls)
+    if n == 0:
+        return None
+    y = balls.pos[:n, 1]
+    key = np.where(balls.vel[:n, 1] > 0, y, y - HEIGHT)
+    return float(balls.pos[np.argmax(key), 0])
+
+
+def fold_x(x, radius=BALL_RADIUS, width=WIDTH):
+    # 左右の壁での反射を無視して進めた x を、壁で折り返した実際の x に直す（鏡像を畳む）
+    span = width - 2 * radius
+    u = np.mod(x - radius, 2 * span)
+    return radius + np.where(u <= span, u, 2 * span - u)
+
+
+def column_density(bricks):
+    # 列ごとの密集度（その列の残りブロック数 + 隣の列の数）。ブロックのない列は 0
+    counts = np.count_nonzero(bricks.alive, axis=0).astype(float)
+    density = counts + np.r_[0.0, counts[:-1]] + np.r_[counts[1:], 0.0]
+    density[counts == 0] = 0.0
+    return density
+
+
+def predict_paddle_x(logic):
+    # 自動操作（予測版）: ボールがパドルの高さに来る位置を壁の反射込みで閉じた式で求めて先回りし、
+    # 打ち返した球が一番ブロックの密集した列へ向かうように、当てるパドルの位置をずらす
+    balls = logic.balls
+    n = len(balls)
+    if n == 0:
+        return None
+    r = balls.radius
+    x, y = balls.pos[:n, 0], balls.pos[:n, 1]
+    vx, vy = balls.vel[:n, 0], balls.vel[:n, 1]
+    hit_y = PADDLE_Y - r  # パドルに当たるときのボールの中心の高さ
+    # 上向きのボールは天井で跳ね返ってくるまでの縦の道のりを足す（途中のブロックは考えない）
+    speed_y = np.maximum(np.abs(vy), 1e-9)
+    path_y = np.where(vy > 0, hit_y - y, (y - r) + (hit_y - r))
+    t = np.maximum(path_y, 0.0) / speed_y
+    i = int(np.argmin(t))  # 一番早く降りてくるボールを受ける
+    land_x = float(fold_x(x[i] + vx[i] * t[i], r))
+
+    # 打ち返した後の横速度は relative_x * MAX_SPEED、縦の速さは max(|vy|, MIN_SPEED_Y) なので、
+    # 各列の一番下のブロックに届くまでの時間から必要な relative_x を逆算し、届く列の中で一番密集した列を狙う
+    relative = 0.0
+    bricks = logic.bricks
+    density = column_density(bricks)
+    cols = np.flatnonzero(density)
+    if len(cols):
+        rows = bricks.rows - 1 - np.argmax(bricks.alive[::-1, cols], axis=0)  # 各列の一番下のブロック
+        target_x = bricks.left + cols * bricks.pitch_x + bricks.width / 2
+        target_y = bricks.top + rows * bricks.pitch_y + bricks.height + r
+        flight = np.maximum(hit_y - target_y, 1.0) / max(speed_y[i], MIN_SPEED_Y)
+        needed = (target_x - land_x) / flight / MAX_SPEED
+        reachable = np.abs(needed) <= AIM_MARGIN
+        if reachable.any():
+            best = np.argmax(np.where(reachable, density[cols], -1.0))
+        else:
+            best = np.argmin(np.abs(needed))
+        relative = float(needed[best])
+        if abs(relative) * MAX_SPEED < 0.3:
+            # 横速度が小さすぎると物理側でランダムにずらされるので、少しだけ傾ける
+            relative = 0.3 / MAX_SPEED if relative >= 0 else -0.3 / MAX_SPEED
+    # パドルが画面からはみ出さずに済む範囲に収める
+    low = max(-AIM_MARGIN, (land_x - (WIDTH - PADDLE_WIDTH / 2)) / (PADDLE_WIDTH / 2))
+    high = min(AIM_MARGIN, (land_x - PADDLE_WIDTH / 2) / (PADDLE_WIDTH / 2))
+    relative = min(max(relative, low), high)
+    return land_x - relative * PADDLE_WIDTH / 2
+
+
+# ゲームの状態と進行
+class BrickGameLogic:
+    def __init__(self, seed=None, dt=1.0, profiler=None):
+        self.dt = dt  # step 1回で進めるフレーム数
+        # ボールの衝突判定（collision）を計るプロファイラ（省略時は何もしない）
+        self.profiler = profiler if profiler is not None else FrameProfiler(enabled=False)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.bricks = BrickGrid(BRICK_ROWS, BRICK_COLUMNS, OFFSET_LEFT, OFFSET_TOP,
+                                BRICK_WIDTH, BRICK_HEIGHT, BRICK_PADDING)
+        self.balls = Balls(BALL_RADIUS, MAX_BALLS, self.rng)
+        self.balls.add(WIDTH // 2 + BALL_RADIUS, HEIGHT // 2 + BALL_RADIUS, *BALL_START_VEL)
+        self.paddle_x = (WIDTH - PADDLE_WIDTH) // 2  # パドルの左端
+        self.powerups = []      # 落ちてくるパワーアップの [中心x, 中心y]
+        self.score = 0
+        self.frame = 0          # 経過フレーム数（step 1回で dt ずつ増える）
+        self.game_over = False
+        self.clear_frames = []  # 全ブロックを壊したときのフレーム数（面クリアごと）
+        self.broken = (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp))  # 直前の step で壊れたブロックの (行, 列)
+
+    def paddle_rect(self):
+        return (self.paddle_x, PADDLE_Y, PADDLE_WIDTH, PADDLE_HEIGHT)
+
+    def move_paddle(self, center_x):
+        # パドルの中心を center_x に合わせる（画面端をはみ出さないように補正）
+        self.paddle_x = min(max(center_x - PADDLE_WIDTH / 2, 0), WIDTH - PADDLE_WIDTH)
+
+    def step(self, paddle_x=None):
+        # 1ステップ進める。paddle_x はパドルの中心を合わせる位置（None ならそのまま）
+        if self.game_over:
+            return
+        if paddle_x is not None:
+            self.move_paddle(paddle_x)
+
+        # ボールの移動と衝突（壁・パドル・ブロックを全ボールまとめて処理）
+        with self.profiler.scope("collision"):
+            self.broken, _ = self.balls.step(self.bricks, self.paddle_rect(), WIDTH, HEIGHT, MAX_SPEED, self.dt,
+                                              MIN_SPEED_Y)
+        rows, cols = self.broken
+        if len(rows):
+            self.score += BRICK_SCORE * len(rows)
+            # 壊したブロックからパワーアップを落とす
+            drop = self.rng.random(len(rows)) < POWERUP_CHANCE
+            x = self.bricks.left + cols[drop] * self.bricks.pitch_x + BRICK_WIDTH // 2
+            y = self.bricks.top + rows[drop] * self.bricks.pitch_y + BRICK_HEIGHT // 2
+            self.powerups.extend([px, py] for px, py in zip(x.tolist(), y.tolist()))
+
+        # 全ブロック破壊したら再配置
+        if self.bricks.count == 0:
+            self.score += CLEAR_BONUS
+            self.clear_frames.append(self.frame + self.dt)
+            self.bricks.reset()
+
+        self.update_powerups()
+        self.frame += self.dt
+
+        # 全部のボールが画面下まで落ちたら終了
+        if len(self.balls) == 0:
+            self.game_over = True
+
+    def update_powerups(self):
+        # パワーアップを落とし、パドルで取ったらボールを分裂させる
+        half = POWERUP_SIZE / 2
+        px, py, pw, ph = self.paddle_rect()
+        for p in self.powerups[:]:
+            p[1] += POWERUP_SPEED * self.dt
+            x, y = p
+            if x - half < px + pw and px < x + half and y - half < py + ph and py < y + half:
+                self.balls.split(SPLIT_WAYS)
+                self.powerups.remove(p)
+            elif y - half > HEIGHT:
+                self.powerups.remove(p)
@@ -0,0 +1,483 @@
+# ブロック崩しの当たり判定（pygame 非依存）
+#
+# ブロックは offset_left / offset_top から (幅 + 隙間) 間隔で並ぶ格子の上にしか置かれないので、
+# ボールの外接矩形から「重なりうるマス」を割り算だけで求められる（ボールがマスより小さければ最大4マス）。
+# ブロックの有無は (行, 列) の bool 配列 alive で持ち、消すのも数えるのも O(1) で済む。
+# 全ブロックを colliderect で総当たりしないので、小さなブロックが何千個あっても判定の手間は変わらない。
+#
+# ボールは Balls に NumPy 配列（中心座標・速度）でまとめて持ち、壁・パドル・ブロックとの判定を
+# ボールの数によらず配列演算1回ずつで済ませる。何百個に分裂しても 1 フレームの Python の処理量はほぼ一定。
+#
+# 衝突は「動かしてから重なりを見る」のではなく連続判定（スイープ）で求める。
+# 半径 r の円と矩形の衝突は、円の中心（点）と「矩形を r だけ膨らませた角丸矩形」の衝突と同じなので、
+# 中心の移動線分と角丸矩形（膨らませた矩形の辺 + 四隅の半径 r の円）の交差時刻をフレーム内で厳密に求め、
+# 一番早い衝突まで進めて法線で反射する、を残り時間がなくなるまで繰り返す。
+# 位置は小数のまま持つので、速いボールや大きな時間刻みでもブロックをすり抜けない。
+#
+# ボールが数個しかないときは配列演算の呼び出しの手間の方が重いので、同じ計算を Python の float で1個ずつ行う
+# （計算の順序も乱数の引き方も配列版と同じなので、どちらで進めても結果は一致する）。
+
+import math
+import numpy as np
+
+MAX_HITS_PER_STEP = 8  # 1フレーム内で処理する衝突回数の上限（超えたらそのフレームはそこで止める）
+TIME_EPSILON = 1e-9    # 衝突時刻の誤差の許容（フレーム単位）
+SMALL_BALLS = 32       # ボールがこの数以下なら配列演算を使わずに1個ずつ計算する
+MIN_DRIFT_Y = 0.5      # 縦速度がこれより小さいボールは真横に往復し続けないように縦へずらす
+
+# 衝突相手の種類
+HIT_NONE = 0
+HIT_WALL = 1
+HIT_PADDLE = 2
+HIT_BRICK = 3
+
+
+def sweep_rect(x, y, vx, vy, r, left, top, right, bottom, limit):
+    # 中心 (x, y)・半径 r の円が速度 (vx, vy) で動いたとき、矩形 [left, right] x [top, bottom] に当たる時刻と法線
+    # 引数はすべて同じ長さの配列（かスカラー）。(t, nx, ny) を返し、limit までに当たらなければ t は inf
+    # 最初から重なっている場合は当たりにしない（接触して反射した直後に同じ面へもう一度当たらないように）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # 膨らませた矩形との slab 判定
+        tx1 = (left - r - x) / vx
+        tx2 = (right + r - x) / vx
+        ty1 = (top - r - y) / vy
+        ty2 = (bottom + r - y) / vy
+    inside_x = (left - r < x) & (x < right + r)
+    inside_y = (top - r < y) & (y < bottom + r)
+    # 軸方向に動かないときは、その軸の範囲内にいれば常に重なり、外なら当たらない
+    tx_enter = np.where(vx == 0, np.where(inside_x, -np.inf, np.inf), np.minimum(tx1, tx2))
+    tx_exit = np.where(vx == 0, np.inf, np.maximum(tx1, tx2))
+    ty_enter = np.where(vy == 0, np.where(inside_y, -np.inf, np.inf), np.minimum(ty1, ty2))
+    ty_exit = np.where(vy == 0, np.inf, np.maximum(ty1, ty2))
+    t = np.maximum(tx_enter, ty_enter)
+    # 膨らませた矩形の角の部分（角の円の外）から動き出すときは、その場から角の円との判定をする
+    # （止まっている円はどこにも当たらない）
+    start_corner = inside_x & inside_y & ((x < left) | (x > right)) & ((y < top) | (y > bottom))
+    hit = (t <= np.minimum(tx_exit, ty_exit)) & ((t >= -TIME_EPSILON) | start_corner) & (t <= limit)
+    hit &= (vx != 0) | (vy != 0)
+    t = np.where(hit, np.maximum(t, 0.0), np.inf)
+    # 辺に当たったときの法線（後から入った軸の向き）
+    x_axis = tx_enter > ty_enter
+    nx = np.where(x_axis, -np.sign(vx), 0.0)
+    ny = np.where(x_axis, 0.0, -np.sign(vy))
+
+    # 膨らませた矩形に入った点が角の領域なら、角を中心とする半径 r の円と当たるかを調べ直す
+    t_hit = np.where(hit, t, 0.0)  # 当たらないもの（t は inf）で inf * 0 を作らないように
+    hx = x + vx * t_hit
+    hy = y + vy * t_hit
+    cx = np.clip(hx, left, right)
+    cy = np.clip(hy, top, bottom)
+    corner = hit & (cx != hx) & (cy != hy)
+    if np.any(corner):
+        dx = x - cx
+        dy = y - cy
+        a = vx * vx + vy * vy
+        b = dx * vx + dy * vy
+        c = dx * dx + dy * dy - r * r
+        disc = b * b - a * c
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tc = (-b - np.sqrt(disc)) / a
+        corner_hit = corner & (disc >= 0) & (c >= 0) & (tc >= -TIME_EPSILON) & (tc <= limit)
+        tc = np.maximum(tc, 0.0)
+        t = np.where(corner, np.where(corner_hit, tc, np.inf), t)
+        nx = np.where(corner_hit, (x + vx * tc - cx) / r, nx)
+        ny = np.where(corner_hit, (y + vy * tc - cy) / r, ny)
+    return t, nx, ny
+
+
+def sweep_rect_one(x, y, vx, vy, r, left, top, right, bottom, limit):
+    # sweep_rect のボール1個・矩形1個版（引数は Python の数値）。当たらなければ None、当たれば (t, nx, ny)
+    if vx == 0 and vy == 0:
+        return None  # 止まっている円はどこにも当たらない
+    inside_x = left - r < x < right + r
+    inside_y = top - r < y < bottom + r
+    if vx == 0:
+        if not inside_x:
+            return None
+        tx_enter, tx_exit = -math.inf, math.inf
+    else:
+        tx1 = (left - r - x) / vx
+        tx2 = (right + r - x) / vx
+        tx_enter, tx_exit = (tx1, tx2) if tx1 < tx2 else (tx2, tx1)
+    if vy == 0:
+        if not inside_y:
+            return None
+        ty_enter, ty_exit = -math.inf, math.inf
+    else:
+        ty1 = (top - r - y) / vy
+        ty2 = (bottom + r - y) / vy
+        ty_enter, ty_exit = (ty1, ty2) if ty1 < ty2 else (ty2, ty1)
+    t = max(tx_enter, ty_enter)
+    if t > min(tx_exit, ty_exit) or t > limit:
+        return None
+    if t < -TIME_EPSILON:
+        start_corner = inside_x and inside_y and (x < left or x > right) and (y < top or y > bottom)
+        if not start_corner:
+            return None
+    t = max(t, 0.0)
+    if tx_enter > ty_enter:
+        nx, ny = float((vx > 0) - (vx < 0)) * -1.0, 0.0
+    else:
+        nx, ny = 0.0, float((vy > 0) - (vy < 0)) * -1.0
+
+    hx = x + vx * t
+    hy = y + vy * t
+    cx = min(max(hx, left), right)
+    cy = min(max(hy, top), bottom)
+    if cx != hx and cy != hy:
+        dx = x - cx
+        dy = y - cy
+        a = vx * vx + vy * vy
+        b = dx * vx + dy * vy
+        c = dx * dx + dy * dy - r * r
+        disc = b * b - a * c
+        if disc < 0 or c < 0:
+            return None
+        tc = (-b - math.sqrt(disc)) / a
+        if tc < -TIME_EPSILON or tc > limit:
+            return None
+        t = max(tc, 0.0)
+        nx = (x + vx * t - cx) / r
+        ny = (y + vy * t - cy) / r
+    return t, nx, ny
+
+
+# 格子状に並んだブロック
+class BrickGrid:
+    def __init__(self, rows, columns, left, top, width, height, padding):
+        self.rows = rows
+        self.columns = columns
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.pitch_x = width + padding   # 隣のブロックまでの距離
+        self.pitch_y = height + padding
+        self.alive = np.ones((rows, columns), dtype=bool)
+        self.count = rows * columns      # 残っているブロック数
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        self.alive[:] = True
+        self.count = self.rows * self.columns
+
+    def cell_rect(self, row, col):
+        # (行, 列) のブロックの (x, y, 幅, 高さ)
+        return (self.left + col * self.pitch_x, self.top + row * self.pitch_y, self.width, self.height)
+
+    def remove(self, row, col):
+        if self.alive[row, col]:
+            self.alive[row, col] = False
+            self.count -= 1
+
+    def remove_many(self, rows, cols):
+        # 複数のブロックをまとめて消し、実際に消えた (行の配列, 列の配列) を返す（同じマスの重複は1回だけ）
+        cells = np.unique(rows * self.columns + cols)
+        rows, cols = np.divmod(cells, self.columns)
+        alive = self.alive[rows, cols]
+        rows, cols = rows[alive], cols[alive]
+        self.alive[rows, cols] = False
+        self.count -= len(rows)
+        return rows, cols
+
+    def cells_in(self, x0, y0, x1, y1):
+        # 矩形 [x0, x1] x [y0, y1]（配列）ごとに、重なりうるマスの生きたブロックを列挙する
+        # (何番目の矩形か, 行, 列) の配列を返す
+        row0 = np.clip(np.floor((y0 - self.top) / self.pitch_y), 0, self.rows).astype(np.intp)
+        row1 = np.clip(np.floor((y1 - self.top) / self.pitch_y), -1, self.rows - 1).astype(np.intp)
+        col0 = np.clip(np.floor((x0 - self.left) / self.pitch_x), 0, self.columns).astype(np.intp)
+        col1 = np.clip(np.floor((x1 - self.left) / self.pitch_x), -1, self.columns - 1).astype(np.intp)
+        n_rows = np.maximum(row1 - row0 + 1, 0)
+        n_cols = np.maximum(col1 - col0 + 1, 0)
+        sizes = n_rows * n_cols
+        owner = np.repeat(np.arange(len(sizes)), sizes)
+        # 各矩形の中でのマス番号（0 〜 sizes-1）を行優先で (行, 列) に直す
+        local = np.arange(len(owner)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        width = n_cols[owner]
+        rows = row0[owner] + local // np.maximum(width, 1)
+        cols = col0[owner] + local % np.maximum(width, 1)
+        alive = self.alive[rows, cols]
+        return owner[alive], rows[alive], cols[alive]
+
+    def alive_cells(self):
+        # 残っているブロックの (行, 列) を行優先で返す
+        return zip(*(index.tolist() for index in np.nonzero(self.alive)))
+
+
+# 複数のボール（中心座標と速度を NumPy 配列で持つ）
+class Balls:
+    def __init__(self, radius, max_count, rng=None):
+        self.radius = radius
+        self.max_count = max_count  # 分裂で増やせる上限
+        self.pos = np.zeros((max_count, 2))  # 中心の x, y
+        self.vel = np.zeros((max_count, 2))  # x, y 方向速度
+        self.count = 0  # 先頭から count 個が画面内にある
+        self.rng = np.random.default_rng() if rng is None else rng
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, x, y, vx, vy):
+        # ボールを1個増やす（上限なら何もしない）
+        if self.count < self.max_count:
+            self.pos[self.count] = (x, y)
+            self.vel[self.count] = (vx, vy)
+            self.count += 1
+
+    def split(self, ways=3, angle=0.3):
+        # 全ボールをそれぞれ ways 個に分ける（増えた分は速度の向きを angle ラジアンずつずらす）
+        n = self.count
+        for k in range(1, ways):
+            room = self.max_count - self.count
+            if room <= 0:
+                break
+            m = min(n, room)
+            theta = angle * ((k + 1) // 2) * (1 if k % 2 else -1)
+            cos, sin = np.cos(theta), np.sin(theta)
+            vx, vy = self.vel[:m, 0], self.vel[:m, 1]
+            end = self.count + m
+            self.pos[self.count:end] = self.pos[:m]
+            self.vel[self.count:end, 0] = vx * cos - vy * sin
+            self.vel[self.count:end, 1] = vx * sin + vy * cos
+            self.count = end
+
+    def _avoid_vertical(self):
+        # 横速度が 0 に近いボールを左右どちらかにずらす（真上・真下の往復防止）
+        vx = self.vel[:self.count, 0]
+        stuck = np.flatnonzero(np.abs(vx) < 0.1)
+        if len(stuck):
+            vx[stuck] = self.rng.choice((-1.0, 1.0), size=len(stuck))
+        # 角で跳ね返って縦速度がほぼ 0 になったボールは、今の向きのまま縦に少し速める（真横の往復防止）
+        vy = self.vel[:self.count, 1]
+        flat = np.abs(vy) < MIN_DRIFT_Y
+        if flat.any():
+            vy[flat] = np.where(vy[flat] < 0, -MIN_DRIFT_Y, MIN_DRIFT_Y)
+
+    def step(self, bricks, paddle, width, height, max_speed=6, dt=1.0, min_speed_y=0.0):
+        # 全ボールを dt フレーム分動かして壁・パドル・ブロックとの衝突を処理する（速度は 1 フレームあたりの移動量）
+        # パドルで打ち返したボールの縦の速さは min_speed_y 以上にする（角での反射で遅くなった分を戻す）
+        # 壊したブロックの (行の配列, 列の配列) と、画面下に落ちたボールの数を返す
+        if self.count <= SMALL_BALLS:
+            broken = self._move_small(bricks, paddle, width, max_speed, dt, min_speed_y)
+        else:
+            broken = self._move_many(bricks, paddle, width, max_speed, dt, min_speed_y)
+        self._avoid_vertical()
+
+        # 画面下まで落ちたボールを取り除く
+        n = self.count
+        alive = self.pos[:n, 1] + self.radius <= height
+        lost = n - int(np.count_nonzero(alive))
+        if lost:
+            keep = np.flatnonzero(alive)
+            self.count = len(keep)
+            self.pos[:self.count] = self.pos[keep]
+            self.vel[:self.count] = self.vel[keep]
+        return broken, lost
+
+    def _move_many(self, bricks, paddle, width, max_speed, dt, min_speed_y):
+        # 全ボールを配列演算でまとめて動かし、壊したブロックの (行の配列, 列の配列) を返す
+        n = self.count
+        r = self.radius
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        px, py, pw, ph = paddle
+        remaining = np.full(n, float(dt))   # フレーム内の残り時間
+        active = np.arange(n)               # まだ残り時間のあるボール
+        broken_rows = []
+        broken_cols = []
+
+        for _ in range(MAX_HITS_PER_STEP):
+            if len(active) == 0:
+                break
+            x, y = pos[active, 0], pos[active, 1]
+            vx, vy = vel[active, 0], vel[active, 1]
+            best = remaining[active].copy()   # 一番早い衝突の時刻（なければ残り時間全部）
+            kind = np.full(len(active), HIT_NONE)
+            nx = np.zeros(len(active))
+            ny = np.zeros(len(active))
+            hit_row = np.full(len(active), -1, dtype=np.intp)
+            hit_col = np.full(len(active), -1, dtype=np.intp)
+
+            def take(t, candidate_kind, cnx, cny, index=slice(None)):
+                # index のボールについて、今までより早い衝突なら置き換える
+                earlier = t < best[index]
+                chosen = np.arange(len(active))[index][earlier]
+                best[chosen] = t[earlier]
+                kind[chosen] = candidate_kind
+                nx[chosen] = np.broadcast_to(cnx, earlier.shape)[earlier]
+                ny[chosen] = np.broadcast_to(cny, earlier.shape)[earlier]
+                return chosen, earlier
+
+            # 壁（左右・上）。壁の外にいても、壁の方へ動いていれば即座に跳ね返す
+            with np.errstate(divide="ignore", invalid="ignore"):
+                take(np.where(vx < 0, np.maximum((r - x) / vx, 0.0), np.inf), HIT_WALL, 1.0, 0.0)
+                take(np.where(vx > 0, np.maximum((width - r - x) / vx, 0.0), np.inf), HIT_WALL, -1.0, 0.0)
+                take(np.where(vy < 0, np.maximum((r - y) / vy, 0.0), np.inf), HIT_WALL, 0.0, 1.0)
+
+            # パドル（下向きのボールだけ）。パドルは毎フレーム瞬間移動するので、すでに重なっていても当たりにする
+            t, _, _ = sweep_rect(x, y, vx, vy, r, px, py, px + pw, py + ph, best)
+            overlap = (x - r < px + pw) & (px < x + r) & (y - r < py + ph) & (py < y + r)
+            t = np.where(vy > 0, np.where(overlap, 0.0, t), np.inf)
+            take(t, HIT_PADDLE, 0.0, -1.0)
+
+            # ブロック：移動範囲を囲む矩形と重なるマスだけを候補にする
+            end_x = x + vx * best
+            end_y = y + vy * best
+            owner, rows, cols = bricks.cells_in(np.minimum(x, end_x) - r, np.minimum(y, end_y) - r,
+                                                np.maximum(x, end_x) + r, np.maximum(y, end_y) + r)
+            if len(owner):
+                left = bricks.left + cols * bricks.pitch_x
+                top = bricks.top + rows * bricks.pitch_y
+                t, bnx, bny = sweep_rect(x[owner], y[owner], vx[owner], vy[owner], r,
+                                         left, top, left + bricks.width, top + bricks.height, best[owner])
+                # ボールごとに一番早いブロックを選ぶ（同時なら行優先で先のもの）
+                order = np.lexsort((t, owner))
+                first = order[np.r_[True, owner[order][1:] != owner[order][:-1]]]
+                chosen, earlier = take(t[first], HIT_BRICK, bnx[first], bny[first], owner[first])
+                hit_row[chosen] = rows[first][earlier]
+                hit_col[chosen] = cols[first][earlier]
+
+            # 衝突時刻まで進める
+            pos[active] += vel[active] * best[:, None]
+            remaining[active] -= best
+
+            # 壁・ブロック：法線で反射（同じフレームに同じブロックへ当たったボールはどれも跳ね返る）
+            reflect = np.flatnonzero((kind == HIT_WALL) | (kind == HIT_BRICK))
+            if len(reflect):
+                balls = active[reflect]
+                dot = vel[balls, 0] * nx[reflect] + vel[balls, 1] * ny[reflect]
+                vel[balls, 0] -= 2 * dot * nx[reflect]
+                vel[balls, 1] -= 2 * dot * ny[reflect]
+            bricks_hit = np.flatnonzero(kind == HIT_BRICK)
+            if len(bricks_hit):
+                removed = bricks.remove_many(hit_row[bricks_hit], hit_col[bricks_hit])
+                broken_rows.append(removed[0])
+                broken_cols.append(removed[1])
+
+            # パドル：衝突位置で角度を変える
+            on = active[kind == HIT_PADDLE]
+            if len(on):
+                # パドル中心を基準に (-1.0 ~ +1.0)
+                vel[on, 0] = (pos[on, 0] - (px + pw / 2)) / (pw / 2) * max_speed
+                vel[on, 1] = -np.maximum(np.abs(vel[on, 1]), min_speed_y)
+                slow = on[np.abs(vel[on, 0]) < 0.3]
+                vel[slow, 0] = self.rng.choice((-1.5, 1.5), size=len(slow))
+
+            # 何かに当たって残り時間があるボールだけ次の衝突を探す
+            active = active[(kind != HIT_NONE) & (remaining[active] > TIME_EPSILON)]
+
+        if broken_rows:
+            return np.concatenate(broken_rows), np.concatenate(broken_cols)
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    def _move_small(self, bricks, paddle, width, max_speed, dt, min_speed_y):
+        # _move_many と同じ計算をボール1個ずつ Python の float で行う（ボールが少ないときはこちらが速い）
+        n = self.count
+        r = self.radius
+        pos = self.pos[:n].tolist()
+        vel = self.vel[:n].tolist()
+        px, py, pw, ph = paddle
+        remaining = [float(dt)] * n
+        active = list(range(n))
+        alive = bricks.alive
+        broken_rows = []
+        broken_cols = []
+
+        for _ in range(MAX_HITS_PER_STEP):
+            if not active:
+                break
+            hits = []  # (ボール, 種類, nx, ny, 行, 列)
+            for i in active:
+                x, y = pos[i]
+                vx, vy = vel[i]
+                best = remaining[i]
+                hit = (HIT_NONE, 0.0, 0.0, -1, -1)
+
+                # 壁（左右・上）
+                if vx < 0 and max((r - x) / vx, 0.0) < best:
+                    best, hit = max((r - x) / vx, 0.0), (HIT_WALL, 1.0, 0.0, -1, -1)
+                if vx > 0 and max((width - r - x) / vx, 0.0) < best:
+                    best, hit = max((width - r - x) / vx, 0.0), (HIT_WALL, -1.0, 0.0, -1, -1)
+                if vy < 0 and max((r - y) / vy, 0.0) < best:
+                    best, hit = max((r - y) / vy, 0.0), (HIT_WALL, 0.0, 1.0, -1, -1)
+
+                # パドル（下向きのボールだけ）
+                if vy > 0:
+                    if x - r < px + pw and px < x + r and y - r < py + ph and py < y + r:
+                        t = 0.0
+                    else:
+                        swept = sweep_rect_one(x, y, vx, vy, r, px, py, px + pw, py + ph, best)
+                        t = math.inf if swept is None else swept[0]
+                    if t < best:
+                        best, hit = t, (HIT_PADDLE, 0.0, -1.0, -1, -1)
+
+                # ブロック：移動範囲を囲む矩形と重なるマスだけを行優先で調べる
+                end_x = x + vx * best
+                end_y = y + vy * best
+                row0 = min(max(math.floor((min(y, end_y) - r - bricks.top) / bricks.pitch_y), 0), bricks.rows)
+                row1 = min(max(math.floor((max(y, end_y) + r - bricks.top) / bricks.pitch_y), -1), bricks.rows - 1)
+                col0 = min(max(math.floor((min(x, end_x) - r - bricks.left) / bricks.pitch_x), 0), bricks.columns)
+                col1 = min(max(math.floor((max(x, end_x) + r - bricks.left) / bricks.pitch_x), -1), bricks.columns - 1)
+                limit = best
+                brick = None
+                for row in range(row0, row1 + 1):
+                    top = bricks.top + row * bricks.pitch_y
+                    for col in range(col0, col1 + 1):
+                        if not alive[row, col]:
+                            continue
+                        left = bricks.left + col * bricks.pitch_x
+                        swept = sweep_rect_one(x, y, vx, vy, r, left, top, left + bricks.width,
+                                               top + bricks.height, limit)
+                        if swept is not None and (brick is None or swept[0] < brick[0][0]):
+                            brick = (swept, row, col)
+                if brick is not None and brick[0][0] < best:
+                    (best, bnx, bny), row, col = brick
+                    hit = (HIT_BRICK, bnx, bny, row, col)
+
+                # 衝突時刻まで進める
+                pos[i] = [x + vx * best, y + vy * best]
+                remaining[i] -= best
+                hits.append((i,) + hit)
+
+            # 壁・ブロック：法線で反射（同じフレームに同じブロックへ当たったボールはどれも跳ね返る）
+            cells = set()
+            on = []
+            for i, kind, nx, ny, row, col in hits:
+                if kind == HIT_WALL or kind == HIT_BRICK:
+                    vx, vy = vel[i]
+                    dot = vx * nx + vy * ny
+                    vel[i] = [vx - 2 * dot * nx, vy - 2 * dot * ny]
+                    if kind == HIT_BRICK:
+                        cells.add(row * bricks.columns + col)
+                elif kind == HIT_PADDLE:
+                    on.append(i)
+            for cell in sorted(cells):
+                row, col = divmod(cell, bricks.columns)
+                if alive[row, col]:
+                    bricks.remove(row, col)
+                    broken_rows.append(row)
+                    broken_cols.append(col)
+
+            # パドル：衝突位置で角度を変える
+            if on:
+                slow = []
+                for i in on:
+                    # パドル中心を基準に (-1.0 ~ +1.0)
+                    vx = (pos[i][0] - (px + pw / 2)) / (pw / 2) * max_speed
+                    vel[i] = [vx, -max(abs(vel[i][1]), min_speed_y)]
+                    if abs(vx) < 0.3:
+                        slow.append(i)
+                for i, vx in zip(slow, self.rng.choice((-1.5, 1.5), size=len(slow)).tolist()):
+                    vel[i][0] = vx
+
+            # 何かに当たって残り時間があるボールだけ次の衝突を探す
+            active = [i for i, kind, _, _, _, _ in hits if kind != HIT_NONE and remaining[i] > TIME_EPSILON]
+
+        self.pos[:n] = pos
+        self.vel[:n] = vel
+        return np.array(broken_rows, dtype=np.intp), np.array(broken_cols, dtype=np.intp)
@@ -0,0 +1,77 @@
+# ブロック崩しのヘッドレスシミュレーション
+#
+# ディスプレイも pygame も使わず、BrickGameLogic を固定の時間刻みで回して N ゲーム遊ばせる。
+# 実時間は待たないので、自動パドルの方針の調整や面クリアまでのフレーム数の計測を CPU が回るだけ速く行える。
+# ゲームは「全ボールを落とす」「指定の面数をクリアする」「フレーム数の上限」のどれかで終わる。
+#
+# 使い方:
+#   python -m brick_sim --games 1000 --policy predict --workers 8
+#   python -m brick_sim --games 100 --levels 3 --dt 2   # 2フレームずつ進める（衝突は連続判定なので結果は崩れない）
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from brick_logic import BrickGameLogic, follow_paddle_x, predict_paddle_x
+
+MAX_FRAMES = 60 * 60 * 10  # 1ゲームのフレーム数の上限（10分ぶん）
+
+# 自動パドルの方針（logic を受け取ってパドルの中心を合わせる位置か None を返す関数）
+POLICIES = {
+    "follow": follow_paddle_x,
+    "predict": predict_paddle_x,
+    "still": lambda logic: None,
+}
+
+
+def play_game(logic, policy, levels=1, max_frames=MAX_FRAMES):
+    # 1ゲームを終わるまで遊ぶ。経過フレーム数を返す
+    while not logic.game_over and len(logic.clear_frames) < levels and logic.frame < max_frames:
+        logic.step(policy(logic))
+    return logic.frame
+
+
+def run_game(seed, policy="predict", levels=1, dt=1.0, max_frames=MAX_FRAMES):
+    # 1ゲーム遊んで (得点, フレーム数, 面クリアしたフレーム数のリスト, ゲームオーバーか) を返す
+    logic = BrickGameLogic(seed, dt)
+    frames = play_game(logic, POLICIES[policy], levels, max_frames)
+    return logic.score, frames, logic.clear_frames, logic.game_over
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ブロック崩しのヘッドレスシミュレーション")
+    parser.add_argument("--games", type=int, default=100, help="遊ぶゲーム数")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="predict", help="自動パドルの方針")
+    parser.add_argument("--levels", type=int, default=1, help="何面クリアしたら終わるか")
+    parser.add_argument("--seed", type=int, default=0, help="最初のゲームのシード（ゲームごとに 1 ずつずらす）")
+    parser.add_argument("--dt", type=float, default=1.0, help="1ステップで進めるフレーム数")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES, help="1ゲームのフレーム数の上限")
+    parser.add_argument("--workers", type=int, default=0, help="プロセス数（0 はプールを使わない）")
+    args = parser.parse_args(argv)
+
+    seeds = range(args.seed, args.seed + args.games)
+    options = (args.policy, args.levels, args.dt, args.max_frames)
+    start = time.perf_counter()
+    if args.workers == 0:
+        results = [run_game(seed, *options) for seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_game, seeds, *(([value] * args.games) for value in options),
+                                        chunksize=max(1, args.games // (args.workers * 4))))
+    elapsed = time.perf_counter() - start
+
+    scores = [score for score, _, _, _ in results]
+    total_frames = sum(frames for _, frames, _, _ in results)  # シミュレーションしたフレーム数（dt 倍した値）
+    first_clears = [clears[0] for _, _, clears, _ in results if clears]
+    lost = sum(1 for _, _, _, game_over in results if game_over)
+    print(f"games: {args.games}  policy: {args.policy}  dt: {args.dt}")
+    print(f"elapsed: {elapsed:.2f}s  games/sec: {args.games / elapsed:.1f}  frames/sec: {total_frames / elapsed:.0f}")
+    print(f"score: mean {sum(scores) / len(scores):.1f}  max {max(scores)}")
+    if first_clears:
+        print(f"first clear: {len(first_clears)}/{args.games} games  mean {sum(first_clears) / len(first_clears):.0f} frames"
+              f"  best {min(first_clears):.0f} frames")
+    print(f"lost all balls: {lost}/{args.games} games")
+
+
+if __name__ == "__main__":
+    main()
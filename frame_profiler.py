@@ -0,0 +1,147 @@
+# フレーム時間のプロファイラ（GUI 非依存）
+#
+# 名前つきのスコープ（input / logic / collision / effects / render など）ごとに所要時間を計り、
+# 直近 HISTORY 回ぶんをリングバッファに残して p50 / p95 / p99 / 最大を出す。
+# tick() をフレームの頭で呼ぶと、前回からの間隔を "frame" として記録する（待ち時間も含む実際のフレーム時間）。
+# 入れ子のスコープは外側のスコープの時間にも含まれる。
+# BrickGameLogic / PuyoGameLogic は profiler 引数で受け取り、衝突・連鎖判定（collision）やエフェクト更新（effects）を中で計る。
+#
+# 環境変数 FRAME_PROFILE にファイル名（.json か .csv）を入れて起動すると、終了時に統計をそこへ書き出す。
+#   FRAME_PROFILE=profile.json python brick_breaker9.py
+# 画面への表示は各ゲームが overlay_lines() の文字列を描く（F3 で表示を切り替え）。
+
+import atexit
+import csv
+import json
+import os
+import time
+import numpy as np
+
+HISTORY = 600  # スコープごとに残すサンプル数（60FPS で10秒ぶん）
+OVERLAY_INTERVAL = 0.5  # 画面表示の数字を更新する間隔（秒。毎フレーム変わると読めないので）
+PROFILE_ENV = "FRAME_PROFILE"
+STAT_FIELDS = ("count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms", "max_all_ms")
+
+
+# 1スコープ分の計測結果（リングバッファ）
+class ScopeStats:
+    __slots__ = ("samples", "index", "count", "max_all", "start")
+
+    def __init__(self, history=HISTORY):
+        self.samples = np.zeros(history)  # 所要時間（ミリ秒）
+        self.index = 0      # 次に書き込む位置
+        self.count = 0      # これまでに記録した回数
+        self.max_all = 0.0  # 起動してからの最大
+        self.start = 0.0
+
+    def add(self, ms):
+        self.samples[self.index] = ms
+        self.index = (self.index + 1) % len(self.samples)
+        self.count += 1
+        if ms > self.max_all:
+            self.max_all = ms
+
+    def window(self):
+        # 残っているサンプル（古い順とは限らない）
+        return self.samples[:min(self.count, len(self.samples))]
+
+    def summary(self):
+        samples = self.window()
+        if len(samples) == 0:
+            return dict.fromkeys(STAT_FIELDS, 0)
+        p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+        return {
+            "count": self.count,
+            "mean_ms": float(samples.mean()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": float(samples.max()),
+            "max_all_ms": self.max_all,
+        }
+
+    # with profiler.scope(name): で使う
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.add((time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+# 何もしないスコープ（プロファイラを無効にしたとき用）
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class FrameProfiler:
+    def __init__(self, history=HISTORY, enabled=True):
+        self.history = history
+        self.enabled = enabled
+        self.scopes = {}  # 名前 → ScopeStats（最初に使った順）
+        self.last_tick = None
+        self.overlay = []        # 前回作った表示用の行
+        self.overlay_time = 0.0  # それを作った時刻
+
+    @classmethod
+    def from_env(cls):
+        # FRAME_PROFILE が設定されていれば、終了時にそのファイルへ書き出すようにする
+        profiler = cls()
+        path = os.environ.get(PROFILE_ENV)
+        if path:
+            atexit.register(profiler.dump, path)
+        return profiler
+
+    def scope(self, name):
+        # 名前つきの計測スコープ（同じ名前のスコープを入れ子にはできない）
+        if not self.enabled:
+            return _NULL_SCOPE
+        stats = self.scopes.get(name)
+        if stats is None:
+            stats = self.scopes[name] = ScopeStats(self.history)
+        return stats
+
+    def tick(self):
+        # フレームの頭で呼ぶ。前回からの間隔を "frame" として記録する
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            self.scope("frame").add((now - self.last_tick) * 1000.0)
+        self.last_tick = now
+
+    def stats(self):
+        return {name: stats.summary() for name, stats in self.scopes.items()}
+
+    def overlay_lines(self):
+        # 画面に重ねて表示する行（スコープごとに p50 / p95 / p99 / 最大、単位はミリ秒）
+        now = time.perf_counter()
+        if now - self.overlay_time >= OVERLAY_INTERVAL:
+            lines = ["scope       p50    p95    p99    max"]
+            for name, s in self.stats().items():
+                lines.append(f"{name:<10}{s['p50_ms']:6.2f} {s['p95_ms']:6.2f} {s['p99_ms']:6.2f} {s['max_ms']:6.2f}")
+            self.overlay = lines
+            self.overlay_time = now
+        return self.overlay
+
+    def dump(self, path):
+        # 統計を JSON か CSV（拡張子で判断）に書き出す
+        stats = self.stats()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(("scope",) + STAT_FIELDS)
+                for name, s in stats.items():
+                    writer.writerow((name,) + tuple(s[field] for field in STAT_FIELDS))
+        else:
+            data = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "history": self.history, "scopes": stats}
+            with open(path, "w") as f:
+                json.dump(data, f, indent=2)
@@ -3,6 +3,11 @@ import sys
 import random
 import time
 import numpy as np
+from puyo_replay import Replay, save_replay
+from puyo_logic import POP_FRAMES, POP_GLOW_CHAINS, pop_curve, pop_frame, pop_frame_progress, chain_tier
+from puyo_effects import EffectPool, POP_DTYPE, STAR_DTYPE, POP_CAPACITY, STAR_CAPACITY
+from frame_profiler import FrameProfiler
+from puyo_engine import BitBoard, PuyoSequence, grid_to_cells, label_groups, collect_groups, compact_grid, calc_chain_score
 import pyttsx3
 import math
 from pygame.locals import *
@@ -74,6 +79,118 @@ try:
 except:
     has_sound = False  # 音声ファイルがない場合
 
+# 描画リソースのキャッシュ（フレームループの中でフォントやサーフェスを作らない）
+TEXT_CACHE_SIZE = 256  # 描画済みテキストを残す数の上限（スコアなどで増え続けないように）
+_fonts = {}
+_text_cache = {}
+_scratch_surfaces = {}
+
+
+def get_font(size):
+    # サイズごとのフォント（一度だけ読み込む）
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+def render_text(text, size, color=WHITE):
+    # 描画済みのテキストを (文字列, サイズ, 色) ごとに使い回す
+    key = (text, size, color)
+    surface = _text_cache.get(key)
+    if surface is None:
+        if len(_text_cache) >= TEXT_CACHE_SIZE:
+            _text_cache.clear()
+        surface = _text_cache[key] = get_font(size).render(text, True, color)
+    return surface
+
+
+def get_scratch_surface(width, height):
+    # 大きさごとに1枚の透明サーフェスを使い回す（描いてすぐ blit する用途）
+    key = (int(width), int(height))
+    surface = _scratch_surfaces.get(key)
+    if surface is None:
+        surface = _scratch_surfaces[key] = pygame.Surface(key, pygame.SRCALPHA)
+    else:
+        surface.fill((0, 0, 0, 0))
+    return surface
+
+# 消去アニメーションのアトラス（(色, 輝きの段階) ごとに全コマを横一列に並べた1枚のサーフェス）
+POP_MAX_RADIUS = int(PUYO_SIZE // 2 * 1.3)  # 一番膨らんだときの半径（1コマの大きさの半分）
+_pop_atlases = {}
+
+
+def bake_pop_frame(s, base_color, chain, progress, flash_frequency):
+    # 消去中のぷよの1コマを、一辺が直径の透明サーフェス s に描く
+    scale, brightness = pop_curve(progress, flash_frequency)
+    current_radius = int(PUYO_SIZE // 2 * scale)
+    
+    # 時間に基づいて透明度を計算
+    alpha = int(255 * (1.0 - progress))
+    
+    # 進行度に基づいて点滅
+    flash_state = math.sin(progress * flash_frequency * math.pi * 2) * 0.5 + 0.5
+    
+    # 点滅効果を明るさに適用
+    flash_brightness = brightness * (0.5 + flash_state * 0.5)
+    
+    # 明るさに基づいて色を変更（白に近づける）
+    color = tuple([min(255, int(c * (1 - flash_brightness) + 255 * flash_brightness)) for c in base_color])
+    color_with_alpha = (*color, alpha)
+    
+    pygame.draw.circle(s, color_with_alpha, (current_radius, current_radius), current_radius)
+    
+    # 白い光沢も拡大縮小に合わせる
+    highlight_radius = max(1, int(PUYO_SIZE // 8 * scale))
+    highlight_offset = max(1, int(5 * scale))
+    
+    # 点滅に合わせて光沢も変える
+    highlight_alpha = min(255, int(alpha * (0.7 + flash_state * 0.3)))
+    pygame.draw.circle(s, (255, 255, 255, highlight_alpha), 
+                    (current_radius - highlight_offset, current_radius - highlight_offset), 
+                    highlight_radius)
+    
+    # 連鎖数に応じた輝きエフェクト
+    if chain > 1 and flash_brightness > 0.5:
+        # 内側から外側に広がる輝きの輪
+        glow_phases = [0.3, 0.6, 0.9]  # 複数の輝きの位相
+        for glow_phase in glow_phases:
+            # 位相に基づいてサイズを計算（膨張と収縮を繰り返す）
+            phase_offset = (progress * 3 + glow_phase) % 1.0
+            glow_size = current_radius * (0.6 + phase_offset * 0.8)
+            
+            if glow_size > 0:
+                # 連鎖数に応じた色
+                if chain <= 3:
+                    glow_color = (255, 255, 100, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
+                elif chain <= 5:
+                    glow_color = (255, 100, 255, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
+                else:
+                    glow_color = (100, 255, 255, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
+                    
+                # 輝きの輪を描画
+                pygame.draw.circle(s, glow_color, (current_radius, current_radius), 
+                                glow_size, max(1, int(current_radius * 0.15)))
+
+
+def get_pop_atlas(color, tier, flash_frequency):
+    # 初めて使うときに全コマを描いておく
+    key = (color, tier, flash_frequency)
+    atlas = _pop_atlases.get(key)
+    if atlas is None:
+        cell = POP_MAX_RADIUS * 2
+        atlas = pygame.Surface((cell * POP_FRAMES, cell), pygame.SRCALPHA)
+        for frame in range(POP_FRAMES):
+            progress = pop_frame_progress(frame)
+            radius = int(PUYO_SIZE // 2 * pop_curve(progress, flash_frequency)[0])
+            if radius > 0:
+                # コマの中央に、元の大きさのサーフェスと同じ範囲で描く
+                offset = POP_MAX_RADIUS - radius
+                frame_surface = atlas.subsurface((frame * cell + offset, offset, radius * 2, radius * 2))
+                bake_pop_frame(frame_surface, color, POP_GLOW_CHAINS[tier], progress, flash_frequency)
+        _pop_atlases[key] = atlas
+    return atlas
+
 # ぷよぷよのクラス
 class Puyo:
     def __init__(self, x, y, color):
@@ -82,7 +199,6 @@ class Puyo:
         self.color = color
         self.falling = True
         self.connected = False
-        self.checked = False
         self.visual_y = y  # 表示上の位置
         self.target_y = y  # 目標位置
 
@@ -104,12 +220,14 @@ class Puyo:
 
 # ぷよぷよのペアクラス
 class PuyoPair:
-    def __init__(self, x, grid):
+    def __init__(self, x, grid, colors=None):
         self.x = x
         self.y = 0
         self.rotation = 0  # 0: 上, 1: 右, 2: 下, 3: 左
         self.grid = grid
-        self.colors = [random.choice(PUYO_COLORS), random.choice(PUYO_COLORS)]
+        if colors is None:
+            colors = [random.choice(PUYO_COLORS), random.choice(PUYO_COLORS)]
+        self.colors = list(colors)
         self.puyo1 = Puyo(x, 0, self.colors[0])
         self.puyo2 = Puyo(x, 1, self.colors[1])
         
@@ -216,8 +334,19 @@ class PuyoPair:
         
     def drop_to_bottom(self):
         # 一番下まで落とす（ちぎり機能）
-        while self.move(0, 1):
-            pass
+        # 1マスずつ動かさず、下の空きマス数から落下量を一度で求める
+        dy = min(self.free_below(self.puyo1.x, self.puyo1.y), self.free_below(self.puyo2.x, self.puyo2.y))
+        if dy > 0:
+            self.move(0, dy)
+    
+    def free_below(self, x, y):
+        # (x, y) の真下に続く空きマスの数（ペア自身のマスは空きとみなす）
+        count = 0
+        for below in range(y + 1, GRID_HEIGHT):
+            if self.grid[below][x] is not None:
+                break
+            count += 1
+        return count
     
     def can_move(self, new_x, new_y):
         rot = self.rotation
@@ -274,10 +403,17 @@ class PuyoPair:
 
 # ゲームクラス
 class PuyoGame:
-    def __init__(self):
-        self.reset()
+    def __init__(self, seed=None, profiler=None):
+        self.on_game_over = None  # ゲームオーバーになったときにリプレイを渡して呼ぶ関数
+        # 連鎖判定（collision）とエフェクト更新（effects）を計るプロファイラ（省略時は何もしない）
+        self.profiler = profiler if profiler is not None else FrameProfiler(enabled=False)
+        self.reset(seed)
     
-    def reset(self):
+    def reset(self, seed=None):
+        # seed を渡すと同じツモの並びで遊べる（省略時は毎回新しいシード）
+        self.sequence = PuyoSequence(seed)
+        self.replay = Replay(self.sequence.seed)  # 置いた場所の記録
+        self.frame = 0  # update を呼んだ回数（リプレイのフレーム番号）
         self.grid = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
         self.current_pair = self.create_new_pair()
         self.next_pair = self.create_new_pair()
@@ -291,9 +427,9 @@ class PuyoGame:
         self.key_delay = 0.15  # キー入力の遅延（秒）
         self.last_rotation_time = 0
         self.rotation_delay = 0.25  # 回転の遅延（秒）
-        self.pop_effects = []  # 消去エフェクト（星など）
+        self.pop_effects = EffectPool(STAR_DTYPE, STAR_CAPACITY)  # 星形エフェクト
         self.effect_duration = 1.5  # エフェクトの持続時間を1.5秒に延長
-        self.puyo_pop_state = {}  # ぷよの消去状態を管理
+        self.puyo_pop_state = EffectPool(POP_DTYPE, POP_CAPACITY)  # ぷよの消去状態を管理
         self.flash_frequency = 8  # 点滅の頻度（1秒あたりの回数）
         self.waiting_for_pop = False  # 消去アニメーション待機中
         self.pop_wait_time = 0.0  # 待機時間
@@ -301,7 +437,9 @@ class PuyoGame:
         self.fall_animation_in_progress = False  # 落下アニメーション中
     
     def create_new_pair(self):
-        return PuyoPair(GRID_WIDTH // 2 - 1, self.grid)
+        # ツモ表から次のペアの色を取り出す
+        color1, color2 = self.sequence.next_pair()
+        return PuyoPair(GRID_WIDTH // 2 - 1, self.grid, (PUYO_COLORS[color1 - 1], PUYO_COLORS[color2 - 1]))
     
     def add_puyos_to_grid(self, puyo1, puyo2):
         if 0 <= puyo1.y < GRID_HEIGHT and 0 <= puyo1.x < GRID_WIDTH:
@@ -316,25 +454,19 @@ class PuyoGame:
     
     def handle_floating_puyos(self):
         # 横に置いて空中に浮いている状態のぷよを落とす
-        puyo_dropped = True
-        
-        while puyo_dropped:
-            puyo_dropped = False
-            for y in range(GRID_HEIGHT - 2, -1, -1):
-                for x in range(GRID_WIDTH):
-                    if self.grid[y][x] is not None and self.grid[y + 1][x] is None:
-                        # 下が空いている場合は落とす
-                        self.grid[y + 1][x] = self.grid[y][x]
-                        self.grid[y + 1][x].y = y + 1
-                        self.grid[y + 1][x].target_y = y + 1  # 目標位置を更新
-                        self.grid[y][x] = None
-                        puyo_dropped = True
-                        self.fall_animation_in_progress = True  # アニメーション中フラグをセット
+        self.fall_puyos()
+    
+    def to_bitboard(self):
+        # 現在の盤面をヘッドレスエンジンのビットボードに変換する
+        return BitBoard.from_grid(self.grid, PUYO_COLORS)
     
     def check_game_over(self):
         # 上部の行に固定されたぷよがあるかチェック
         if self.grid[1][GRID_WIDTH // 2 - 1] is not None or self.grid[1][GRID_WIDTH // 2] is not None:
             self.game_over = True
+            self.replay.score = self.score
+            if self.on_game_over is not None:
+                self.on_game_over(self.replay)
             
     def quick_drop(self):
         # ちぎり機能（一番下まで落とす）
@@ -351,6 +483,7 @@ class PuyoGame:
             self.fall_animation_in_progress = True
                 
             # 固定する
+            self.replay.add(self.current_pair.x, self.current_pair.rotation, self.frame)
             self.add_puyos_to_grid(self.current_pair.puyo1, self.current_pair.puyo2)
             # 連鎖チェック
             if not self.check_matches():
@@ -359,85 +492,52 @@ class PuyoGame:
                 self.check_game_over()
     
     def check_matches(self):
-        # 全てのぷよのcheckedフラグをリセット
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if self.grid[y][x] is not None:
-                    self.grid[y][x].checked = False
-        
-        groups = []
-        # 4つ以上連結したぷよを探す
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if self.grid[y][x] is not None and not self.grid[y][x].checked:
-                    group = self.find_connected_puyos(x, y, self.grid[y][x].color)
-                    if len(group) >= 4:
-                        groups.append(group)
+        # 盤面全体を一度にラベル付けして、4つ以上連結したぷよを探す
+        with self.profiler.scope("collision"):
+            labels, sizes = label_groups(grid_to_cells(self.grid, PUYO_COLORS))
+            groups = []
+            for indices in collect_groups(labels, sizes):
+                groups.append([self.grid[i // GRID_WIDTH][i % GRID_WIDTH] for i in indices])
         
         # 連鎖があればぷよを消して得点計算
         if groups:
             self.chain_count += 1
-            total_cleared = 0
             
             # 連鎖ボイスの再生
             if self.chain_count in CHAIN_VOICES:
                 self.play_chain_voice(self.chain_count)
             
-            # ぷよを消す&エフェクトを追加
-            for group in groups:
-                total_cleared += len(group)
-                for puyo in group:
-                    # ぷよの消去状態を作成（全連鎖共通のエフェクト）
-                    puyo_key = f"{puyo.x},{puyo.y}"
-                    self.puyo_pop_state[puyo_key] = {
-                        "x": puyo.x,
-                        "y": puyo.y,
-                        "color": puyo.color,
-                        "time": self.effect_duration,
-                        "scale": 1.0,
-                        "chain": self.chain_count,
-                        "original_puyo": puyo,
-                        "brightness": 0.0,
-                        "phase": 0.0
-                    }
-                    
-                    # 星形エフェクトは連鎖数に応じて - 星の数だけ変える
-                    if self.chain_count > 1:
-                        star_count = min(1 + (self.chain_count - 1) // 2, 5)  # 最大5個まで
-                        
-                        # 星エフェクトを追加
-                        for i in range(star_count):
-                            angle = (i * 360 / star_count) * 3.14159 / 180
-                            offset_x = math.cos(angle) * 0.5
-                            offset_y = math.sin(angle) * 0.5
-                            
-                            # 星エフェクトの保存
-                            self.pop_effects.append({
-                                "x": puyo.x + offset_x,
-                                "y": puyo.y + offset_y,
-                                "color": puyo.color,
-                                "time": self.effect_duration,
-                                "radius": PUYO_SIZE // 2,
-                                "chain": self.chain_count,
-                                "type": "star"
-                            })
-                    
-                    # グリッドから削除
-                    self.grid[puyo.y][puyo.x] = None
+            # ぷよを消す&エフェクトを追加（全連鎖共通のエフェクト、まとめて配列に入れる）
+            popped = [puyo for group in groups for puyo in group]
+            xs = np.array([puyo.x for puyo in popped])
+            ys = np.array([puyo.y for puyo in popped])
+            colors = np.array([PUYO_COLORS.index(puyo.color) for puyo in popped])
+            self.puyo_pop_state.add_many(len(popped), x=xs, y=ys, color=colors, chain=self.chain_count,
+                                         time=self.effect_duration, frame=0)
+            
+            # 星形エフェクトは連鎖数に応じて - 星の数だけ変える
+            if self.chain_count > 1:
+                star_count = min(1 + (self.chain_count - 1) // 2, 5)  # 最大5個まで
+                angles = np.arange(star_count) * 360 / star_count * 3.14159 / 180
+                self.pop_effects.add_many(
+                    len(popped) * star_count,
+                    x=(xs[:, None] + np.cos(angles) * 0.5).ravel(),
+                    y=(ys[:, None] + np.sin(angles) * 0.5).ravel(),
+                    color=np.repeat(colors, star_count),
+                    chain=self.chain_count,
+                    time=self.effect_duration,
+                    radius=0.5)  # マス単位
+            
+            # グリッドから削除
+            for puyo in popped:
+                self.grid[puyo.y][puyo.x] = None
                     
             # 消去音を再生
             if has_sound:
                 pop_sound.play()
             
             # 得点計算
-            chain_power = min(999, self.chain_count * 2)
-            group_bonus = min(999, len(groups) - 1)
-            connection_bonus = 0
-            for group in groups:
-                connection_bonus += min(999, (len(group) - 4) * 1)
-            
-            score_formula = 10 * total_cleared * max(1, chain_power + group_bonus + connection_bonus)
-            self.score += score_formula
+            self.score += calc_chain_score(self.chain_count, [len(group) for group in groups])
             
             # 消去アニメーション待機状態に移行
             self.waiting_for_pop = True
@@ -449,36 +549,28 @@ class PuyoGame:
             return False
     
     def find_connected_puyos(self, x, y, color):
+        # (x, y) のぷよとつながっている同色のぷよを返す
         if (y < 0 or y >= GRID_HEIGHT or x < 0 or x >= GRID_WIDTH or 
-                self.grid[y][x] is None or self.grid[y][x].checked or 
-                self.grid[y][x].color != color):
+                self.grid[y][x] is None or self.grid[y][x].color != color):
             return []
         
-        self.grid[y][x].checked = True
-        result = [self.grid[y][x]]
-        
-        # 上下左右を確認
-        directions = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-        for dx, dy in directions:
-            result.extend(self.find_connected_puyos(x + dx, y + dy, color))
-        
-        return result
+        labels, _ = label_groups(grid_to_cells(self.grid, PUYO_COLORS))
+        label = labels[y * GRID_WIDTH + x]
+        return [self.grid[i // GRID_WIDTH][i % GRID_WIDTH] for i in range(len(labels)) if labels[i] == label]
     
     def fall_puyos(self):
-        # 論理的な落下処理
-        moved = False
-        for y in range(GRID_HEIGHT - 2, -1, -1):
-            for x in range(GRID_WIDTH):
-                if self.grid[y][x] is not None and self.grid[y + 1][x] is None:
-                    # 論理的な位置を更新
-                    self.grid[y + 1][x] = self.grid[y][x]
-                    self.grid[y + 1][x].y = y + 1
-                    self.grid[y + 1][x].target_y = y + 1  # 目標位置を設定
-                    self.grid[y][x] = None
-                    moved = True
-                    self.fall_animation_in_progress = True  # アニメーション中フラグをセット
-        
-        return moved
+        # 論理的な落下処理（各列を一度で下まで詰める）
+        moves = compact_grid(self.grid)
+        for x, src_y, dst_y in moves:
+            # 論理的な位置を更新（visual_y は元の位置のままなので落下アニメーションになる）
+            puyo = self.grid[dst_y][x]
+            puyo.y = dst_y
+            puyo.target_y = dst_y  # 目標位置を設定
+        if moves:
+            self.fall_animation_in_progress = True  # アニメーション中フラグをセット
+        
+        # 動いたぷよの (x, 元の y, 移動先の y) を返す
+        return moves
     
     def play_chain_voice(self, chain_count):
         if chain_count in CHAIN_VOICES:
@@ -530,43 +622,15 @@ class PuyoGame:
             self.last_key_time = current_time
     
     def update_animations(self, dt):
-        # ぷよの消去アニメーション更新
-        for key, pop_state in list(self.puyo_pop_state.items()):
-            pop_state["time"] -= dt
-            
-            # 全体の進行度（0.0〜1.0）
-            progress = 1.0 - (pop_state["time"] / self.effect_duration)
-            pop_state["phase"] = progress
-            
-            # 点滅のためのフラッシュ状態計算（sin波を使用）
-            flash_state = math.sin(progress * self.flash_frequency * math.pi * 2) * 0.5 + 0.5
-            
-            # 消去アニメーションのフェーズで挙動変更 - 連鎖数に関わらず同じ演出
-            if progress < 0.2:  # 最初の20%で膨らむ
-                pop_state["scale"] = 1.0 + (progress / 0.2) * 0.3  # 最大1.3倍まで膨らむ
-                # 点滅しながら明るくなる
-                pop_state["brightness"] = progress / 0.2 * 0.4 * (0.5 + flash_state * 0.5)
-            elif progress < 0.6:  # 20%〜60%は点滅しながら維持
-                pop_state["scale"] = 1.3 - ((progress - 0.2) / 0.4) * 0.1  # わずかに縮む
-                # 点滅する明るさ（0.4〜0.7）
-                pop_state["brightness"] = 0.4 + flash_state * 0.3
-            elif progress < 0.8:  # 60%〜80%は輝きながらゆっくり縮む
-                pop_state["scale"] = 1.2 - ((progress - 0.6) / 0.2) * 0.4  # 1.2倍から0.8倍に
-                # 完全に明るく（0.7〜1.0）
-                pop_state["brightness"] = 0.7 + (progress - 0.6) / 0.2 * 0.3
-            else:  # 残り20%で一気に縮んでいく
-                pop_state["scale"] = 0.8 - ((progress - 0.8) / 0.2) * 0.8  # 0.8倍から0倍に縮む
-                # 最大明るさで消えていく
-                pop_state["brightness"] = 1.0
-            
-            if pop_state["time"] <= 0:
-                del self.puyo_pop_state[key]
+        # ぷよの消去アニメーション更新（タイマーを一斉に減らし、進行度から先に計算したコマを引く）
+        if self.puyo_pop_state:
+            self.puyo_pop_state.tick(dt)
+            progress = 1.0 - self.puyo_pop_state.field("time") / self.effect_duration
+            self.puyo_pop_state.field("frame")[:] = pop_frame(progress)
         
         # エフェクトの更新
-        for effect in self.pop_effects[:]:
-            effect["time"] -= dt
-            if effect["time"] <= 0:
-                self.pop_effects.remove(effect)
+        if self.pop_effects:
+            self.pop_effects.tick(dt)
         
         # 全てのぷよの視覚的な位置を更新
         all_puyos_at_target = True
@@ -584,9 +648,11 @@ class PuyoGame:
     def update(self, dt):
         if self.game_over:
             return
+        self.frame += 1
         
         # アニメーションの更新
-        self.update_animations(dt)
+        with self.profiler.scope("effects"):
+            self.update_animations(dt)
         
         # 消去アニメーション待機処理
         if self.waiting_for_pop:
@@ -619,6 +685,7 @@ class PuyoGame:
             self.fall_time = 0
             if not self.current_pair.move(0, 1):
                 # 移動できなければ固定する
+                self.replay.add(self.current_pair.x, self.current_pair.rotation, self.frame)
                 self.add_puyos_to_grid(self.current_pair.puyo1, self.current_pair.puyo2)
                 # 連鎖チェック
                 if not self.check_matches():
@@ -627,121 +694,61 @@ class PuyoGame:
                     self.check_game_over()
     
     def draw_popping_puyos(self):
-        for key, pop_state in self.puyo_pop_state.items():
-            # 時間に基づいて透明度を計算
-            alpha = int(255 * (pop_state["time"] / self.effect_duration))
-            
-            # 進行度に基づいて点滅
-            progress = 1.0 - (pop_state["time"] / self.effect_duration)
-            flash_state = math.sin(progress * self.flash_frequency * math.pi * 2) * 0.5 + 0.5
-            
-            # 点滅効果を明るさに適用
-            flash_brightness = pop_state["brightness"] * (0.5 + flash_state * 0.5)
+        # 消去中のぷよは、アトラスから今のコマを1回 blit するだけ
+        cell = POP_MAX_RADIUS * 2
+        for x, y, color, chain, frame in self.puyo_pop_state.rows("x", "y", "color", "chain", "frame"):
+            atlas = get_pop_atlas(PUYO_COLORS[color], chain_tier(chain), self.flash_frequency)
+            center_x = BOARD_X + x * PUYO_SIZE + PUYO_SIZE // 2
+            center_y = BOARD_Y + y * PUYO_SIZE + PUYO_SIZE // 2
+            screen.blit(atlas, (center_x - POP_MAX_RADIUS, center_y - POP_MAX_RADIUS), (frame * cell, 0, cell, cell))
+    
+    def draw_star_effects(self):
+        # 星形のエフェクトを描画
+        for effect_x, effect_y, chain, effect_time, effect_radius in self.pop_effects.rows(
+                "x", "y", "chain", "time", "radius"):
+            # 透明度を時間に基づいて変更
+            alpha = int(255 * effect_time / self.effect_duration)
             
-            # 元の色を取得
-            base_color = pop_state["color"][:3]
+            # 星のサイズを計算
+            progress = 1.0 - (effect_time / self.effect_duration)
+            size_factor = 1.0
             
-            # 明るさに基づいて色を変更（白に近づける）
-            color = tuple([min(255, int(c * (1 - flash_brightness) + 255 * flash_brightness)) for c in base_color])
-            color_with_alpha = (*color, alpha)
+            # 時間経過で星のサイズも変更
+            if progress < 0.5:
+                # 最初は大きくなる
+                size_factor = 0.5 + progress * 1.0
+            else:
+                # 後半は小さくなる
+                size_factor = 1.5 - (progress - 0.5) * 1.0
             
-            # 現在のサイズを計算
-            current_radius = int(PUYO_SIZE // 2 * pop_state["scale"])
+            star_radius = effect_radius * PUYO_SIZE * size_factor * 0.6
             
-            # 点灯するぷよを描画
-            if current_radius > 0:
-                s = pygame.Surface((current_radius * 2, current_radius * 2), pygame.SRCALPHA)
-                pygame.draw.circle(s, color_with_alpha, (current_radius, current_radius), current_radius)
-                
-                # 白い光沢も拡大縮小に合わせる
-                highlight_radius = max(1, int(PUYO_SIZE // 8 * pop_state["scale"]))
-                highlight_offset = max(1, int(5 * pop_state["scale"]))
-                
-                # 点滅に合わせて光沢も変える
-                highlight_alpha = min(255, int(alpha * (0.7 + flash_state * 0.3)))
-                pygame.draw.circle(s, (255, 255, 255, highlight_alpha), 
-                                (current_radius - highlight_offset, current_radius - highlight_offset), 
-                                highlight_radius)
-                
-                # 連鎖数に応じた輝きエフェクト
-                chain = pop_state.get("chain", 1)
-                if chain > 1 and flash_brightness > 0.5:
-                    # 内側から外側に広がる輝きの輪
-                    glow_phases = [0.3, 0.6, 0.9]  # 複数の輝きの位相
-                    for glow_phase in glow_phases:
-                        # 位相に基づいてサイズを計算（膨張と収縮を繰り返す）
-                        phase_offset = (pop_state["phase"] * 3 + glow_phase) % 1.0
-                        glow_size = current_radius * (0.6 + phase_offset * 0.8)
-                        
-                        if glow_size > 0:
-                            # 連鎖数に応じた色
-                            if chain <= 3:
-                                glow_color = (255, 255, 100, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
-                            elif chain <= 5:
-                                glow_color = (255, 100, 255, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
-                            else:
-                                glow_color = (100, 255, 255, int(alpha * 0.5 * (1 - phase_offset) * flash_state))
-                                
-                            # 輝きの輪を描画
-                            pygame.draw.circle(s, glow_color, (current_radius, current_radius), 
-                                            glow_size, max(1, int(current_radius * 0.15)))
-                
-                # 画面に描画
-                x, y = pop_state["x"], pop_state["y"]
-                center_x = BOARD_X + x * PUYO_SIZE + PUYO_SIZE // 2
-                center_y = BOARD_Y + y * PUYO_SIZE + PUYO_SIZE // 2
-                screen.blit(s, (center_x - current_radius, center_y - current_radius))
-    
-    def draw_star_effects(self):
-        # 星形のエフェクトを描画
-        for effect in self.pop_effects:
-            if effect.get("type") == "star":
-                # 透明度を時間に基づいて変更
-                alpha = int(255 * effect["time"] / self.effect_duration)
-                
-                # 連鎖数を取得
-                chain = effect.get("chain", 1)
+            if star_radius > 0:
+                s = get_scratch_surface(star_radius * 2, star_radius * 2)
                 
-                # 星のサイズを計算
-                progress = 1.0 - (effect["time"] / self.effect_duration)
-                size_factor = 1.0
-                
-                # 時間経過で星のサイズも変更
-                if progress < 0.5:
-                    # 最初は大きくなる
-                    size_factor = 0.5 + progress * 1.0
-                else:
-                    # 後半は小さくなる
-                    size_factor = 1.5 - (progress - 0.5) * 1.0
-                
-                star_radius = effect["radius"] * size_factor * 0.6
-                
-                if star_radius > 0:
-                    s = pygame.Surface((star_radius * 2, star_radius * 2), pygame.SRCALPHA)
+                # 星の色 - 連鎖数に応じて色を変える
+                star_colors = [
+                    (255, 255, 0, alpha),  # 黄色
+                    (255, 0, 255, alpha),  # マゼンタ
+                    (0, 255, 255, alpha),  # シアン
+                    (255, 165, 0, alpha),  # オレンジ
+                ]
+                star_color = star_colors[(chain - 2) % len(star_colors)]
                     
-                    # 星の色 - 連鎖数に応じて色を変える
-                    star_colors = [
-                        (255, 255, 0, alpha),  # 黄色
-                        (255, 0, 255, alpha),  # マゼンタ
-                        (0, 255, 255, alpha),  # シアン
-                        (255, 165, 0, alpha),  # オレンジ
-                    ]
-                    star_color = star_colors[(chain - 2) % len(star_colors)]
-                        
-                    # 星を描画
-                    points = []
-                    for j in range(8):
-                        point_angle = (j * 45 + 22.5) * 3.14159 / 180
-                        dist = star_radius if j % 2 == 0 else star_radius * 0.4
-                        points.append((
-                            star_radius + math.cos(point_angle) * dist,
-                            star_radius + math.sin(point_angle) * dist
-                        ))
-                    pygame.draw.polygon(s, star_color, points)
-                    
-                    x_pos = BOARD_X + effect["x"] * PUYO_SIZE + PUYO_SIZE // 2 - star_radius
-                    y_pos = BOARD_Y + effect["y"] * PUYO_SIZE + PUYO_SIZE // 2 - star_radius
-                    screen.blit(s, (x_pos, y_pos))
+                # 星を描画
+                points = []
+                for j in range(8):
+                    point_angle = (j * 45 + 22.5) * 3.14159 / 180
+                    dist = star_radius if j % 2 == 0 else star_radius * 0.4
+                    points.append((
+                        star_radius + math.cos(point_angle) * dist,
+                        star_radius + math.sin(point_angle) * dist
+                    ))
+                pygame.draw.polygon(s, star_color, points)
+                
+                x_pos = BOARD_X + effect_x * PUYO_SIZE + PUYO_SIZE // 2 - star_radius
+                y_pos = BOARD_Y + effect_y * PUYO_SIZE + PUYO_SIZE // 2 - star_radius
+                screen.blit(s, (x_pos, y_pos))
     
     def draw(self):
         # 背景を描画
@@ -771,8 +778,7 @@ class PuyoGame:
             self.current_pair.draw()
         
         # 次のぷよペアを表示
-        font = pygame.font.Font(None, 24)
-        next_text = font.render("NEXT", True, WHITE)
+        next_text = render_text("NEXT", 24)
         screen.blit(next_text, (SCREEN_WIDTH - 100, 50))
         
         pygame.draw.circle(screen, self.next_pair.colors[0], 
@@ -790,16 +796,15 @@ class PuyoGame:
                           PUYO_SIZE // 8)
         
         # スコアの表示
-        score_text = font.render(f"SCORE: {self.score}", True, WHITE)
+        score_text = render_text(f"SCORE: {self.score}", 24)
         screen.blit(score_text, (10, 10))
         
         # 連鎖数の表示
         if self.chain_count > 0:
-            chain_text = font.render(f"{self.chain_count} れんさ!", True, WHITE)
+            chain_text = render_text(f"{self.chain_count} れんさ!", 24)
             screen.blit(chain_text, (SCREEN_WIDTH // 2 - 50, 10))
         
         # 操作方法の表示
-        controls_font = pygame.font.Font(None, 18)
         controls = [
             "方向キー: 移動・回転",
             "Z/X: 回転",
@@ -807,54 +812,69 @@ class PuyoGame:
             "R: リスタート"
         ]
         for i, control in enumerate(controls):
-            control_text = controls_font.render(control, True, WHITE)
+            control_text = render_text(control, 18)
             screen.blit(control_text, (10, SCREEN_HEIGHT - 80 + i * 20))
             
         # ゲームオーバー表示
         if self.game_over:
-            game_over_font = pygame.font.Font(None, 48)
-            game_over_text = game_over_font.render("GAME OVER", True, WHITE)
+            game_over_text = render_text("GAME OVER", 48)
             screen.blit(game_over_text, (SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 24))
             
-            restart_font = pygame.font.Font(None, 24)
-            restart_text = restart_font.render("Press R to restart", True, WHITE)
+            restart_text = render_text("Press R to restart", 24)
             screen.blit(restart_text, (SCREEN_WIDTH // 2 - 80, SCREEN_HEIGHT // 2 + 20))
 
+# フレーム時間の統計を左上に重ねて表示する
+def draw_profile_overlay(profiler):
+    for i, line in enumerate(profiler.overlay_lines()):
+        screen.blit(render_text(line, 18, YELLOW), (8, 60 + i * 16))
+
 # メイン関数
 def main():
-    game = PuyoGame()
+    # フレーム時間の計測（連鎖判定とエフェクト更新は PuyoGame の中で個別にも計る。F3 で表示切り替え）
+    profiler = FrameProfiler.from_env()
+    game = PuyoGame(profiler=profiler)
+    game.on_game_over = save_replay  # ゲームオーバーごとに replays/ へリプレイを保存
+    show_profile = False
     last_time = time.time()
     
     while True:
+        profiler.tick()
         current_time = time.time()
         dt = current_time - last_time
         last_time = current_time
         
-        # イベント処理
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == KEYDOWN:
-                if event.key == K_r and game.game_over:
-                    game.reset()
-        
-        # 入力処理
-        keys = pygame.key.get_pressed()
-        game.handle_input(keys)
-        
-        # 操作中のペアのアニメーション更新
-        if not game.falling_puyos and not game.game_over and not game.waiting_for_pop:
-            game.current_pair.update(dt)
-        
-        # ゲーム状態の更新
-        game.update(dt)
-        
-        # 描画
-        game.draw()
-        
-        # 画面の更新
-        pygame.display.flip()
+        with profiler.scope("input"):
+            # イベント処理
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == KEYDOWN:
+                    if event.key == K_r and game.game_over:
+                        game.reset()
+                    elif event.key == K_F3:
+                        show_profile = not show_profile
+            
+            # 入力処理
+            keys = pygame.key.get_pressed()
+            game.handle_input(keys)
+        
+        with profiler.scope("logic"):
+            # 操作中のペアのアニメーション更新
+            if not game.falling_puyos and not game.game_over and not game.waiting_for_pop:
+                game.current_pair.update(dt)
+            
+            # ゲーム状態の更新
+            game.update(dt)
+        
+        with profiler.scope("render"):
+            # 描画
+            game.draw()
+            if show_profile:
+                draw_profile_overlay(profiler)
+            
+            # 画面の更新
+            pygame.display.flip()
         clock.tick(60)
 
 if __name__ == "__main__":
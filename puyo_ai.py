@@ -0,0 +1,267 @@
+# ぷよぷよのAIプレイヤー（連鎖探索）
+#
+# 現在のペアと NEXT の置き方を全部試し、連鎖の得点が最大になる置き場所を探す。
+# 探索の深さが NEXT より深い場合は、その先のペアをランダムに何通りか引いて平均をとる。
+# 1手目の置き場所ごとに部分木を分け、concurrent.futures のプロセスプールで並列に探索する。
+# GUI のイベントループを止めないよう、探索は Future で非同期に進めて結果をポーリングする。
+
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from puyo_engine import (
+    BitBoard, COLUMN_BITS, FULL_MASK, GRID_HEIGHT, NUM_COLORS, SPAWN_X,
+    find_path, generate_placements, resolve_chain,
+)
+
+# 評価の重み
+CONNECTION_WEIGHT = 20   # 同色が隣り合っている組の数（連鎖の種）
+HEIGHT_WEIGHT = 30       # 出現列の高さ（窒息しそうなほど減点）
+LOSS_VALUE = -10 ** 9    # ゲームオーバーになる置き方
+
+TABLE_CAPACITY = 200000  # 置換表に残すエントリ数の上限
+
+
+# 置換表（Zobrist ハッシュをキーにした LRU キャッシュ）
+class TranspositionTable:
+    def __init__(self, capacity=TABLE_CAPACITY):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        # メモリ使用量の調整用のカウンタ
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+# プロセスごとの置換表（ワーカーの中ではタスクをまたいで使い回す）
+_chain_table = None
+_value_table = None
+
+
+def get_tables(capacity=TABLE_CAPACITY):
+    global _chain_table, _value_table
+    if _chain_table is None or _chain_table.capacity != capacity:
+        _chain_table = TranspositionTable(capacity)
+        _value_table = TranspositionTable(capacity)
+    return _chain_table, _value_table
+
+
+def cached_resolve_chain(board, table):
+    # 同じ盤面の連鎖計算は置換表から返す
+    result = table.get(board.zobrist)
+    if result is None:
+        result = resolve_chain(board)
+        table.put(board.zobrist, result)
+    return result
+
+
+def evaluate_board(board):
+    # 連鎖が終わった後の盤面の評価値（大きいほど良い）
+    value = 0
+    for color_board in board.colors:
+        vertical = color_board & (color_board >> 1) & FULL_MASK
+        horizontal = color_board & (color_board >> COLUMN_BITS)
+        value += CONNECTION_WEIGHT * (vertical.bit_count() + horizontal.bit_count())
+    spawn_height = max(board.column_height(SPAWN_X), board.column_height(SPAWN_X + 1))
+    value -= HEIGHT_WEIGHT * spawn_height * spawn_height // GRID_HEIGHT
+    return value
+
+
+def search_value(board, pairs, depth, samples, rng, deadline, tables):
+    # 盤面から depth 手先まで探索した最善値
+    # pairs は分かっているペアの色 [(色1, 色2), ...]、足りない分は samples 通り引いて平均する
+    if depth == 0:
+        return evaluate_board(board)
+    # 置く順番が違っても同じ盤面になれば、残りの探索結果は同じ
+    key = (board.zobrist, depth, pairs)
+    value = tables[1].get(key)
+    if value is not None:
+        return value
+    timed_out = False
+    if pairs:
+        candidates = [pairs[0]]
+        rest = pairs[1:]
+    else:
+        candidates = [(rng.randint(1, NUM_COLORS), rng.randint(1, NUM_COLORS)) for _ in range(samples)]
+        rest = ()
+    total = 0
+    for color1, color2 in candidates:
+        best = LOSS_VALUE
+        for x, rotation in generate_placements(board.column_heights(), color1, color2):
+            value = placement_value(board, x, rotation, color1, color2, rest, depth, samples, rng, deadline, tables)
+            if value > best:
+                best = value
+            # 時間切れならそこまでの最善値で打ち切る
+            if time.time() >= deadline:
+                timed_out = True
+                break
+        total += best
+    value = total // len(candidates)
+    # 打ち切った途中の値は置換表に残さない
+    if not timed_out:
+        tables[1].put(key, value)
+    return value
+
+
+def placement_value(board, x, rotation, color1, color2, rest, depth, samples, rng, deadline, tables):
+    # 置いて連鎖を解決した後の値（連鎖の得点 + その先の最善値）
+    child = board.copy()
+    child.place_pair(x, rotation, color1, color2)
+    result = cached_resolve_chain(child, tables[0])
+    if result.board.is_game_over():
+        return LOSS_VALUE
+    if time.time() >= deadline:
+        return result.score + evaluate_board(result.board)
+    return result.score + search_value(result.board, rest, depth - 1, samples, rng, deadline, tables)
+
+
+def search_subtree(colors, placement, pairs, depth, samples, deadline, seed, capacity=TABLE_CAPACITY):
+    # プロセスプールの1タスク: 1手目を placement に決めた部分木を探索する
+    # 探索値と、このプロセスの置換表のカウンタを返す
+    board = BitBoard(colors)
+    (color1, color2), rest = pairs[0], pairs[1:]
+    rng = random.Random(seed)
+    tables = get_tables(capacity)
+    value = placement_value(board, placement[0], placement[1], color1, color2, rest, depth, samples, rng,
+                            deadline, tables)
+    return value, os.getpid(), {"chain": tables[0].stats(), "value": tables[1].stats()}
+
+
+# 探索中のジョブ
+class SearchJob:
+    def __init__(self, placements, futures, deadline, table_stats):
+        self.placements = placements
+        self.futures = futures
+        self.deadline = deadline
+        self.table_stats = table_stats  # プロセスごとの置換表のカウンタ（PuyoAI と共有）
+
+    def done(self):
+        # 全部終わったか、時間切れで1つ以上終わっていれば結果を出せる
+        finished = sum(1 for future in self.futures if future.done())
+        if finished == len(self.futures):
+            return True
+        return finished > 0 and time.time() >= self.deadline
+
+    def result(self):
+        # 終わった部分木の中で一番良い置き場所（なければ None）
+        best = None
+        best_value = None
+        for placement, future in zip(self.placements, self.futures):
+            if not future.done() or future.cancelled():
+                continue
+            value, pid, stats = future.result()
+            self.table_stats[pid] = stats
+            if best_value is None or value > best_value:
+                best, best_value = placement, value
+        for future in self.futures:
+            future.cancel()
+        return best
+
+
+# 同期実行用の Future 代わり（ワーカー数 0 のとき）
+class _ImmediateFuture:
+    def __init__(self, value):
+        self.value = value
+
+    def done(self):
+        return True
+
+    def cancelled(self):
+        return False
+
+    def cancel(self):
+        return False
+
+    def result(self):
+        return self.value
+
+
+# AIプレイヤー
+class PuyoAI:
+    def __init__(self, depth=2, samples=4, time_budget=0.5, workers=None, seed=None,
+                 table_capacity=TABLE_CAPACITY):
+        self.depth = depth              # 何手先まで読むか（2 = 現在 + NEXT）
+        self.samples = samples          # NEXT より先で引くペアの数
+        self.time_budget = time_budget  # 1手あたりの探索時間（秒）
+        self.workers = workers          # プロセス数（None は CPU 数、0 はプールを使わない）
+        self.table_capacity = table_capacity  # プロセスごとの置換表の上限
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.worker_table_stats = {}
+
+    def _get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def start_search(self, board, current_colors, next_colors):
+        # 探索を始めて SearchJob を返す（呼び出し側は done() をポーリングする）
+        pairs = (tuple(current_colors), tuple(next_colors))
+        placements = generate_placements(board.column_heights(), *pairs[0])
+        deadline = time.time() + self.time_budget
+        futures = []
+        for placement in placements:
+            args = (board.colors, placement, pairs, self.depth, self.samples, deadline, self.rng.random(),
+                    self.table_capacity)
+            if self.workers == 0:
+                futures.append(_ImmediateFuture(search_subtree(*args)))
+            else:
+                futures.append(self._get_executor().submit(search_subtree, *args))
+        return SearchJob(placements, futures, deadline, self.worker_table_stats)
+
+    def choose(self, board, current_colors, next_colors):
+        # 結果が出るまで待って置き場所を返す（ヘッドレス用）
+        job = self.start_search(board, current_colors, next_colors)
+        while not job.done():
+            time.sleep(0.001)
+        return job.result()
+
+    def table_stats(self):
+        # 全プロセスの置換表のカウンタを合計する
+        total = {}
+        for stats in self.worker_table_stats.values():
+            for name, counters in stats.items():
+                merged = total.setdefault(name, dict.fromkeys(counters, 0))
+                for counter, value in counters.items():
+                    merged[counter] += value
+        return total
+
+    def plan_moves(self, board, start, target):
+        # 現在の (列, 回転) から target まで動かす操作名のリスト（最後は "drop"）
+        path = find_path(board.column_heights(), start, target) or []
+        return path + ["drop"]
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
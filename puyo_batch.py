@@ -0,0 +1,151 @@
+# 複数のぷよぷよ盤面をまとめて計算するバッチシミュレータ
+#
+# B 個の盤面を (B, GRID_HEIGHT, GRID_WIDTH) の uint8 配列で持ち、
+# 設置・落下・4連結の判定をすべて NumPy の配列演算で一斉に行う。
+# 盤面ごとの Python ループがないので、処理量はバッチサイズに比例して伸びる。
+
+import numpy as np
+from puyo_engine import GRID_WIDTH, GRID_HEIGHT, CELL_COUNT, EMPTY, ROTATION_DX, BitBoard
+
+_ROTATION_DX = np.array(ROTATION_DX, dtype=np.int64)
+
+
+# バッチシミュレータ
+class PuyoBatch:
+    def __init__(self, batch_size):
+        self.boards = np.zeros((batch_size, GRID_HEIGHT, GRID_WIDTH), dtype=np.uint8)
+        self.scores = np.zeros(batch_size, dtype=np.int64)
+        self.chain_counts = np.zeros(batch_size, dtype=np.int64)  # 直前の連鎖数
+        # 各マスに振るラベル（1始まり、0 は空マス用）
+        self._cell_ids = np.arange(1, CELL_COUNT + 1, dtype=np.int32).reshape(GRID_HEIGHT, GRID_WIDTH)
+
+    @property
+    def batch_size(self):
+        return self.boards.shape[0]
+
+    @classmethod
+    def from_bitboards(cls, bitboards):
+        batch = cls(len(bitboards))
+        for b, board in enumerate(bitboards):
+            batch.boards[b] = board.to_rows()
+        return batch
+
+    def to_bitboard(self, index):
+        return BitBoard.from_rows(self.boards[index].tolist())
+
+    def reset(self, mask=None):
+        # mask が True の盤面（省略時は全部）を空に戻す
+        if mask is None:
+            mask = np.ones(self.batch_size, dtype=bool)
+        self.boards[mask] = EMPTY
+        self.scores[mask] = 0
+        self.chain_counts[mask] = 0
+
+    def column_heights(self):
+        return np.count_nonzero(self.boards, axis=1)
+
+    def game_over(self):
+        # 出現位置の2段目が埋まっている盤面
+        return (self.boards[:, 1, GRID_WIDTH // 2 - 1] != EMPTY) | (self.boards[:, 1, GRID_WIDTH // 2] != EMPTY)
+
+    def place_pairs(self, x, rotation, color1, color2):
+        # 全盤面にペアを一斉に置く（各引数は長さ B の配列）
+        # 置けた盤面を True とした配列を返す（置けない盤面は変更しない）
+        x = np.asarray(x, dtype=np.int64)
+        rotation = np.asarray(rotation, dtype=np.int64)
+        color1 = np.asarray(color1, dtype=np.uint8)
+        color2 = np.asarray(color2, dtype=np.uint8)
+        batch = np.arange(self.batch_size)
+
+        x2 = x + _ROTATION_DX[rotation]
+        in_board = (x >= 0) & (x < GRID_WIDTH) & (x2 >= 0) & (x2 < GRID_WIDTH)
+        x = np.clip(x, 0, GRID_WIDTH - 1)
+        x2 = np.clip(x2, 0, GRID_WIDTH - 1)
+
+        heights = self.column_heights()
+        height1 = heights[batch, x]
+        height2 = heights[batch, x2]
+        vertical = x == x2
+        ok = in_board & np.where(vertical, height1 + 2 <= GRID_HEIGHT,
+                                 (height1 < GRID_HEIGHT) & (height2 < GRID_HEIGHT))
+
+        # 縦置き: 回転 0 は子ぷよが下、回転 2 は軸ぷよが下
+        v = ok & vertical
+        bottom = np.where(rotation == 0, color2, color1)
+        top = np.where(rotation == 0, color1, color2)
+        self.boards[batch[v], GRID_HEIGHT - 1 - height1[v], x[v]] = bottom[v]
+        self.boards[batch[v], GRID_HEIGHT - 2 - height1[v], x[v]] = top[v]
+
+        # 横置き: それぞれの列の一番上に積む（ちぎり）
+        h = ok & ~vertical
+        self.boards[batch[h], GRID_HEIGHT - 1 - height1[h], x[h]] = color1[h]
+        self.boards[batch[h], GRID_HEIGHT - 1 - height2[h], x2[h]] = color2[h]
+        return ok
+
+    def fall_puyos(self):
+        # 全盤面の全列を一度に下へ詰める（空マスを上に寄せる安定ソート）
+        order = np.argsort(self.boards != EMPTY, axis=1, kind="stable")
+        settled = np.take_along_axis(self.boards, order, axis=1)
+        moved = np.any(settled != self.boards, axis=(1, 2))
+        self.boards = settled
+        return moved
+
+    def label_groups(self):
+        # 同色で隣り合うマスにラベルの最大値を広げていき、連結成分ごとに同じラベルにする
+        boards = self.boards
+        occupied = boards != EMPTY
+        labels = np.where(occupied, self._cell_ids, 0)
+        same_down = occupied[:, :-1, :] & (boards[:, :-1, :] == boards[:, 1:, :])
+        same_right = occupied[:, :, :-1] & (boards[:, :, :-1] == boards[:, :, 1:])
+        while True:
+            grown = labels.copy()
+            np.maximum(grown[:, :-1, :], np.where(same_down, labels[:, 1:, :], 0), out=grown[:, :-1, :])
+            np.maximum(grown[:, 1:, :], np.where(same_down, labels[:, :-1, :], 0), out=grown[:, 1:, :])
+            np.maximum(grown[:, :, :-1], np.where(same_right, labels[:, :, 1:], 0), out=grown[:, :, :-1])
+            np.maximum(grown[:, :, 1:], np.where(same_right, labels[:, :, :-1], 0), out=grown[:, :, 1:])
+            if np.array_equal(grown, labels):
+                return labels
+            labels = grown
+
+    def check_matches(self):
+        # 消えるマスのマスクと、盤面ごとのグループの大きさ (B, CELL_COUNT + 1) を返す
+        labels = self.label_groups()
+        batch_size = self.batch_size
+        offsets = (np.arange(batch_size) * (CELL_COUNT + 1)).reshape(-1, 1, 1)
+        sizes = np.bincount((labels + offsets).ravel(), minlength=batch_size * (CELL_COUNT + 1))
+        sizes = sizes.reshape(batch_size, CELL_COUNT + 1)
+        sizes[:, 0] = 0
+        popping = np.take_along_axis(sizes, labels.reshape(batch_size, -1), axis=1) >= 4
+        return popping.reshape(labels.shape), sizes
+
+    def pop_step(self):
+        # 全盤面で1回分の消去を行い、得点を加算する。消えた盤面を True で返す
+        popping, sizes = self.check_matches()
+        popped = popping.any(axis=(1, 2))
+        self.chain_counts = np.where(popped, self.chain_counts + 1, 0)
+
+        # check_matches と同じ得点計算を盤面ごとにまとめて行う
+        group_mask = sizes >= 4
+        group_count = group_mask.sum(axis=1)
+        total_cleared = np.where(group_mask, sizes, 0).sum(axis=1)
+        connection_bonus = np.where(group_mask, np.minimum(999, sizes - 4), 0).sum(axis=1)
+        chain_power = np.minimum(999, self.chain_counts * 2)
+        group_bonus = np.minimum(999, np.maximum(group_count - 1, 0))
+        step_score = 10 * total_cleared * np.maximum(1, chain_power + group_bonus + connection_bonus)
+        self.scores += np.where(popped, step_score, 0)
+
+        self.boards[popping] = EMPTY
+        return popped
+
+    def resolve_chains(self):
+        # 全盤面の連鎖を最後まで計算する。盤面ごとの連鎖数と獲得点を返す
+        start_scores = self.scores.copy()
+        chains = np.zeros(self.batch_size, dtype=np.int64)
+        self.fall_puyos()
+        while True:
+            popped = self.pop_step()
+            if not popped.any():
+                break
+            chains = np.where(popped, self.chain_counts, chains)
+            self.fall_puyos()
+        return chains, self.scores - start_scores
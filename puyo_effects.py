@@ -0,0 +1,89 @@
+# 消去エフェクトの入れ物（GUI 非依存）
+#
+# 消去中のぷよや星形エフェクトを、1個ずつの dict ではなく固定容量の NumPy 構造化配列に詰めて持つ。
+# タイマーの減算と期限切れの判定はフレームごとに配列演算1回で済ませ、
+# 消えた要素の穴は末尾の生きている要素で埋める（swap-remove）ので、大連鎖でも要素の移動は消えた数だけで済む。
+
+import numpy as np
+from puyo_engine import GRID_WIDTH, GRID_HEIGHT
+
+# 消去中のぷよ（color は PUYO_COLORS の番号）
+POP_DTYPE = np.dtype([
+    ("x", np.int16),
+    ("y", np.int16),
+    ("color", np.uint8),
+    ("chain", np.int16),
+    ("time", np.float64),   # 残り時間（秒）
+    ("frame", np.int16),    # 消去アニメーションのコマ番号
+])
+
+# 星形エフェクト（x, y, radius はどれもマス単位。ピクセルへの換算は描画側で PUYO_SIZE を掛ける）
+STAR_DTYPE = np.dtype([
+    ("x", np.float64),
+    ("y", np.float64),
+    ("color", np.uint8),
+    ("chain", np.int16),
+    ("time", np.float64),
+    ("radius", np.float64),
+])
+
+POP_CAPACITY = GRID_WIDTH * GRID_HEIGHT * 2  # 盤面全部が2回分消えても足りる数
+STAR_CAPACITY = POP_CAPACITY * 5             # 1個のぷよから出る星は最大5個
+
+
+# 固定容量のエフェクト置き場
+class EffectPool:
+    def __init__(self, dtype, capacity):
+        self.items = np.zeros(capacity, dtype=dtype)
+        self.count = 0  # 先頭から count 個が生きている
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.items)
+
+    def clear(self):
+        self.count = 0
+
+    def field(self, name):
+        # 生きている要素のフィールド（書き込める view）
+        return self.items[name][:self.count]
+
+    def rows(self, *names):
+        # 描画用に生きている要素を1個ずつ (フィールド, ...) で返す
+        return zip(*(self.items[name][:self.count].tolist() for name in names))
+
+    def add_many(self, count, **values):
+        # count 個をまとめて追加する（値は長さ count の配列か、全要素共通のスカラー）
+        start = self.count
+        end = start + count
+        if end > len(self.items):
+            # 想定を超えたときだけ容量を倍にする
+            grown = np.zeros(max(end, len(self.items) * 2), dtype=self.items.dtype)
+            grown[:start] = self.items[:start]
+            self.items = grown
+        block = self.items[start:end]
+        for name in self.items.dtype.names:
+            block[name] = values.get(name, 0)
+        self.count = end
+
+    def tick(self, dt):
+        # 全要素のタイマーを一斉に減らし、時間切れの要素を取り除く
+        times = self.items["time"][:self.count]
+        times -= dt
+        expired = np.flatnonzero(times <= 0)
+        if len(expired):
+            self.swap_remove(expired)
+
+    def swap_remove(self, indices):
+        # indices の要素を消し、できた穴を末尾の生きている要素で埋める（順不同・重複があってもよい）
+        indices = np.unique(indices)
+        new_count = self.count - len(indices)
+        holes = indices[indices < new_count]
+        if len(holes):
+            tail_alive = np.ones(self.count - new_count, dtype=bool)
+            tail_alive[indices[indices >= new_count] - new_count] = False
+            self.items[holes] = self.items[new_count + np.flatnonzero(tail_alive)]
+        self.count = new_count
@@ -0,0 +1,512 @@
+# ぷよぷよのヘッドレスエンジン（ビットボード版）
+#
+# 盤面を色ごとのビットボード（Python の int）と占有マスクで保持する。
+# GUI には一切依存しないので、ボットやシミュレーションからそのまま使える。
+#
+# ビット配置: 1列あたり COLUMN_BITS ビットのレーンを使い、
+#   bit = x * COLUMN_BITS + (GRID_HEIGHT - 1 - y)
+# とする（y は画面と同じく上が0）。各レーンの bit0 が列の一番下になるので、
+# 列の高さはレーンのビット数、落下はレーンを下位ビットに詰める操作になる。
+
+import random
+
+# 定数
+GRID_WIDTH = 6
+GRID_HEIGHT = 12
+NUM_COLORS = 4  # 色番号は 1〜NUM_COLORS、0 は空マス
+EMPTY = 0
+
+COLUMN_BITS = 16
+COLUMN_MASK = (1 << GRID_HEIGHT) - 1
+FULL_MASK = 0
+for _x in range(GRID_WIDTH):
+    FULL_MASK |= COLUMN_MASK << (_x * COLUMN_BITS)
+del _x
+
+# 回転（PuyoPair.rotation と同じ）: 0: 上, 1: 右, 2: 下, 3: 左
+# 軸ぷよ（puyo1）から見た子ぷよ（puyo2）の列のずれ
+ROTATION_DX = (0, 1, 0, -1)
+
+# ペアの出現列（PuyoGameLogic.create_new_pair と同じ）
+SPAWN_X = GRID_WIDTH // 2 - 1
+
+
+def cell_bit(x, y):
+    # マス (x, y) に対応するビット
+    return 1 << (x * COLUMN_BITS + GRID_HEIGHT - 1 - y)
+
+
+def bit_to_cell(index):
+    # ビット番号からマス (x, y) を求める
+    x, row = divmod(index, COLUMN_BITS)
+    return x, GRID_HEIGHT - 1 - row
+
+
+def iter_cells(mask):
+    # マスクに含まれるマスを (x, y) で列挙する
+    while mask:
+        low = mask & -mask
+        yield bit_to_cell(low.bit_length() - 1)
+        mask ^= low
+
+
+# Zobrist ハッシュの乱数表（色 × ビット番号）。プロセスをまたいでも同じ値になるよう固定シードで作る
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST = tuple(
+    tuple(_zobrist_rng.getrandbits(64) for _ in range(GRID_WIDTH * COLUMN_BITS))
+    for _ in range(NUM_COLORS)
+)
+del _zobrist_rng
+
+
+def zobrist_mask(color, mask):
+    # 色番号 color のぷよが mask のマスにあるときのハッシュ成分
+    table = ZOBRIST[color - 1]
+    value = 0
+    while mask:
+        low = mask & -mask
+        value ^= table[low.bit_length() - 1]
+        mask ^= low
+    return value
+
+
+# ツモ（ペアの色の並び）。アーケード版のように 65536 ペアの表を先に作っておく
+SEQUENCE_LENGTH = 65536
+SEED_LIMIT = 1 << 64  # シードは 0 <= seed < SEED_LIMIT（リプレイに u64 で書き出すため）
+PAIR_CODES = NUM_COLORS * NUM_COLORS  # 1ペア = (色1 - 1) * NUM_COLORS + (色2 - 1) の1バイト
+# 乱数バイトをペアの番号に変換する表（256 は PAIR_CODES で割り切れるので偏らない）
+_PAIR_CODE_TABLE = bytes(i % PAIR_CODES for i in range(256))
+
+
+# シード付きのツモ生成器
+class PuyoSequence:
+    __slots__ = ("seed", "table", "index")
+
+    def __init__(self, seed=None, length=SEQUENCE_LENGTH):
+        # 同じシードならプロセスやマシンが違っても同じ並びになる
+        if seed is None:
+            seed = random.getrandbits(32)
+        elif not 0 <= seed < SEED_LIMIT:
+            raise ValueError(f"seed must be in 0 <= seed < 2**64: {seed}")
+        self.seed = seed
+        self.table = random.Random(seed).randbytes(length).translate(_PAIR_CODE_TABLE)
+        self.index = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def pair_at(self, index):
+        # index 番目のペアの色番号 (色1, 色2)。表の長さを超えたら先頭に戻る
+        code = self.table[index % len(self.table)]
+        return code // NUM_COLORS + 1, code % NUM_COLORS + 1
+
+    def next_pair(self):
+        pair = self.pair_at(self.index)
+        self.index += 1
+        return pair
+
+
+# ゲームオーバー判定に使うマス（出現位置の2段目）
+GAME_OVER_MASK = cell_bit(GRID_WIDTH // 2 - 1, 1) | cell_bit(GRID_WIDTH // 2, 1)
+
+
+def neighbors(mask):
+    # 上下左右に1マス広げたマスク（盤外は切り捨てる）
+    return ((mask << 1) | (mask >> 1) | (mask << COLUMN_BITS) | (mask >> COLUMN_BITS)) & FULL_MASK
+
+
+# フラット配列（i = y * GRID_WIDTH + x）の上下左右の添字を前計算しておく
+CELL_COUNT = GRID_WIDTH * GRID_HEIGHT
+NEIGHBOR_TABLE = tuple(
+    tuple(
+        (y + dy) * GRID_WIDTH + (x + dx)
+        for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0))
+        if 0 <= x + dx < GRID_WIDTH and 0 <= y + dy < GRID_HEIGHT
+    )
+    for y in range(GRID_HEIGHT)
+    for x in range(GRID_WIDTH)
+)
+
+# 探索用のスタック（呼び出しごとに確保しないよう使い回す）
+_label_stack = [0] * CELL_COUNT
+
+
+def grid_to_cells(grid, palette):
+    # Puyo オブジェクトのグリッドを色番号のフラット配列にする（0 は空）
+    cells = [EMPTY] * CELL_COUNT
+    i = 0
+    for row in grid:
+        for puyo in row:
+            if puyo is not None:
+                cells[i] = palette.index(puyo.color) + 1
+            i += 1
+    return cells
+
+
+def label_groups(cells):
+    # 盤面全体を一度の走査でラベル付けする（非再帰のフラッドフィル）
+    # labels[i] はグループ番号（空マスは -1）、sizes[label] はそのグループのぷよ数
+    labels = [-1] * CELL_COUNT
+    sizes = []
+    stack = _label_stack
+    neighbor_table = NEIGHBOR_TABLE
+    for start in range(CELL_COUNT):
+        color = cells[start]
+        if color == EMPTY or labels[start] >= 0:
+            continue
+        label = len(sizes)
+        labels[start] = label
+        stack[0] = start
+        top = 1
+        size = 0
+        while top:
+            top -= 1
+            i = stack[top]
+            size += 1
+            for j in neighbor_table[i]:
+                if labels[j] < 0 and cells[j] == color:
+                    labels[j] = label
+                    stack[top] = j
+                    top += 1
+        sizes.append(size)
+    return labels, sizes
+
+
+def collect_groups(labels, sizes, min_size=4):
+    # min_size 以上のグループをマスの添字リストにまとめる（左上から見つかった順）
+    index_of = {}
+    groups = []
+    for i, label in enumerate(labels):
+        if label >= 0 and sizes[label] >= min_size:
+            k = index_of.get(label)
+            if k is None:
+                index_of[label] = k = len(groups)
+                groups.append([])
+            groups[k].append(i)
+    return groups
+
+
+def compact_grid(grid):
+    # グリッド（上の行から、空は None）の各列を一度の走査で下に詰める
+    # 動いたマスを (x, 元の y, 移動先の y) のリストで返す
+    moves = []
+    for x in range(GRID_WIDTH):
+        dst = GRID_HEIGHT - 1
+        for y in range(GRID_HEIGHT - 1, -1, -1):
+            cell = grid[y][x]
+            if cell is not None:
+                if y != dst:
+                    grid[dst][x] = cell
+                    grid[y][x] = None
+                    moves.append((x, y, dst))
+                dst -= 1
+    return moves
+
+
+def calc_chain_score(chain_count, group_sizes):
+    # check_matches と同じ得点計算
+    chain_power = min(999, chain_count * 2)
+    group_bonus = min(999, len(group_sizes) - 1)
+    connection_bonus = 0
+    for size in group_sizes:
+        connection_bonus += min(999, (size - 4) * 1)
+    return 10 * sum(group_sizes) * max(1, chain_power + group_bonus + connection_bonus)
+
+
+# ビットボード盤面
+class BitBoard:
+    __slots__ = ("colors", "occupied", "zobrist")
+
+    def __init__(self, colors=None):
+        # colors[i] は色番号 i + 1 のビットボード
+        # zobrist は盤面の Zobrist ハッシュで、置く・消す・落とすたびに差分で更新する
+        self.colors = list(colors) if colors is not None else [0] * NUM_COLORS
+        self.occupied = 0
+        self.zobrist = 0
+        for i, board in enumerate(self.colors):
+            self.occupied |= board
+            self.zobrist ^= zobrist_mask(i + 1, board)
+
+    @classmethod
+    def from_grid(cls, grid, palette):
+        # Puyo オブジェクトのグリッドから変換する（palette は PUYO_COLORS）
+        board = cls()
+        for y in range(GRID_HEIGHT):
+            for x in range(GRID_WIDTH):
+                puyo = grid[y][x]
+                if puyo is not None:
+                    board.set(x, y, palette.index(puyo.color) + 1)
+        return board
+
+    @classmethod
+    def from_rows(cls, rows):
+        # 色番号の2次元リスト（上の行から）から変換する
+        board = cls()
+        for y, row in enumerate(rows):
+            for x, color in enumerate(row):
+                if color != EMPTY:
+                    board.set(x, y, color)
+        return board
+
+    def to_rows(self):
+        # 色番号の2次元リスト（上の行から）に変換する
+        rows = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+        for i, board in enumerate(self.colors):
+            for x, y in iter_cells(board):
+                rows[y][x] = i + 1
+        return rows
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.colors = self.colors[:]
+        board.occupied = self.occupied
+        board.zobrist = self.zobrist
+        return board
+
+    def __eq__(self, other):
+        return isinstance(other, BitBoard) and self.colors == other.colors
+
+    def __repr__(self):
+        lines = ["".join(".RGBY"[c] if c <= 4 else str(c) for c in row) for row in self.to_rows()]
+        return "BitBoard(\n  " + "\n  ".join(lines) + "\n)"
+
+    def get(self, x, y):
+        bit = cell_bit(x, y)
+        if not self.occupied & bit:
+            return EMPTY
+        for i, board in enumerate(self.colors):
+            if board & bit:
+                return i + 1
+        return EMPTY
+
+    def set(self, x, y, color):
+        bit = cell_bit(x, y)
+        if self.occupied & bit:
+            old = self.get(x, y)
+            self.colors[old - 1] &= ~bit
+            self.occupied &= ~bit
+            self.zobrist ^= zobrist_mask(old, bit)
+        if color != EMPTY:
+            self.colors[color - 1] |= bit
+            self.occupied |= bit
+            self.zobrist ^= zobrist_mask(color, bit)
+
+    def remove(self, mask):
+        # マスクのぷよを盤面から取り除く
+        keep = ~mask
+        for i, board in enumerate(self.colors):
+            removed = board & mask
+            if removed:
+                self.zobrist ^= zobrist_mask(i + 1, removed)
+                self.colors[i] = board & keep
+        self.occupied &= keep
+
+    def column_height(self, x):
+        return ((self.occupied >> (x * COLUMN_BITS)) & COLUMN_MASK).bit_count()
+
+    def column_heights(self):
+        occupied = self.occupied
+        return [((occupied >> (x * COLUMN_BITS)) & COLUMN_MASK).bit_count() for x in range(GRID_WIDTH)]
+
+    def count(self):
+        return self.occupied.bit_count()
+
+    def place_pair(self, x, rotation, color1, color2):
+        # ペアを列 x・回転 rotation で上から落として置く（ちぎりも含む）
+        # 置けなければ盤面を変えずに False を返す
+        x2 = x + ROTATION_DX[rotation]
+        if not (0 <= x < GRID_WIDTH and 0 <= x2 < GRID_WIDTH):
+            return False
+        if x == x2:
+            height = self.column_height(x)
+            if height + 2 > GRID_HEIGHT:
+                return False
+            # 回転 0 は子ぷよが下、回転 2 は軸ぷよが下
+            bottom, top = (color2, color1) if rotation == 0 else (color1, color2)
+            self._push(x, height, bottom)
+            self._push(x, height + 1, top)
+        else:
+            height1 = self.column_height(x)
+            height2 = self.column_height(x2)
+            if height1 >= GRID_HEIGHT or height2 >= GRID_HEIGHT:
+                return False
+            self._push(x, height1, color1)
+            self._push(x2, height2, color2)
+        return True
+
+    def _push(self, x, row, color):
+        # 列 x の下から row 段目（0始まり）にぷよを置く
+        index = x * COLUMN_BITS + row
+        bit = 1 << index
+        self.colors[color - 1] |= bit
+        self.occupied |= bit
+        self.zobrist ^= ZOBRIST[color - 1][index]
+
+    def fall_puyos(self):
+        # 浮いているぷよを列ごとに一度で下に詰める
+        # 動いたぷよを (x, 元の y, 移動先の y) のリストで返す（動かなければ空）
+        moves = []
+        occupied = self.occupied
+        for x in range(GRID_WIDTH):
+            shift = x * COLUMN_BITS
+            lane = (occupied >> shift) & COLUMN_MASK
+            # 下から隙間なく詰まっていれば何もしない
+            if lane & (lane + 1) == 0:
+                continue
+            lane_mask = COLUMN_MASK << shift
+            row = 0
+            rest = lane
+            while rest:
+                low = rest & -rest
+                src = low.bit_length() - 1
+                if src != row:
+                    moves.append((x, GRID_HEIGHT - 1 - src, GRID_HEIGHT - 1 - row))
+                row += 1
+                rest ^= low
+            for i, board in enumerate(self.colors):
+                color_lane = (board >> shift) & COLUMN_MASK
+                if not color_lane:
+                    continue
+                packed = 0
+                dst = 1
+                rest = lane
+                while rest:
+                    low = rest & -rest
+                    if color_lane & low:
+                        packed |= dst
+                    dst <<= 1
+                    rest ^= low
+                self.colors[i] = (board & ~lane_mask) | (packed << shift)
+                self.zobrist ^= zobrist_mask(i + 1, color_lane << shift) ^ zobrist_mask(i + 1, packed << shift)
+            self.occupied = (self.occupied & ~lane_mask) | (((1 << lane.bit_count()) - 1) << shift)
+        return moves
+
+    def check_matches(self):
+        # 4つ以上つながったグループを (色番号, マスク) のリストで返す
+        groups = []
+        for i, board in enumerate(self.colors):
+            # 同色の隣がないぷよは最初から候補にしない
+            rest = board & neighbors(board)
+            while rest:
+                group = rest & -rest
+                while True:
+                    grown = (group | neighbors(group)) & board
+                    if grown == group:
+                        break
+                    group = grown
+                rest &= ~group
+                if group.bit_count() >= 4:
+                    groups.append((i + 1, group))
+        return groups
+
+    def pop_groups(self, groups):
+        # check_matches の結果を消す
+        mask = 0
+        for _, group in groups:
+            mask |= group
+        self.remove(mask)
+
+    def is_game_over(self):
+        return bool(self.occupied & GAME_OVER_MASK)
+
+
+# 連鎖の計算結果
+class ChainResult:
+    __slots__ = ("steps", "step_scores", "chain_count", "score", "board")
+
+    def __init__(self, steps, step_scores, board):
+        self.steps = steps              # 連鎖ごとに消えたグループ [(色番号, マスク), ...]
+        self.step_scores = step_scores  # 連鎖ごとの得点
+        self.chain_count = len(steps)
+        self.score = sum(step_scores)
+        self.board = board              # 連鎖が終わった後の盤面
+
+    def __repr__(self):
+        return f"ChainResult(chain_count={self.chain_count}, score={self.score})"
+
+
+def resolve_chain(board):
+    # 消去→落下→消去… を連鎖が止まるまで一度に計算する（アニメーション待ちなし）
+    # 引数の盤面は変更しない
+    board = board.copy()
+    board.fall_puyos()
+    steps = []
+    step_scores = []
+    while True:
+        groups = board.check_matches()
+        if not groups:
+            break
+        steps.append(groups)
+        step_scores.append(calc_chain_score(len(steps), [group.bit_count() for _, group in groups]))
+        board.pop_groups(groups)
+        board.fall_puyos()
+    return ChainResult(steps, step_scores, board)
+
+
+# 置き場所の一覧のキャッシュ（列ごとの上の空き 0/1/2以上 の組 → 置き場所）
+_placement_cache = {}
+
+
+# ペアの操作: (名前, 列の変化, 回転の変化)
+PAIR_MOVES = (("left", -1, 0), ("right", 1, 0), ("cw", 0, 1), ("ccw", 0, -1))
+
+
+def _state_valid(free, x, rotation):
+    # 最上段にいるペアが (列, 回転) の状態を取れるか
+    # 縦向きは上2段、横向きは両方の列の最上段が空いていれば通れる
+    x2 = x + ROTATION_DX[rotation]
+    if not (0 <= x < GRID_WIDTH and 0 <= x2 < GRID_WIDTH):
+        return False
+    if x == x2:
+        return free[x] >= 2
+    return free[x] >= 1 and free[x2] >= 1
+
+
+def _search_states(free, start):
+    # start から左右移動と回転でたどり着ける状態を幅優先で探す
+    # 各状態の一つ前の (状態, 操作名) を返す
+    if not _state_valid(free, *start):
+        return {}
+    parents = {start: None}
+    queue = [start]
+    for x, rotation in queue:
+        for name, dx, dr in PAIR_MOVES:
+            state = (x + dx, (rotation + dr) % 4)
+            if state not in parents and _state_valid(free, *state):
+                parents[state] = ((x, rotation), name)
+                queue.append(state)
+    return parents
+
+
+def _search_placements(free):
+    # 出現位置からたどり着ける (列, 回転) の一覧
+    return tuple(sorted(_search_states(free, (SPAWN_X, 0))))
+
+
+def find_path(heights, start, target):
+    # start の (列, 回転) から target まで動かす操作名のリスト（届かなければ None）
+    free = [GRID_HEIGHT - h for h in heights]
+    parents = _search_states(free, start)
+    if target not in parents:
+        return None
+    path = []
+    state = target
+    while parents[state] is not None:
+        state, name = parents[state]
+        path.append(name)
+    path.reverse()
+    return path
+
+
+def generate_placements(heights, color1=None, color2=None):
+    # ペアの最終的な置き場所 (列, 回転) を一度に全部返す（最大22通り）
+    # heights は BitBoard.column_heights() の列の高さ
+    # 2つの色が同じなら、同じ盤面になる置き方は1つにまとめる
+    key = tuple(min(GRID_HEIGHT - h, 2) for h in heights)
+    placements = _placement_cache.get(key)
+    if placements is None:
+        placements = _placement_cache[key] = _search_placements(key)
+    if color1 is not None and color1 == color2:
+        return [(x, rotation) for x, rotation in placements
+                if rotation in (0, 1) or (rotation == 3 and (x - 1, 1) not in placements)]
+    return list(placements)
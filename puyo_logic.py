@@ -0,0 +1,572 @@
+# ぷよぷよのゲームロジック（GUI 非依存）
+#
+# PyQt5 や pygame を読み込まないので、ディスプレイのないシミュレーション用ノードでも import できる。
+# 操作はキーコードではなく Action で受け付け、キーとの対応は表示側（puyo2.py）が持つ。
+
+import enum
+import math
+import random
+import time
+import numpy as np
+from puyo_effects import EffectPool, POP_DTYPE, STAR_DTYPE, POP_CAPACITY, STAR_CAPACITY
+from frame_profiler import FrameProfiler
+from puyo_replay import Replay
+from puyo_engine import (
+    BitBoard, PuyoSequence, grid_to_cells, label_groups, collect_groups, compact_grid, calc_chain_score,
+    generate_placements,
+)
+
+# 定数
+GRID_WIDTH = 6
+GRID_HEIGHT = 12
+
+# ぷよの色（RGB。本物のぷよぷよ通に合わせる）
+RED = (255, 50, 50)       # より鮮やかな赤
+GREEN = (20, 200, 20)     # よりぷよぷよらしい緑
+BLUE = (50, 80, 255)      # より濃い青
+YELLOW = (255, 230, 0)    # より明るい黄色
+PUYO_COLORS = [RED, GREEN, BLUE, YELLOW]  # 基本の4色
+
+
+# 操作
+class Action(enum.IntEnum):
+    LEFT = 0
+    RIGHT = 1
+    DOWN = 2
+    ROTATE_CW = 3
+    ROTATE_CCW = 4
+    DROP = 5
+    RESTART = 6
+
+
+# AI の操作名（puyo_engine.find_path）と Action の対応
+MOVE_ACTIONS = {
+    "left": Action.LEFT,
+    "right": Action.RIGHT,
+    "cw": Action.ROTATE_CW,
+    "ccw": Action.ROTATE_CCW,
+    "drop": Action.DROP
+}
+
+# 消去アニメーションは進行度だけで決まるので、表示側がコマ数ぶんを先に描いておく
+POP_FRAMES = 90  # 消去アニメーションのコマ数（1.5秒を60FPSで）
+POP_GLOW_CHAINS = (1, 2, 4, 6)  # 輝きの輪の段階ごとの代表の連鎖数
+
+
+def pop_curve(progress, flash_frequency):
+    # 進行度（0.0〜1.0）での消去中ぷよの (大きさ, 明るさ)
+    # 点滅のためのフラッシュ状態計算（sin波を使用）
+    flash_state = math.sin(progress * flash_frequency * math.pi * 2) * 0.5 + 0.5
+    
+    # 消去アニメーションのフェーズで挙動変更 - 連鎖数に関わらず同じ演出
+    if progress < 0.2:  # 最初の20%で膨らむ
+        scale = 1.0 + (progress / 0.2) * 0.3  # 最大1.3倍まで膨らむ
+        # 点滅しながら明るくなる
+        brightness = progress / 0.2 * 0.4 * (0.5 + flash_state * 0.5)
+    elif progress < 0.6:  # 20%〜60%は点滅しながら維持
+        scale = 1.3 - ((progress - 0.2) / 0.4) * 0.1  # わずかに縮む
+        # 点滅する明るさ（0.4〜0.7）
+        brightness = 0.4 + flash_state * 0.3
+    elif progress < 0.8:  # 60%〜80%は輝きながらゆっくり縮む
+        scale = 1.2 - ((progress - 0.6) / 0.2) * 0.4  # 1.2倍から0.8倍に
+        # 完全に明るく（0.7〜1.0）
+        brightness = 0.7 + (progress - 0.6) / 0.2 * 0.3
+    else:  # 残り20%で一気に縮んでいく
+        scale = 0.8 - ((progress - 0.8) / 0.2) * 0.8  # 0.8倍から0倍に縮む
+        # 最大明るさで消えていく
+        brightness = 1.0
+    return scale, brightness
+
+
+def pop_frame_progress(frame, frames=POP_FRAMES):
+    # コマ番号の進行度
+    return frame / (frames - 1)
+
+
+def pop_frame(progress, frames=POP_FRAMES):
+    # 進行度に一番近いコマの番号（progress は配列でもよい）
+    return np.clip(np.floor(np.asarray(progress) * (frames - 1) + 0.5), 0, frames - 1).astype(np.int16)
+
+
+def chain_tier(chain):
+    # 輝きの輪の段階（0: 輪なし、1: 3連鎖まで、2: 5連鎖まで、3: それ以上）
+    if chain <= 1:
+        return 0
+    if chain <= 3:
+        return 1
+    if chain <= 5:
+        return 2
+    return 3
+
+# ぷよぷよのクラス
+class Puyo:
+    def __init__(self, x, y, color):
+        self.x = x
+        self.y = y
+        self.color = color
+        self.falling = True
+        self.connected = False
+        self.visual_y = y  # 表示上の位置
+        self.target_y = y  # 目標位置
+        self.eyes_open = True  # 目の開閉状態
+        self.blink_timer = random.uniform(2.0, 5.0)   # まばたきタイマー
+
+    def update(self, dt):
+        # 視覚的な位置を目標位置に近づける
+        if self.visual_y < self.target_y:
+            self.visual_y = min(self.target_y, self.visual_y + dt * 10)  # 落下速度を調整
+        
+        # まばたき処理
+        self.blink_timer -= dt
+        if self.blink_timer <= 0:
+            self.eyes_open = not self.eyes_open
+            # 目を開けている時間は長く、閉じている時間は短く
+            if self.eyes_open:
+                self.blink_timer = random.uniform(2.0, 5.0)  # 2〜5秒開ける
+            else:
+                self.blink_timer = random.uniform(0.1, 0.3)  # 0.1〜0.3秒閉じる
+
+# ぷよぷよのペアクラス
+class PuyoPair:
+    def __init__(self, x, grid, colors=None):
+        self.x = x
+        self.y = 0
+        self.rotation = 0  # 0: 上, 1: 右, 2: 下, 3: 左
+        self.grid = grid
+        if colors is None:
+            colors = [random.choice(PUYO_COLORS), random.choice(PUYO_COLORS)]
+        self.colors = list(colors)
+        self.puyo1 = Puyo(x, 0, self.colors[0])
+        self.puyo2 = Puyo(x, 1, self.colors[1])
+        
+        # 初期状態では視覚的な位置を論理位置より上に設定（上から落ちてくる演出）
+        self.puyo1.visual_y = -1
+        self.puyo2.visual_y = 0
+        self.puyo1.target_y = 0
+        self.puyo2.target_y = 1
+    
+    def rotate(self, direction):
+        # 1: 時計回り, -1: 反時計回り
+        old_rotation = self.rotation
+        self.rotation = (self.rotation + direction) % 4
+        
+        # 回転後の位置をチェック
+        if not self.can_rotate():
+            # 回転できなければ元に戻す
+            self.rotation = old_rotation
+            return False
+            
+        self.update_positions()
+        
+        # 回転後に視覚的な位置も即座に更新
+        self.puyo1.visual_y = self.puyo1.y
+        self.puyo2.visual_y = self.puyo2.y
+        
+        return True
+    
+    def can_rotate(self):
+        # 回転先の位置をチェック
+        rot = self.rotation
+        new_x1, new_y1 = self.x, self.y
+        
+        if rot == 0:  # 上
+            new_x2, new_y2 = self.x, self.y + 1
+        elif rot == 1:  # 右
+            new_x2, new_y2 = self.x + 1, self.y
+        elif rot == 2:  # 下
+            new_x2, new_y2 = self.x, self.y + 1
+        elif rot == 3:  # 左
+            new_x2, new_y2 = self.x - 1, self.y
+            
+        # グリッド内にあるか
+        if (new_x1 < 0 or new_x1 >= GRID_WIDTH or new_y1 < 0 or new_y1 >= GRID_HEIGHT or
+            new_x2 < 0 or new_x2 >= GRID_WIDTH or new_y2 < 0 or new_y2 >= GRID_HEIGHT):
+            return False
+            
+        # 他のぷよと重ならないか
+        if (self.grid[new_y1][new_x1] is not None or self.grid[new_y2][new_x2] is not None):
+            return False
+            
+        return True
+    
+    def update_positions(self):
+        if self.rotation == 0:  # 上
+            self.puyo1.x = self.x
+            self.puyo1.y = self.y
+            self.puyo2.x = self.x
+            self.puyo2.y = self.y + 1
+        elif self.rotation == 1:  # 右
+            self.puyo1.x = self.x
+            self.puyo1.y = self.y
+            self.puyo2.x = self.x + 1
+            self.puyo2.y = self.y
+        elif self.rotation == 2:  # 下
+            self.puyo1.x = self.x
+            self.puyo1.y = self.y + 1
+            self.puyo2.x = self.x
+            self.puyo2.y = self.y
+        elif self.rotation == 3:  # 左
+            self.puyo1.x = self.x
+            self.puyo1.y = self.y
+            self.puyo2.x = self.x - 1
+            self.puyo2.y = self.y
+        
+        # ターゲット位置も更新
+        self.puyo1.target_y = self.puyo1.y
+        self.puyo2.target_y = self.puyo2.y
+    
+    def move(self, dx, dy):
+        new_x = self.x + dx
+        new_y = self.y + dy
+        
+        # 移動先がグリッド内にあるか確認
+        if self.can_move(new_x, new_y):
+            self.x = new_x
+            self.y = new_y
+            
+            # 視覚的な位置も更新
+            if dy > 0:  # 下に移動する場合
+                self.puyo1.target_y = self.puyo1.y
+                self.puyo2.target_y = self.puyo2.y
+            else:  # それ以外の移動の場合は即座に視覚的位置も更新
+                self.puyo1.visual_y = self.puyo1.y
+                self.puyo2.visual_y = self.puyo2.y
+                
+            self.update_positions()
+            return True
+        return False
+        
+    def drop_to_bottom(self):
+        # 一番下まで落とす（ちぎり機能）
+        # 1マスずつ動かさず、下の空きマス数から落下量を一度で求める
+        dy = min(self.free_below(self.puyo1.x, self.puyo1.y), self.free_below(self.puyo2.x, self.puyo2.y))
+        if dy > 0:
+            self.move(0, dy)
+    
+    def free_below(self, x, y):
+        # (x, y) の真下に続く空きマスの数（ペア自身のマスは空きとみなす）
+        count = 0
+        for below in range(y + 1, GRID_HEIGHT):
+            if self.grid[below][x] is not None:
+                break
+            count += 1
+        return count
+    
+    def can_move(self, new_x, new_y):
+        rot = self.rotation
+        # 上
+        if rot == 0:
+            if new_x < 0 or new_x >= GRID_WIDTH or new_y < 0 or new_y + 1 >= GRID_HEIGHT:
+                return False
+            if self.grid[new_y][new_x] is not None or self.grid[new_y + 1][new_x] is not None:
+                return False
+        # 右
+        elif rot == 1:
+            if new_x < 0 or new_x + 1 >= GRID_WIDTH or new_y < 0 or new_y >= GRID_HEIGHT:
+                return False
+            if self.grid[new_y][new_x] is not None or self.grid[new_y][new_x + 1] is not None:
+                return False
+        # 下
+        elif rot == 2:
+            if new_x < 0 or new_x >= GRID_WIDTH or new_y < 0 or new_y + 1 >= GRID_HEIGHT:
+                return False
+            if self.grid[new_y][new_x] is not None or self.grid[new_y + 1][new_x] is not None:
+                return False
+        # 左
+        elif rot == 3:
+            if new_x - 1 < 0 or new_x >= GRID_WIDTH or new_y < 0 or new_y >= GRID_HEIGHT:
+                return False
+            if self.grid[new_y][new_x] is not None or self.grid[new_y][new_x - 1] is not None:
+                return False
+        return True
+
+    def update(self, dt):
+        # ぷよの視覚的な位置を更新
+        self.puyo1.update(dt)
+        self.puyo2.update(dt)
+
+# ゲームロジッククラス
+class PuyoGameLogic:
+    def __init__(self, seed=None, profiler=None):
+        self.on_chain = None  # 連鎖が起きたときに連鎖数を渡して呼ぶ関数
+        # 連鎖判定（collision）とエフェクト更新（effects）を計るプロファイラ（省略時は何もしない）
+        self.profiler = profiler if profiler is not None else FrameProfiler(enabled=False)
+        self.on_game_over = None  # ゲームオーバーになったときにリプレイを渡して呼ぶ関数
+        self.reset(seed)
+    
+    def reset(self, seed=None):
+        # seed を渡すと同じツモの並びで遊べる（省略時は毎回新しいシード）
+        self.sequence = PuyoSequence(seed)
+        self.replay = Replay(self.sequence.seed)  # 置いた場所の記録
+        self.frame = 0  # update を呼んだ回数（リプレイのフレーム番号）
+        self.grid = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        self.current_pair = self.create_new_pair()
+        self.next_pair = self.create_new_pair()
+        self.fall_time = 0
+        self.fall_speed = 0.5  # ぷよが1マス落ちる時間（秒）
+        self.game_over = False
+        self.score = 0
+        self.chain_count = 0
+        self.falling_puyos = False
+        self.last_key_time = 0
+        self.key_delay = 0.15  # キー入力の遅延（秒）
+        self.last_rotation_time = 0
+        self.rotation_delay = 0.25  # 回転の遅延（秒）
+        self.pop_effects = EffectPool(STAR_DTYPE, STAR_CAPACITY)  # 星形エフェクト
+        self.effect_duration = 1.5  # エフェクトの持続時間を1.5秒に延長
+        self.puyo_pop_state = EffectPool(POP_DTYPE, POP_CAPACITY)  # ぷよの消去状態を管理
+        self.flash_frequency = 8  # 点滅の頻度（1秒あたりの回数）
+        self.waiting_for_pop = False  # 消去アニメーション待機中
+        self.pop_wait_time = 0.0  # 待機時間
+        self.pop_wait_duration = 1.0  # 消去後の待機時間（秒）
+        self.fall_animation_in_progress = False  # 落下アニメーション中
+    
+    def create_new_pair(self):
+        # ツモ表から次のペアの色を取り出す
+        color1, color2 = self.sequence.next_pair()
+        return PuyoPair(GRID_WIDTH // 2 - 1, self.grid, (PUYO_COLORS[color1 - 1], PUYO_COLORS[color2 - 1]))
+    
+    def add_puyos_to_grid(self, puyo1, puyo2):
+        if 0 <= puyo1.y < GRID_HEIGHT and 0 <= puyo1.x < GRID_WIDTH:
+            self.grid[puyo1.y][puyo1.x] = puyo1
+            puyo1.target_y = puyo1.y
+        if 0 <= puyo2.y < GRID_HEIGHT and 0 <= puyo2.x < GRID_WIDTH:
+            self.grid[puyo2.y][puyo2.x] = puyo2
+            puyo2.target_y = puyo2.y
+                
+        # 横に置いた場合、下が空いていれば落とす処理
+        self.handle_floating_puyos()
+    
+    def handle_floating_puyos(self):
+        # 横に置いて空中に浮いている状態のぷよを落とす
+        self.fall_puyos()
+    
+    def to_bitboard(self):
+        # 現在の盤面をヘッドレスエンジンのビットボードに変換する
+        return BitBoard.from_grid(self.grid, PUYO_COLORS)
+    
+    def pair_color_ids(self, pair):
+        # ペアの色をエンジンの色番号 (1〜) にする
+        return (PUYO_COLORS.index(pair.colors[0]) + 1, PUYO_COLORS.index(pair.colors[1]) + 1)
+    
+    def legal_placements(self):
+        # 現在のペアの最終的な置き場所 (列, 回転) の一覧
+        return generate_placements(self.to_bitboard().column_heights(), *self.pair_color_ids(self.current_pair))
+    
+    def check_game_over(self):
+        # 上部の行に固定されたぷよがあるかチェック
+        if self.grid[1][GRID_WIDTH // 2 - 1] is not None or self.grid[1][GRID_WIDTH // 2] is not None:
+            self.game_over = True
+            self.replay.score = self.score
+            if self.on_game_over is not None:
+                self.on_game_over(self.replay)
+            
+    def quick_drop(self):
+        # ちぎり機能（一番下まで落とす）
+        if not self.falling_puyos and not self.game_over and not self.fall_animation_in_progress:
+            self.current_pair.drop_to_bottom()
+                
+            # 落下アニメーションのための視覚的位置の更新
+            self.current_pair.puyo1.target_y = self.current_pair.puyo1.y
+            self.current_pair.puyo2.target_y = self.current_pair.puyo2.y
+            self.fall_animation_in_progress = True
+                
+            # 固定する
+            self.replay.add(self.current_pair.x, self.current_pair.rotation, self.frame)
+            self.add_puyos_to_grid(self.current_pair.puyo1, self.current_pair.puyo2)
+            # 連鎖チェック
+            if not self.check_matches():
+                self.current_pair = self.next_pair
+                self.next_pair = self.create_new_pair()
+                self.check_game_over()
+    
+    def check_matches(self):
+        # 盤面全体を一度にラベル付けして、4つ以上連結したぷよを探す
+        with self.profiler.scope("collision"):
+            labels, sizes = label_groups(grid_to_cells(self.grid, PUYO_COLORS))
+            groups = []
+            for indices in collect_groups(labels, sizes):
+                groups.append([self.grid[i // GRID_WIDTH][i % GRID_WIDTH] for i in indices])
+        
+        # 連鎖があればぷよを消して得点計算
+        if groups:
+            self.chain_count += 1
+            
+            # 連鎖ボイスなどの演出（表示側が設定する）
+            if self.on_chain is not None:
+                self.on_chain(self.chain_count)
+            
+            # ぷよを消す&エフェクトを追加（全連鎖共通のエフェクト、まとめて配列に入れる）
+            popped = [puyo for group in groups for puyo in group]
+            xs = np.array([puyo.x for puyo in popped])
+            ys = np.array([puyo.y for puyo in popped])
+            colors = np.array([PUYO_COLORS.index(puyo.color) for puyo in popped])
+            self.puyo_pop_state.add_many(len(popped), x=xs, y=ys, color=colors, chain=self.chain_count,
+                                         time=self.effect_duration, frame=0)
+            
+            # 星形エフェクトは連鎖数に応じて - 星の数だけ変える
+            if self.chain_count > 1:
+                star_count = min(1 + (self.chain_count - 1) // 2, 5)  # 最大5個まで
+                angles = np.arange(star_count) * 360 / star_count * 3.14159 / 180
+                self.pop_effects.add_many(
+                    len(popped) * star_count,
+                    x=(xs[:, None] + np.cos(angles) * 0.5).ravel(),
+                    y=(ys[:, None] + np.sin(angles) * 0.5).ravel(),
+                    color=np.repeat(colors, star_count),
+                    chain=self.chain_count,
+                    time=self.effect_duration,
+                    radius=0.5)  # マス単位
+            
+            # グリッドから削除
+            for puyo in popped:
+                self.grid[puyo.y][puyo.x] = None
+            
+            # 得点計算
+            self.score += calc_chain_score(self.chain_count, [len(group) for group in groups])
+            
+            # 消去アニメーション待機状態に移行
+            self.waiting_for_pop = True
+            self.pop_wait_time = 0.0
+            
+            return True
+        else:
+            self.chain_count = 0
+            return False
+    
+    def find_connected_puyos(self, x, y, color):
+        # (x, y) のぷよとつながっている同色のぷよを返す
+        if (y < 0 or y >= GRID_HEIGHT or x < 0 or x >= GRID_WIDTH or 
+                self.grid[y][x] is None or self.grid[y][x].color != color):
+            return []
+        
+        labels, _ = label_groups(grid_to_cells(self.grid, PUYO_COLORS))
+        label = labels[y * GRID_WIDTH + x]
+        return [self.grid[i // GRID_WIDTH][i % GRID_WIDTH] for i in range(len(labels)) if labels[i] == label]
+    
+    def fall_puyos(self):
+        # 論理的な落下処理（各列を一度で下まで詰める）
+        moves = compact_grid(self.grid)
+        for x, src_y, dst_y in moves:
+            # 論理的な位置を更新（visual_y は元の位置のままなので落下アニメーションになる）
+            puyo = self.grid[dst_y][x]
+            puyo.y = dst_y
+            puyo.target_y = dst_y  # 目標位置を設定
+        if moves:
+            self.fall_animation_in_progress = True  # アニメーション中フラグをセット
+        
+        # 動いたぷよの (x, 元の y, 移動先の y) を返す
+        return moves
+    
+    def handle_action(self, action, current_time=None):
+        # 操作を受け付ける（current_time を渡せば実時間を使わずにシミュレーションできる）
+        if action == Action.RESTART:
+            # ゲームオーバー時のリスタート
+            if self.game_over:
+                self.reset()
+            return
+        
+        if self.falling_puyos or self.game_over or self.waiting_for_pop or self.fall_animation_in_progress:
+            return
+        
+        # キー入力の制限時間を設ける
+        if current_time is None:
+            current_time = time.time()
+        if current_time - self.last_key_time < self.key_delay:
+            return
+        
+        # 回転に時間がかかるようにする
+        if current_time - self.last_rotation_time < self.rotation_delay and action in (Action.ROTATE_CW, Action.ROTATE_CCW):
+            return
+                
+        moved = False
+        if action == Action.LEFT:
+            moved = self.current_pair.move(-1, 0)
+        elif action == Action.RIGHT:
+            moved = self.current_pair.move(1, 0)
+        elif action == Action.DOWN:
+            moved = self.current_pair.move(0, 1)
+        elif action == Action.ROTATE_CW:
+            moved = self.current_pair.rotate(1)   # 時計回り
+            if moved:
+                self.last_rotation_time = current_time
+        elif action == Action.ROTATE_CCW:
+            moved = self.current_pair.rotate(-1)  # 反時計回り
+            if moved:
+                self.last_rotation_time = current_time
+        elif action == Action.DROP:  # ちぎり（強制落下）
+            self.quick_drop()
+            moved = True
+                
+        if moved:
+            self.last_key_time = current_time
+    
+    def update_animations(self, dt):
+        # ぷよの消去アニメーション更新（タイマーを一斉に減らし、進行度から先に計算したコマを引く）
+        if self.puyo_pop_state:
+            self.puyo_pop_state.tick(dt)
+            progress = 1.0 - self.puyo_pop_state.field("time") / self.effect_duration
+            self.puyo_pop_state.field("frame")[:] = pop_frame(progress)
+        
+        # エフェクトの更新
+        if self.pop_effects:
+            self.pop_effects.tick(dt)
+        
+        # 全てのぷよの視覚的な位置を更新
+        all_puyos_at_target = True
+        for y in range(GRID_HEIGHT):
+            for x in range(GRID_WIDTH):
+                if self.grid[y][x] is not None:
+                    self.grid[y][x].update(dt)
+                    if self.grid[y][x].visual_y < self.grid[y][x].target_y:
+                        all_puyos_at_target = False
+        
+        # 落下アニメーションの終了判定
+        if self.fall_animation_in_progress and all_puyos_at_target:
+            self.fall_animation_in_progress = False
+    
+    def update(self, dt):
+        if self.game_over:
+            return
+        self.frame += 1
+        
+        # アニメーションの更新
+        with self.profiler.scope("effects"):
+            self.update_animations(dt)
+        
+        # 消去アニメーション待機処理
+        if self.waiting_for_pop:
+            self.pop_wait_time += dt
+            if self.pop_wait_time >= self.pop_wait_duration:
+                self.waiting_for_pop = False
+                self.pop_wait_time = 0
+                self.falling_puyos = True
+            return
+        
+        # 落下アニメーション中は他の操作を止める
+        if self.fall_animation_in_progress:
+            return
+        
+        # 通常の落下処理
+        if self.falling_puyos:
+            if not self.fall_puyos():
+                self.falling_puyos = False
+                # 落下が終わったら再度連鎖をチェック
+                if not self.check_matches():
+                    # 連鎖がなければ新しいぷよペアを生成
+                    self.current_pair = self.next_pair
+                    self.next_pair = self.create_new_pair()
+                    self.check_game_over()
+            return
+        
+        self.fall_time += dt
+        if self.fall_time >= self.fall_speed:
+            self.fall_time = 0
+            if not self.current_pair.move(0, 1):
+                # 移動できなければ固定する
+                self.replay.add(self.current_pair.x, self.current_pair.rotation, self.frame)
+                self.add_puyos_to_grid(self.current_pair.puyo1, self.current_pair.puyo2)
+                # 連鎖チェック
+                if not self.check_matches():
+                    self.current_pair = self.next_pair
+                    self.next_pair = self.create_new_pair()
+                    self.check_game_over()
@@ -0,0 +1,221 @@
+# ぷよぷよのリプレイ（記録と再生）
+#
+# ツモはシードから決まるので、リプレイにはシードと「どこに置いたか」だけを残せばよい。
+# ファイル形式（リトルエンディアン）:
+#   ヘッダ    "PUYR" / バージョン u8 / フラグ u8 / シード u64 / 手数 u32 / 記録時の得点 u64
+#   置き場所  1手1バイト（列 << 2 | 回転）
+#   フレーム  FLAG_FRAMES が立っているときだけ、各手を置いたフレーム番号 u32 × 手数
+#
+# 再生はヘッドレスエンジン（BitBoard + resolve_chain）で行うので、アニメーション待ちなしで
+# CPU が回るだけ速く再計算できる。一定の手数ごとに盤面のスナップショットを残し、任意の手へシークできる。
+#
+# 使い方:
+#   python -m puyo_replay replays/*.puyr --workers 8   # 得点を再計算して記録と照合する
+
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from puyo_engine import BitBoard, PuyoSequence, resolve_chain
+
+MAGIC = b"PUYR"
+VERSION = 1
+FLAG_FRAMES = 0x01
+HEADER = struct.Struct("<4sBBQIQ")
+
+SNAPSHOT_INTERVAL = 32   # 何手ごとに盤面のスナップショットを残すか
+REPLAY_DIR = "replays"   # ゲームオーバー時にリプレイを保存するフォルダ
+REPLAY_SUFFIX = ".puyr"
+
+
+# 1ゲーム分のリプレイ
+class Replay:
+    def __init__(self, seed, placements=b"", frames=None, score=0):
+        self.seed = seed
+        self.placements = bytearray(placements)  # 1手1バイト（列 << 2 | 回転）
+        self.frames = None if frames is None else array("I", frames)  # 各手のフレーム番号（省略可）
+        self.score = score  # 記録したゲームの得点（照合用）
+
+    def __len__(self):
+        return len(self.placements)
+
+    def __eq__(self, other):
+        return (isinstance(other, Replay) and self.seed == other.seed and self.placements == other.placements
+                and self.frames == other.frames and self.score == other.score)
+
+    def __repr__(self):
+        return f"Replay(seed={self.seed}, moves={len(self.placements)}, score={self.score})"
+
+    def add(self, x, rotation, frame=None):
+        # 1手を記録する（frame を渡したらフレーム番号も残す）
+        self.placements.append(x << 2 | rotation)
+        if frame is not None:
+            if self.frames is None:
+                self.frames = array("I")
+            self.frames.append(frame)
+
+    def placement(self, index):
+        # index 手目の (列, 回転)
+        code = self.placements[index]
+        return code >> 2, code & 3
+
+    def to_bytes(self):
+        # フレーム番号は全手に揃っているときだけ書き出す
+        frames = self.frames if self.frames is not None and len(self.frames) == len(self.placements) else None
+        flags = FLAG_FRAMES if frames is not None else 0
+        header = HEADER.pack(MAGIC, VERSION, flags, self.seed, len(self.placements), self.score)
+        data = header + bytes(self.placements)
+        if frames is not None:
+            body = array("I", frames)
+            if sys.byteorder != "little":
+                body.byteswap()
+            data += body.tobytes()
+        return data
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ValueError("replay data is too short")
+        magic, version, flags, seed, count, score = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a puyo replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version: {version}")
+        offset = HEADER.size
+        placements = data[offset:offset + count]
+        if len(placements) != count:
+            raise ValueError("replay data is truncated")
+        frames = None
+        if flags & FLAG_FRAMES:
+            offset += count
+            frames = array("I")
+            frames.frombytes(data[offset:offset + count * frames.itemsize])
+            if len(frames) != count:
+                raise ValueError("replay data is truncated")
+            if sys.byteorder != "little":
+                frames.byteswap()
+        return cls(seed, placements, frames, score)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def save_replay(replay, directory=REPLAY_DIR):
+    # リプレイを日時とシード入りのファイル名で保存して、そのパスを返す
+    os.makedirs(directory, exist_ok=True)
+    name = time.strftime("%Y%m%d-%H%M%S") + f"-{replay.seed}{REPLAY_SUFFIX}"
+    path = os.path.join(directory, name)
+    replay.save(path)
+    return path
+
+
+# リプレイの再生（ヘッドレス）
+class ReplayPlayer:
+    def __init__(self, replay, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.replay = replay
+        self.sequence = PuyoSequence(replay.seed)
+        self.snapshot_interval = snapshot_interval
+        self.snapshots = {}  # 手数 → (盤面, 得点, 最大連鎖数, ゲームオーバー)
+        self.rewind()
+
+    def rewind(self):
+        self.board = BitBoard()
+        self.index = 0          # 次に置く手の番号
+        self.score = 0
+        self.max_chain = 0
+        self.game_over = False
+        self._snapshot()
+
+    def _snapshot(self):
+        if self.index % self.snapshot_interval == 0 and self.index not in self.snapshots:
+            self.snapshots[self.index] = (self.board.copy(), self.score, self.max_chain, self.game_over)
+
+    def done(self):
+        return self.game_over or self.index >= len(self.replay)
+
+    def step(self):
+        # 1手進めて、その手の連鎖結果を返す（置けない手はゲームオーバー扱い）
+        if self.done():
+            return None
+        x, rotation = self.replay.placement(self.index)
+        color1, color2 = self.sequence.pair_at(self.index)
+        self.index += 1
+        if not self.board.place_pair(x, rotation, color1, color2):
+            self.game_over = True
+            self._snapshot()
+            return None
+        result = resolve_chain(self.board)
+        self.board = result.board
+        self.score += result.score
+        if result.chain_count > self.max_chain:
+            self.max_chain = result.chain_count
+        self.game_over = self.board.is_game_over()
+        self._snapshot()
+        return result
+
+    def run(self):
+        # 最後まで再生する
+        while not self.done():
+            self.step()
+        return self
+
+    def seek(self, index):
+        # index 手置いた後の状態にする（手前のスナップショットから再計算する）
+        index = max(0, min(index, len(self.replay)))
+        start = max(i for i in self.snapshots if i <= index)
+        if not (start <= self.index <= index):
+            board, self.score, self.max_chain, self.game_over = self.snapshots[start]
+            self.board = board.copy()
+            self.index = start
+        while self.index < index and not self.game_over:
+            self.step()
+        return self
+
+
+def rescore(path):
+    # リプレイファイルを再生して (パス, 記録の得点, 再計算した得点, 最大連鎖数, 手数) を返す
+    replay = Replay.load(path)
+    player = ReplayPlayer(replay).run()
+    return path, replay.score, player.score, player.max_chain, player.index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ぷよぷよのリプレイを再生して得点を照合する")
+    parser.add_argument("paths", nargs="+", help="リプレイファイル")
+    parser.add_argument("--workers", type=int, default=0, help="プロセス数（0 はプールを使わない）")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.workers == 0:
+        results = map(rescore, args.paths)
+    else:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        results = executor.map(rescore, args.paths, chunksize=64)
+    mismatches = 0
+    moves = 0
+    for path, recorded, score, max_chain, count in results:
+        moves += count
+        if recorded != score:
+            mismatches += 1
+            print(f"{path}: recorded {recorded} != replayed {score} (max chain {max_chain}, moves {count})")
+    if args.workers != 0:
+        executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    print(f"replays: {len(args.paths)}  mismatches: {mismatches}")
+    print(f"elapsed: {elapsed:.2f}s  replays/sec: {len(args.paths) / elapsed:.1f}  moves/sec: {moves / elapsed:.0f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
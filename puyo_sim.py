@@ -0,0 +1,159 @@
+# ぷよぷよのヘッドレスシミュレーション
+#
+# ディスプレイも PyQt5 も使わず、PuyoGameLogic を固定のフレーム時間で回して N ゲーム遊ばせる。
+# 実時間は待たないので、CPU が回るだけ速くシミュレーションできる。
+#
+# 使い方:
+#   python -m puyo_sim --games 100 --policy random
+#   python -m puyo_sim --games 10 --policy ai
+#   python -m puyo_sim --games 1000 --policy script --record replays   # リプレイを保存する
+
+import argparse
+import random
+import time
+
+from puyo_ai import PuyoAI
+from puyo_engine import SEED_LIMIT, find_path
+from puyo_logic import Action, MOVE_ACTIONS, PuyoGameLogic
+from puyo_replay import save_replay
+
+FRAME_TIME = 1.0 / 60      # 1フレームのシミュレーション時間（秒）
+MAX_FRAMES = 60 * 60 * 30  # 1ゲームのフレーム数の上限（30分ぶん）
+MAX_RETRIES = 30           # 操作が通らないときに諦めるまでのフレーム数
+
+
+def is_busy(logic):
+    # 操作を受け付けない状態か
+    return (logic.game_over or logic.falling_puyos or logic.waiting_for_pop or
+            logic.fall_animation_in_progress)
+
+
+# 毎フレームランダムに操作する
+class RandomPolicy:
+    ACTIONS = (Action.LEFT, Action.RIGHT, Action.DOWN, Action.ROTATE_CW, Action.ROTATE_CCW, Action.DROP)
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def act(self, logic):
+        return self.rng.choice(self.ACTIONS)
+
+    def feedback(self, accepted):
+        pass
+
+
+# ペアごとに置き場所を決めて、そこまでの操作を順番に入力する
+class PlacementPolicy:
+    def __init__(self, choose):
+        self.choose = choose  # logic を受け取って (列, 回転) か None を返す関数
+        self.pair = None
+        self.actions = []
+        self.retries = 0
+
+    def act(self, logic):
+        if is_busy(logic):
+            return None
+        pair = logic.current_pair
+        if pair is not self.pair:
+            self.pair = pair
+            target = self.choose(logic)
+            path = None
+            if target is not None:
+                heights = logic.to_bitboard().column_heights()
+                path = find_path(heights, (pair.x, pair.rotation), target)
+            self.actions = [MOVE_ACTIONS[name] for name in (path or [])] + [Action.DROP]
+            self.retries = 0
+        return self.actions[0] if self.actions else None
+
+    def feedback(self, accepted):
+        if accepted:
+            self.actions.pop(0)
+            self.retries = 0
+        else:
+            self.retries += 1
+            if self.retries >= MAX_RETRIES:
+                self.actions = [Action.DROP]
+                self.retries = 0
+
+
+def make_policy(name, rng):
+    if name == "random":
+        return RandomPolicy(rng)
+    if name == "script":
+        # 置ける場所の中からランダムに選ぶ
+        def choose(logic):
+            placements = logic.legal_placements()
+            return rng.choice(placements) if placements else None
+        return PlacementPolicy(choose)
+    if name == "ai":
+        ai = PuyoAI(depth=2, time_budget=1.0, workers=0, seed=rng.random())
+
+        def choose(logic):
+            return ai.choose(logic.to_bitboard(), logic.pair_color_ids(logic.current_pair),
+                             logic.pair_color_ids(logic.next_pair))
+        return PlacementPolicy(choose)
+    raise ValueError(f"unknown policy: {name}")
+
+
+def advance(logic, action, now, frame_time=FRAME_TIME):
+    # action（None なら操作なし）を入力して 1 フレーム進める。操作が通ったかを返す
+    accepted = False
+    if action is not None:
+        last_key_time = logic.last_key_time
+        pair = logic.current_pair
+        logic.handle_action(action, now)
+        accepted = logic.last_key_time != last_key_time or logic.current_pair is not pair
+    logic.update(frame_time)
+    # 操作中のペアのアニメーション更新
+    if not logic.falling_puyos and not logic.game_over and not logic.waiting_for_pop:
+        logic.current_pair.update(frame_time)
+    return accepted
+
+
+def play_game(logic, policy, frame_time=FRAME_TIME, max_frames=MAX_FRAMES):
+    # 1ゲームをゲームオーバーまで遊ぶ。経過フレーム数を返す
+    now = 0.0
+    frames = 0
+    while not logic.game_over and frames < max_frames:
+        action = policy.act(logic)
+        accepted = advance(logic, action, now, frame_time)
+        if action is not None:
+            policy.feedback(accepted)
+        now += frame_time
+        frames += 1
+    return frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ぷよぷよのヘッドレスシミュレーション")
+    parser.add_argument("--games", type=int, default=100, help="遊ぶゲーム数")
+    parser.add_argument("--policy", choices=("random", "script", "ai"), default="random", help="操作の方針")
+    parser.add_argument("--seed", type=int, default=None, help="乱数とツモのシード")
+    parser.add_argument("--frame-time", type=float, default=FRAME_TIME, help="1フレームの時間（秒）")
+    parser.add_argument("--record", metavar="DIR", default=None, help="ゲームオーバーごとにリプレイを保存するフォルダ")
+    args = parser.parse_args(argv)
+    if args.seed is not None and not (0 <= args.seed and args.seed + args.games <= SEED_LIMIT):
+        # ゲームごとにずらしたシードもリプレイに u64 で書ける範囲に収める
+        parser.error("--seed must be in 0 <= seed and seed + games <= 2**64")
+
+    random.seed(args.seed)
+    rng = random.Random(args.seed)
+    scores = []
+    total_frames = 0
+    start = time.perf_counter()
+    for game in range(args.games):
+        # シード指定時はゲームごとにツモのシードをずらす（同じ引数なら毎回同じツモ）
+        logic = PuyoGameLogic(None if args.seed is None else args.seed + game)
+        if args.record is not None:
+            logic.on_game_over = lambda replay: save_replay(replay, args.record)
+        total_frames += play_game(logic, make_policy(args.policy, rng), args.frame_time)
+        scores.append(logic.score)
+    elapsed = time.perf_counter() - start
+
+    print(f"games: {args.games}  policy: {args.policy}")
+    print(f"elapsed: {elapsed:.2f}s  games/sec: {args.games / elapsed:.2f}  frames/sec: {total_frames / elapsed:.0f}")
+    print(f"score: mean {sum(scores) / len(scores):.1f}  max {max(scores)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# ブロック崩しのパーティクル（ParticleSystem）のテスト
+
+import numpy as np
+
+from brick_effects import ParticleSystem, PARTICLES_PER_BRICK
+
+
+def test_emit_sets_start_state():
+    particles = ParticleSystem(8, np.random.default_rng(0))
+    particles.emit(100, 50)
+    n = PARTICLES_PER_BRICK
+    assert len(particles) == n and len(particles.life) >= n  # 容量を超えたら増やす
+    assert (particles.pos[:n] == (100, 50)).all()
+    assert ((particles.vel[:n] >= -3) & (particles.vel[:n] <= 3)).all()
+    assert ((particles.life[:n] >= 20) & (particles.life[:n] <= 40)).all()
+
+
+def test_update_moves_and_compacts_expired():
+    particles = ParticleSystem(64, np.random.default_rng(1))
+    particles.emit(10, 20, 30)
+    particles.emit(300, 200, 30)
+    pos = particles.pos[:60].copy()
+    vel = particles.vel[:60].copy()
+    life = particles.life[:60].copy()
+    for steps in range(1, 45):
+        particles.update()
+        # 寿命が steps より長かったものだけが、元の順番のまま前に詰まって残る
+        alive = life > steps
+        n = len(particles)
+        assert n == alive.sum()
+        np.testing.assert_array_equal(particles.pos[:n], pos[alive] + vel[alive] * steps)
+        np.testing.assert_array_equal(particles.vel[:n], vel[alive])
+        np.testing.assert_array_equal(particles.life[:n], life[alive] - steps)
+    assert len(particles) == 0
+
+
+def test_emit_after_expiry_reuses_slots():
+    particles = ParticleSystem(PARTICLES_PER_BRICK, np.random.default_rng(2))
+    particles.emit(0, 0)
+    for _ in range(40):
+        particles.update()
+    assert len(particles) == 0
+    particles.emit(5, 5)
+    assert len(particles) == PARTICLES_PER_BRICK and len(particles.life) == PARTICLES_PER_BRICK
+    assert (particles.pos[:PARTICLES_PER_BRICK] == (5, 5)).all()
@@ -0,0 +1,106 @@
+# ブロック崩しの自動操作（予測版）と、それに合わせた物理の調整のテスト
+
+import numpy as np
+import pytest
+
+import brick_physics
+from brick_logic import (BrickGameLogic, WIDTH, HEIGHT, BALL_RADIUS, PADDLE_Y, PADDLE_WIDTH, MAX_SPEED,
+                         AIM_MARGIN, fold_x, predict_paddle_x)
+from brick_physics import Balls, BrickGrid, MIN_DRIFT_Y
+
+FAR_PADDLE = (0, HEIGHT * 10, 0, 0)  # 当たらない位置に置いたパドル
+
+
+def test_fold_x_matches_stepping_between_walls():
+    # 1フレームずつ動かして左右の壁で跳ね返したときの x と、反射を無視して進めた x を畳んだ値が一致する
+    rng = np.random.default_rng(0)
+    r = BALL_RADIUS
+    for _ in range(200):
+        x0 = rng.uniform(r, WIDTH - r)
+        vx = rng.uniform(-40, 40)
+        x, v = x0, vx
+        for t in range(1, 200):
+            x += v
+            if x < r:
+                x, v = 2 * r - x, -v
+            elif x > WIDTH - r:
+                x, v = 2 * (WIDTH - r) - x, -v
+            assert fold_x(x0 + vx * t) == pytest.approx(x, abs=1e-6)
+
+
+def landing_x(logic):
+    # Balls.step で実際に動かして、ボールの中心が PADDLE_Y - r に届いたときの x を返す
+    balls = logic.balls
+    hit_y = PADDLE_Y - balls.radius
+    while True:
+        y, vy = balls.pos[0, 1], balls.vel[0, 1]
+        if vy > 0 and y + vy >= hit_y:
+            balls.step(logic.bricks, FAR_PADDLE, WIDTH, HEIGHT, MAX_SPEED, (hit_y - y) / vy)
+            assert balls.pos[0, 1] == pytest.approx(hit_y)
+            return float(balls.pos[0, 0])
+        balls.step(logic.bricks, FAR_PADDLE, WIDTH, HEIGHT, MAX_SPEED)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_predict_paddle_x_finds_landing_point(seed):
+    # ブロックがなければ狙いのずらしはなく、パドルの中心（画面内に収まる範囲）は実際に降りてきた x になる
+    rng = np.random.default_rng(seed)
+    logic = BrickGameLogic(seed)
+    logic.bricks.alive[:] = False
+    logic.bricks.count = 0
+    for _ in range(100):
+        logic.balls.clear()
+        vy = rng.uniform(1, MAX_SPEED) * rng.choice((-1, 1))
+        logic.balls.add(rng.uniform(BALL_RADIUS, WIDTH - BALL_RADIUS), rng.uniform(BALL_RADIUS, PADDLE_Y - 50),
+                        rng.uniform(0.5, 2 * MAX_SPEED) * rng.choice((-1, 1)), vy)
+        predicted = predict_paddle_x(logic)
+        expected = landing_x(logic)
+        assert predicted == pytest.approx(np.clip(expected, PADDLE_WIDTH / 2, WIDTH - PADDLE_WIDTH / 2), abs=1e-6)
+
+
+def test_predict_paddle_x_keeps_ball_on_paddle():
+    # ブロックがあるときは狙いでずらすが、降りてくる x はパドルの上（端から AIM_MARGIN の内側）にある
+    rng = np.random.default_rng(3)
+    for seed in range(50):
+        logic = BrickGameLogic(seed)
+        logic.balls.clear()
+        logic.balls.add(rng.uniform(BALL_RADIUS, WIDTH - BALL_RADIUS), rng.uniform(250, PADDLE_Y - 50),
+                        rng.uniform(0.5, MAX_SPEED) * rng.choice((-1, 1)), rng.uniform(1, MAX_SPEED))
+        center = predict_paddle_x(logic)
+        land = landing_x(logic)
+        assert abs(land - center) <= AIM_MARGIN * PADDLE_WIDTH / 2 + 1e-6
+
+
+@pytest.fixture(params=["small", "many"])
+def balls_path(request, monkeypatch):
+    # ボールが少ないときの1個ずつの計算と配列演算の計算の両方で確かめる
+    if request.param == "many":
+        monkeypatch.setattr(brick_physics, "SMALL_BALLS", -1)
+    return request.param
+
+
+def empty_bricks():
+    bricks = BrickGrid(1, 1, 0, 0, 10, 10, 0)
+    bricks.remove(0, 0)
+    return bricks
+
+
+def test_flat_balls_get_vertical_drift(balls_path):
+    # 縦速度がほぼ 0 のボールは向きを保ったまま MIN_DRIFT_Y まで縦に速める（0 は下向き）
+    balls = Balls(BALL_RADIUS, 8, np.random.default_rng(0))
+    for vy in (0.0, 0.2, -0.2, MIN_DRIFT_Y, -1.0):
+        balls.add(400, 300, 3.0, vy)
+    balls.step(empty_bricks(), FAR_PADDLE, WIDTH, HEIGHT)
+    assert balls.vel[:5, 1].tolist() == [MIN_DRIFT_Y, MIN_DRIFT_Y, -MIN_DRIFT_Y, MIN_DRIFT_Y, -1.0]
+    assert balls.vel[:5, 0].tolist() == [3.0] * 5
+
+
+@pytest.mark.parametrize("vy, expected", [(1.0, -4.0), (4.0, -4.0), (5.5, -5.5)])
+def test_paddle_return_has_min_vertical_speed(balls_path, vy, expected):
+    # パドルで打ち返したボールの縦の速さは min_speed_y 以上、それより速ければそのまま
+    balls = Balls(BALL_RADIUS, 8, np.random.default_rng(0))
+    paddle = (350, PADDLE_Y, PADDLE_WIDTH, 15)
+    balls.add(420, PADDLE_Y - BALL_RADIUS - vy / 2, 2.0, vy)
+    balls.step(empty_bricks(), paddle, WIDTH, HEIGHT, MAX_SPEED, 1.0, 4.0)
+    assert balls.vel[0, 1] == expected
+    assert balls.vel[0, 0] == pytest.approx((420 - 400) / (PADDLE_WIDTH / 2) * MAX_SPEED, abs=1.0)
@@ -0,0 +1,108 @@
+# ブロック崩しの当たり判定のテスト
+
+import math
+
+import numpy as np
+import pytest
+
+import brick_physics
+from brick_logic import BrickGameLogic, predict_paddle_x
+from brick_physics import sweep_rect, sweep_rect_one
+
+
+RECT = (100.0, 100.0, 170.0, 120.0)  # left, top, right, bottom
+RADIUS = 10.0
+
+
+def random_sweeps(rng, n):
+    # 矩形のまわりから動き出す円（速度の片方が 0 のものも混ぜる）
+    x = rng.uniform(40, 230, n)
+    y = rng.uniform(40, 180, n)
+    vx = np.where(rng.random(n) < 0.1, 0.0, rng.uniform(-40, 40, n))
+    vy = np.where(rng.random(n) < 0.1, 0.0, rng.uniform(-40, 40, n))
+    return x, y, vx, vy
+
+
+def distance_to_rect(x, y):
+    left, top, right, bottom = RECT
+    return math.hypot(x - min(max(x, left), right), y - min(max(y, top), bottom))
+
+
+def test_sweep_rect_matches_scalar_version():
+    rng = np.random.default_rng(0)
+    x, y, vx, vy = random_sweeps(rng, 20000)
+    t, nx, ny = sweep_rect(x, y, vx, vy, RADIUS, *RECT, 1.0)
+    for i in range(len(x)):
+        one = sweep_rect_one(float(x[i]), float(y[i]), float(vx[i]), float(vy[i]), RADIUS, *RECT, 1.0)
+        if one is None:
+            assert t[i] == np.inf
+        else:
+            assert (t[i], nx[i], ny[i]) == pytest.approx(one, abs=1e-9)
+
+
+def test_sweep_rect_finds_first_contact():
+    # 細かく刻んで動かしたときに初めて矩形に触れる時刻と一致する（最初から重なっている円は除く）
+    rng = np.random.default_rng(1)
+    x, y, vx, vy = random_sweeps(rng, 2000)
+    t, nx, ny = sweep_rect(x, y, vx, vy, RADIUS, *RECT, 1.0)
+    steps = np.linspace(0.0, 1.0, 2001)
+    for i in range(len(x)):
+        if distance_to_rect(x[i], y[i]) <= RADIUS:
+            continue
+        touching = [s for s in steps if distance_to_rect(x[i] + vx[i] * s, y[i] + vy[i] * s) <= RADIUS]
+        if not touching:
+            assert t[i] == np.inf
+            continue
+        assert t[i] <= touching[0] + 1e-9
+        assert t[i] >= touching[0] - 1.0 / 2000 - 1e-9
+        # 法線は単位ベクトルで、当たった面から外向き（進む向きと逆）
+        assert math.hypot(nx[i], ny[i]) == pytest.approx(1.0)
+        assert nx[i] * vx[i] + ny[i] * vy[i] < 0
+
+
+def play_frames(seed, frames):
+    # 1フレームごとの (ボールの位置, 速度, 残りブロック, 得点) を記録する
+    logic = BrickGameLogic(seed)
+    history = []
+    for _ in range(frames):
+        logic.step(predict_paddle_x(logic))
+        n = len(logic.balls)
+        history.append((logic.balls.pos[:n].copy(), logic.balls.vel[:n].copy(),
+                        logic.bricks.alive.copy(), logic.score))
+        if logic.game_over:
+            break
+    return history
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_small_path_matches_array_path(monkeypatch, seed):
+    # ボールが少ないときの1個ずつの計算と、配列演算の計算が同じ結果になる（パワーアップで分裂した後も含む）
+    small = play_frames(seed, 3000)
+    monkeypatch.setattr(brick_physics, "SMALL_BALLS", -1)
+    many = play_frames(seed, 3000)
+    assert len(small) == len(many)
+    for (pos1, vel1, alive1, score1), (pos2, vel2, alive2, score2) in zip(small, many):
+        np.testing.assert_allclose(pos1, pos2, atol=1e-9)
+        np.testing.assert_allclose(vel1, vel2, atol=1e-9)
+        assert np.array_equal(alive1, alive2)
+        assert score1 == score2
+
+
+def test_balls_never_end_inside_bricks():
+    # 速いボールが何百個あっても、フレームの終わりにブロックへめり込んだままのボールはない
+    logic = BrickGameLogic(0)
+    balls = logic.balls
+    rng = np.random.default_rng(2)
+    for _ in range(300):
+        angle = rng.uniform(0, 2 * np.pi)
+        balls.add(rng.uniform(20, 780), rng.uniform(200, 500), 45 * np.cos(angle), 45 * np.sin(angle))
+    bricks = logic.bricks
+    for _ in range(50):
+        balls.step(bricks, logic.paddle_rect(), 800, 600)
+        n = len(balls)
+        for row, col in bricks.alive_cells():
+            left, top, width, height = bricks.cell_rect(row, col)
+            cx = np.clip(balls.pos[:n, 0], left, left + width)
+            cy = np.clip(balls.pos[:n, 1], top, top + height)
+            distance = np.hypot(balls.pos[:n, 0] - cx, balls.pos[:n, 1] - cy)
+            assert np.all(distance >= balls.radius - 1e-6)
@@ -0,0 +1,79 @@
+# フレーム時間のプロファイラのテスト
+
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from frame_profiler import FrameProfiler, ScopeStats, HISTORY, STAT_FIELDS
+
+
+def test_ring_buffer_keeps_last_history_samples():
+    stats = ScopeStats()
+    stats.add(1000.0)  # 最初の1回だけ遅い
+    samples = np.arange(HISTORY + 50) % 7 + 1.0
+    for ms in samples:
+        stats.add(float(ms))
+    summary = stats.summary()
+    # 表示用の統計は直近 HISTORY 回だけ、max_all_ms は起動してからの最大
+    assert summary["count"] == HISTORY + 51
+    assert stats.index == 51 % HISTORY
+    assert sorted(stats.window()) == sorted(samples[-HISTORY:])
+    assert summary["max_ms"] == 7.0
+    assert summary["max_all_ms"] == 1000.0
+    assert summary["mean_ms"] == pytest.approx(samples[-HISTORY:].mean())
+    assert summary["p50_ms"] == pytest.approx(np.percentile(samples[-HISTORY:], 50))
+
+
+def test_partial_window_and_empty():
+    stats = ScopeStats(history=10)
+    assert stats.summary() == dict.fromkeys(STAT_FIELDS, 0)
+    for ms in (3.0, 1.0, 2.0):
+        stats.add(ms)
+    summary = stats.summary()
+    assert (summary["count"], summary["p50_ms"], summary["max_ms"], summary["max_all_ms"]) == (3, 2.0, 3.0, 3.0)
+
+
+def make_profiler():
+    profiler = FrameProfiler(history=8)
+    for ms in (1.0, 2.0, 3.0):
+        profiler.scope("logic").add(ms)
+    for ms in (5.0, 0.5):
+        profiler.scope("render").add(ms)
+    with profiler.scope("input"):
+        pass
+    return profiler
+
+
+def test_dump_json(tmp_path):
+    profiler = make_profiler()
+    path = tmp_path / "profile.json"
+    profiler.dump(str(path))
+    data = json.loads(path.read_text())
+    assert data["history"] == 8
+    assert list(data["scopes"]) == ["logic", "render", "input"]  # 最初に使った順
+    assert data["scopes"] == profiler.stats()
+    assert data["scopes"]["logic"]["max_ms"] == 3.0
+
+
+def test_dump_csv(tmp_path):
+    profiler = make_profiler()
+    path = tmp_path / "profile.CSV"  # 拡張子の大文字小文字は問わない
+    profiler.dump(str(path))
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["scope", *STAT_FIELDS]
+    stats = profiler.stats()
+    assert [row[0] for row in rows[1:]] == list(stats)
+    for row in rows[1:]:
+        assert [float(value) for value in row[1:]] == pytest.approx([stats[row[0]][field] for field in STAT_FIELDS])
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = FrameProfiler(enabled=False)
+    with profiler.scope("logic"):
+        pass
+    profiler.tick()
+    profiler.tick()
+    assert profiler.stats() == {}
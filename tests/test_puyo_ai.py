@@ -0,0 +1,58 @@
+# AI の探索と置換表のテスト
+
+import random
+
+from puyo_ai import PuyoAI, TranspositionTable, cached_resolve_chain
+from puyo_engine import BitBoard, SPAWN_X, generate_placements, resolve_chain
+from tests.test_puyo_engine import settled_rows
+
+
+def test_choose_returns_reachable_placement():
+    ai = PuyoAI(depth=2, samples=2, time_budget=0.2, workers=0, seed=0)
+    rng = random.Random(1)
+    for _ in range(5):
+        board = BitBoard.from_rows(settled_rows(rng))
+        placements = generate_placements(board.column_heights(), 1, 2)
+        target = ai.choose(board, (1, 2), (3, 4))
+        if not placements:
+            assert target is None
+            continue
+        assert tuple(target) in placements
+        assert ai.plan_moves(board, (SPAWN_X, 0), target)[-1] == "drop"
+
+
+def test_process_pool_matches_in_process_search():
+    # 時間切れにならなければ、プロセスプールでも同じシードなら同じ手を選ぶ
+    rng = random.Random(2)
+    boards = [BitBoard.from_rows(settled_rows(rng)) for _ in range(3)]
+    local = PuyoAI(depth=2, samples=1, time_budget=10.0, workers=0, seed=3)
+    pool = PuyoAI(depth=2, samples=1, time_budget=10.0, workers=2, seed=3)
+    try:
+        for board in boards:
+            assert pool.choose(board, (1, 2), (2, 3)) == local.choose(board, (1, 2), (2, 3))
+        assert pool.table_stats()
+    finally:
+        pool.shutdown()
+
+
+def test_table_evicts_least_recently_used():
+    table = TranspositionTable(capacity=2)
+    table.put(1, "a")
+    table.put(2, "b")
+    assert table.get(1) == "a"  # 1 を使ったので、次に追い出されるのは 2
+    table.put(3, "c")
+    assert table.get(2) is None
+    assert (table.get(1), table.get(3)) == ("a", "c")
+    assert table.stats() == {"size": 2, "capacity": 2, "hits": 3, "misses": 1, "evictions": 1}
+
+
+def test_cached_resolve_chain_matches_resolve_chain():
+    # 同じ盤面は置換表から返り、結果は毎回計算したものと同じ
+    rng = random.Random(0)
+    table = TranspositionTable()
+    boards = [BitBoard.from_rows(settled_rows(rng)) for _ in range(100)]
+    for board in boards + boards:
+        cached = cached_resolve_chain(board, table)
+        result = resolve_chain(board)
+        assert (cached.chain_count, cached.score, cached.board) == (result.chain_count, result.score, result.board)
+    assert table.hits >= len(boards)
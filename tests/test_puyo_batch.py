@@ -0,0 +1,41 @@
+# バッチシミュレータのテスト（1盤面ずつのビットボード版と同じ結果になるか）
+
+import random
+
+import numpy as np
+
+from puyo_batch import PuyoBatch
+from puyo_engine import BitBoard, GRID_WIDTH, NUM_COLORS, resolve_chain
+from tests.test_puyo_engine import random_rows, settled_rows
+
+
+def test_resolve_chains_matches_bitboard():
+    rng = random.Random(0)
+    boards = [BitBoard.from_rows(random_rows(rng)) for _ in range(100)]
+    boards += [BitBoard.from_rows(settled_rows(rng)) for _ in range(100)]
+    batch = PuyoBatch.from_bitboards(boards)
+    chains, scores = batch.resolve_chains()
+    for i, board in enumerate(boards):
+        result = resolve_chain(board)
+        assert (chains[i], scores[i]) == (result.chain_count, result.score)
+        assert batch.to_bitboard(i) == result.board
+
+
+def test_place_pairs_matches_bitboard():
+    # 置けない手（列の外・積み上がった列）も含めて、置けたかどうかと盤面が一致する
+    rng = np.random.default_rng(1)
+    size = 200
+    boards = [BitBoard.from_rows(settled_rows(random.Random(i))) for i in range(size)]
+    batch = PuyoBatch.from_bitboards(boards)
+    for _ in range(5):
+        x = rng.integers(-1, GRID_WIDTH + 1, size)
+        rotation = rng.integers(0, 4, size)
+        color1 = rng.integers(1, NUM_COLORS + 1, size)
+        color2 = rng.integers(1, NUM_COLORS + 1, size)
+        placed = batch.place_pairs(x, rotation, color1, color2)
+        batch.resolve_chains()
+        for i, board in enumerate(boards):
+            ok = board.place_pair(int(x[i]), int(rotation[i]), int(color1[i]), int(color2[i]))
+            assert placed[i] == ok
+            boards[i] = resolve_chain(board).board
+            assert batch.to_bitboard(i) == boards[i]
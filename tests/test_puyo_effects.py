@@ -0,0 +1,73 @@
+# エフェクトの入れ物（EffectPool）のテスト
+
+import numpy as np
+import pytest
+
+from puyo_effects import EffectPool, STAR_DTYPE
+
+
+def make_pool(count, capacity):
+    # x に通し番号、ほかのフィールドにも番号から決まる値を入れておき、消した後も組が崩れていないか見る
+    pool = EffectPool(STAR_DTYPE, capacity)
+    ids = np.arange(count)
+    pool.add_many(count, x=ids, y=ids * 0.5, color=ids % 5, chain=ids + 1, time=ids + 1.0, radius=ids * 0.25)
+    return pool
+
+
+def check_records(pool, expected_ids):
+    ids = pool.field("x")
+    assert sorted(ids.tolist()) == sorted(expected_ids)
+    np.testing.assert_array_equal(pool.field("y"), ids * 0.5)
+    np.testing.assert_array_equal(pool.field("color"), ids % 5)
+    np.testing.assert_array_equal(pool.field("chain"), ids + 1)
+    np.testing.assert_array_equal(pool.field("time"), ids + 1.0)
+    np.testing.assert_array_equal(pool.field("radius"), ids * 0.25)
+
+
+@pytest.mark.parametrize("indices", [
+    [9],                 # 末尾だけ
+    [0],                 # 先頭（末尾の要素で埋まる）
+    [0, 9],
+    [7, 8, 9],           # 末尾の生きている要素がなくなる
+    [2, 5, 8, 9],
+    [9, 3, 3, 0, 9],     # 順不同・重複あり
+    list(range(10)),     # 全部
+])
+def test_swap_remove_keeps_surviving_records(indices):
+    pool = make_pool(10, 16)
+    pool.swap_remove(np.array(indices))
+    check_records(pool, [i for i in range(10) if i not in indices])
+
+
+def test_random_swap_removes_match_a_list():
+    rng = np.random.default_rng(0)
+    pool = make_pool(100, 100)
+    alive = list(range(100))
+    while alive:
+        picked = rng.integers(0, len(pool), rng.integers(1, 6))
+        removed = set(pool.field("x")[picked].tolist())
+        pool.swap_remove(picked)
+        alive = [i for i in alive if i not in removed]
+        check_records(pool, alive)
+
+
+def test_tick_removes_expired():
+    pool = make_pool(10, 16)
+    pool.tick(3.0)  # time が 1〜3 の要素（番号 0〜2）が時間切れになる
+    ids = pool.field("x")
+    assert sorted(ids.tolist()) == list(range(3, 10))
+    np.testing.assert_array_equal(pool.field("time"), ids - 2.0)
+
+
+def test_add_many_grows_past_capacity():
+    pool = make_pool(10, 16)
+    assert pool.capacity == 16
+    pool.add_many(6, x=np.arange(10, 16), y=np.arange(10, 16) * 0.5, color=np.arange(10, 16) % 5,
+                  chain=np.arange(11, 17), time=np.arange(11, 17, dtype=float), radius=np.arange(10, 16) * 0.25)
+    assert pool.capacity == 16  # ちょうど埋まるまでは増やさない
+    check_records(pool, list(range(16)))
+    pool.add_many(1, x=16, y=8.0, color=1, chain=17, time=17.0, radius=4.0)
+    assert pool.capacity == 32  # 溢れたら倍にして、中身はそのまま
+    check_records(pool, list(range(17)))
+    pool.add_many(100, x=0)
+    assert pool.capacity == 117 and len(pool) == 117  # 倍でも足りなければ必要な数まで
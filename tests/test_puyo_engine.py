@@ -0,0 +1,279 @@
+# ヘッドレスエンジン（ビットボード）のテスト
+#
+# 連鎖の計算は、元の puyo.py と同じ手順（1段ずつの落下・連結探索・同じ得点式）で書いた
+# 参照実装と、乱数で作った盤面で突き合わせる。
+
+import random
+
+import pytest
+
+from benchmark import CHAIN_ROWS
+from puyo_engine import (BitBoard, GRID_WIDTH, GRID_HEIGHT, NUM_COLORS, EMPTY, calc_chain_score,
+                         label_groups, collect_groups, compact_grid, resolve_chain,
+                         SPAWN_X, generate_placements, find_path)
+from puyo_logic import Puyo, PuyoPair, PuyoGameLogic, PUYO_COLORS
+
+
+def random_rows(rng, fill=0.6):
+    # 浮いたぷよもある盤面（最上段の2段は空けておく）
+    return [[EMPTY if y < 2 or rng.random() > fill else rng.randint(1, NUM_COLORS) for _ in range(GRID_WIDTH)]
+            for y in range(GRID_HEIGHT)]
+
+
+def settled_rows(rng):
+    # 列ごとに下から詰めた盤面
+    rows = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    for x in range(GRID_WIDTH):
+        for y in range(GRID_HEIGHT - rng.randint(0, GRID_HEIGHT), GRID_HEIGHT):
+            rows[y][x] = rng.randint(1, NUM_COLORS)
+    return rows
+
+
+def reference_fall(rows):
+    # 元の puyo.py と同じく、動かなくなるまで1段ずつ落とす
+    moved = True
+    while moved:
+        moved = False
+        for y in range(GRID_HEIGHT - 2, -1, -1):
+            for x in range(GRID_WIDTH):
+                if rows[y][x] != EMPTY and rows[y + 1][x] == EMPTY:
+                    rows[y + 1][x], rows[y][x] = rows[y][x], EMPTY
+                    moved = True
+
+
+def reference_groups(rows):
+    # 4つ以上つながったグループを [(x, y), ...] のリストで返す（左上から見つかった順）
+    checked = set()
+    groups = []
+    for y in range(GRID_HEIGHT):
+        for x in range(GRID_WIDTH):
+            if rows[y][x] == EMPTY or (x, y) in checked:
+                continue
+            group = []
+            stack = [(x, y)]
+            checked.add((x, y))
+            while stack:
+                cx, cy = stack.pop()
+                group.append((cx, cy))
+                for dx, dy in ((0, -1), (1, 0), (0, 1), (-1, 0)):
+                    nx, ny = cx + dx, cy + dy
+                    if (0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and (nx, ny) not in checked
+                            and rows[ny][nx] == rows[y][x]):
+                        checked.add((nx, ny))
+                        stack.append((nx, ny))
+            if len(group) >= 4:
+                groups.append(group)
+    return groups
+
+
+def reference_resolve(rows):
+    # 元の puyo.py と同じ手順で連鎖を最後まで進める。(連鎖数, 得点, 最後の盤面) を返す
+    rows = [row[:] for row in rows]
+    chain = 0
+    score = 0
+    while True:
+        reference_fall(rows)
+        groups = reference_groups(rows)
+        if not groups:
+            return chain, score, rows
+        chain += 1
+        total_cleared = sum(len(group) for group in groups)
+        chain_power = min(999, chain * 2)
+        group_bonus = min(999, len(groups) - 1)
+        connection_bonus = sum(min(999, len(group) - 4) for group in groups)
+        score += 10 * total_cleared * max(1, chain_power + group_bonus + connection_bonus)
+        for group in groups:
+            for x, y in group:
+                rows[y][x] = EMPTY
+
+
+def load_grid(logic, rows):
+    logic.grid = [[None if color == EMPTY else Puyo(x, y, PUYO_COLORS[color - 1]) for x, color in enumerate(row)]
+                  for y, row in enumerate(rows)]
+
+
+def grid_rows(grid):
+    return [[EMPTY if puyo is None else PUYO_COLORS.index(puyo.color) + 1 for puyo in row] for row in grid]
+
+
+def test_rows_round_trip():
+    rng = random.Random(0)
+    for _ in range(50):
+        rows = random_rows(rng)
+        board = BitBoard.from_rows(rows)
+        assert board.to_rows() == rows
+        assert board.count() == sum(color != EMPTY for row in rows for color in row)
+        for y, row in enumerate(rows):
+            for x, color in enumerate(row):
+                assert board.get(x, y) == color
+
+
+def test_bitboard_steps_match_reference():
+    # fall_puyos / check_matches / pop_groups を順に呼んで連鎖を進めても、参照実装と同じになる
+    rng = random.Random(1)
+    for _ in range(200):
+        rows = random_rows(rng)
+        chain, score, final = reference_resolve(rows)
+        board = BitBoard.from_rows(rows)
+        chains = 0
+        total = 0
+        while True:
+            board.fall_puyos()
+            groups = board.check_matches()
+            if not groups:
+                break
+            chains += 1
+            total += calc_chain_score(chains, [mask.bit_count() for _, mask in groups])
+            board.pop_groups(groups)
+        assert (chains, total) == (chain, score)
+        assert board.to_rows() == final
+        assert board.column_heights() == [sum(row[x] != EMPTY for row in final) for x in range(GRID_WIDTH)]
+
+
+def test_label_groups_matches_reference():
+    rng = random.Random(2)
+    for _ in range(300):
+        rows = random_rows(rng, fill=rng.choice((0.4, 0.7, 1.0)))
+        cells = [color for row in rows for color in row]
+        labels, sizes = label_groups(cells)
+        # 空マスだけラベルなし、同じラベルのマスは同じ色、sizes はラベルごとのマス数
+        assert all((label < 0) == (color == EMPTY) for label, color in zip(labels, cells))
+        assert sizes == [labels.count(label) for label in range(len(sizes))]
+        groups = collect_groups(labels, sizes)
+        for group in groups:
+            assert len({cells[i] for i in group}) == 1
+        expected = [sorted(y * GRID_WIDTH + x for x, y in group) for group in reference_groups(rows)]
+        assert [sorted(group) for group in groups] == expected
+
+
+def test_compact_grid_matches_reference():
+    rng = random.Random(3)
+    for _ in range(300):
+        rows = random_rows(rng)
+        expected = [row[:] for row in rows]
+        reference_fall(expected)
+        # マスには (元の x, 元の y) を入れておき、返ってきた移動の記録と突き合わせる
+        grid = [[None if color == EMPTY else (x, y) for x, color in enumerate(row)] for y, row in enumerate(rows)]
+        moves = compact_grid(grid)
+        assert [[EMPTY if cell is None else rows[cell[1]][cell[0]] for cell in row] for row in grid] == expected
+        moved = [(cell, dst) for dst, row in enumerate(grid) for cell in row if cell is not None and cell[1] != dst]
+        assert len(moves) == len(moved)
+        for x, y, dst in moves:
+            assert grid[dst][x] == (x, y)
+
+
+def test_game_logic_matches_reference():
+    # 表示側が使う PuyoGameLogic の check_matches / fall_puyos でも同じ結果になる
+    rng = random.Random(4)
+    logic = PuyoGameLogic(0)
+    for _ in range(100):
+        rows = random_rows(rng)
+        chain, score, final = reference_resolve(rows)
+        load_grid(logic, rows)
+        logic.score = 0
+        logic.chain_count = 0
+        logic.fall_puyos()
+        chains = 0
+        while logic.check_matches():
+            chains = logic.chain_count
+            logic.fall_puyos()
+        assert (chains, logic.score) == (chain, score)
+        assert grid_rows(logic.grid) == final
+        for y, row in enumerate(logic.grid):
+            for x, puyo in enumerate(row):
+                assert puyo is None or (puyo.x, puyo.y) == (x, y)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_resolve_chain_matches_reference(seed):
+    rng = random.Random(seed)
+    for rows in [random_rows(rng) for _ in range(20)] + [settled_rows(rng) for _ in range(20)]:
+        chain, score, final = reference_resolve(rows)
+        board = BitBoard.from_rows(rows)
+        result = resolve_chain(board)
+        assert (result.chain_count, result.score) == (chain, score)
+        assert result.board.to_rows() == final
+        assert len(result.step_scores) == len(result.steps) == chain
+        assert board == BitBoard.from_rows(rows)  # 引数の盤面は変えない
+
+
+def test_chain_board_clears_in_16():
+    result = resolve_chain(BitBoard.from_rows(CHAIN_ROWS))
+    assert result.chain_count == 16
+    assert result.board.count() == 0
+    assert (result.chain_count, result.score) == reference_resolve(CHAIN_ROWS)[:2]
+
+
+def reference_placements(rows):
+    # PuyoPair.can_move / can_rotate だけを使って、出現位置から最上段で左右移動と回転でたどれる (列, 回転)
+    grid = [[None if color == EMPTY else Puyo(x, y, PUYO_COLORS[color - 1]) for x, color in enumerate(row)]
+            for y, row in enumerate(rows)]
+    pair = PuyoPair(SPAWN_X, grid)
+
+    def valid(x, rotation):
+        pair.x, pair.y, pair.rotation = x, 0, rotation
+        if rotation in (0, 2):
+            return pair.can_move(x, 0)
+        return pair.can_rotate()
+
+    start = (SPAWN_X, 0)
+    if not valid(*start):
+        return set()
+    seen = {start}
+    queue = [start]
+    for x, rotation in queue:
+        for state in ((x - 1, rotation), (x + 1, rotation), (x, (rotation + 1) % 4), (x, (rotation - 1) % 4)):
+            if state not in seen and valid(*state):
+                seen.add(state)
+                queue.append(state)
+    return seen
+
+
+def test_generate_placements_matches_pair_moves():
+    rng = random.Random(2)
+    boards = [settled_rows(rng) for _ in range(300)]
+    # 列の上が埋まって左右に動けない盤面も入れる
+    for x in range(GRID_WIDTH):
+        rows = [[EMPTY] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+        for y in range(GRID_HEIGHT):
+            rows[y][x] = 1 + y % NUM_COLORS
+        boards.append(rows)
+    for rows in boards:
+        heights = BitBoard.from_rows(rows).column_heights()
+        expected = reference_placements(rows)
+        assert set(generate_placements(heights)) == expected
+        for target in expected:
+            assert find_path(heights, (SPAWN_X, 0), target) is not None
+
+
+def test_same_color_placements_are_deduplicated():
+    # 2色が同じペアでは、同じ盤面になる置き方を1つにまとめる
+    heights = [0] * GRID_WIDTH
+    boards = set()
+    for x, rotation in generate_placements(heights, 1, 1):
+        board = BitBoard()
+        assert board.place_pair(x, rotation, 1, 1)
+        boards.add(board.zobrist)
+    all_boards = set()
+    for x, rotation in generate_placements(heights):
+        board = BitBoard()
+        board.place_pair(x, rotation, 1, 1)
+        all_boards.add(board.zobrist)
+    assert len(boards) == len(generate_placements(heights, 1, 1)) == len(all_boards)
+
+
+def test_zobrist_is_updated_incrementally():
+    # 置く・消す・落とすたびに差分で更新したハッシュが、盤面から計算し直した値と一致する
+    rng = random.Random(1)
+    for _ in range(50):
+        board = BitBoard.from_rows(settled_rows(rng))
+        for _ in range(10):
+            heights = board.column_heights()
+            placements = generate_placements(heights)
+            if not placements:
+                break
+            x, rotation = rng.choice(placements)
+            if not board.place_pair(x, rotation, rng.randint(1, NUM_COLORS), rng.randint(1, NUM_COLORS)):
+                break
+            board = resolve_chain(board).board
+            assert board.zobrist == BitBoard(board.colors).zobrist
@@ -0,0 +1,83 @@
+# ベクトル化環境（VecEnv）のテスト
+
+from functools import partial
+
+import numpy as np
+import pytest
+
+from vec_env import BrickEnv, PuyoEnv, VecEnv
+
+STEPS = 60
+
+
+def puyo_actions(rng, count):
+    return rng.integers(-1, PuyoEnv.action_count, count)
+
+
+def brick_actions(rng, count):
+    actions = rng.uniform(0, 800, count)
+    actions[rng.random(count) < 0.3] = np.nan  # 動かさない
+    return actions
+
+
+def run(make_env, actions, count, workers):
+    # 同じ行動列で STEPS 回進めて、各 step の結果を返す
+    env = VecEnv(make_env, count, seed=5, workers=workers)
+    try:
+        history = [env.reset()]
+        rng = np.random.default_rng(0)
+        for _ in range(STEPS):
+            history.append(env.step(actions(rng, count)))
+        return history
+    finally:
+        env.close()
+
+
+# max_frames を小さくして、STEPS の間に何度か自動で reset させる
+@pytest.mark.parametrize("make_env, actions", [
+    (partial(PuyoEnv, frame_skip=4, max_frames=40), puyo_actions),
+    (partial(BrickEnv, max_frames=25), brick_actions),
+])
+def test_workers_match_in_process(make_env, actions):
+    count = 5
+    local = run(make_env, actions, count, 0)
+    pooled = run(make_env, actions, count, 2)
+    np.testing.assert_array_equal(local[0], pooled[0])
+    resets = 0
+    for (obs1, rewards1, dones1, infos1), (obs2, rewards2, dones2, infos2) in zip(local[1:], pooled[1:]):
+        np.testing.assert_array_equal(obs1, obs2)
+        np.testing.assert_array_equal(rewards1, rewards2)
+        np.testing.assert_array_equal(dones1, dones2)
+        for done, info1, info2 in zip(dones1, infos1, infos2):
+            assert info1["score"] == info2["score"]
+            # 終わったゲームだけ最後の観測が入る
+            assert ("terminal_observation" in info1) == ("terminal_observation" in info2) == bool(done)
+            if done:
+                np.testing.assert_array_equal(info1["terminal_observation"], info2["terminal_observation"])
+        resets += dones1.sum()
+    assert resets >= count
+
+
+def test_done_returns_reset_observation():
+    # 終わった環境の観測は reset 後のもので、終了時の観測は info に残る
+    env = VecEnv(partial(BrickEnv, max_frames=3), 2, seed=0)
+    first = env.reset()
+    for _ in range(2):
+        obs, rewards, dones, infos = env.step(np.full(2, np.nan))
+        assert not dones.any()
+    obs, rewards, dones, infos = env.step(np.full(2, np.nan))
+    assert dones.all()
+    # ボールは毎回同じ位置から出るので、reset 後の観測は最初の観測と同じで、終了時の観測は3フレーム分進んでいる
+    np.testing.assert_array_equal(obs, first)
+    for i in range(2):
+        terminal = infos[i]["terminal_observation"]
+        assert terminal.shape == BrickEnv.observation_shape
+        np.testing.assert_array_equal(terminal[2:4], first[i][2:4] + 3 * first[i][4:6])
+    env.close()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.parametrize("count", [0, -1])
+def test_rejects_empty(count, workers):
+    with pytest.raises(ValueError):
+        VecEnv(PuyoEnv, count, workers=workers)
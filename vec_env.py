@@ -0,0 +1,199 @@
+# 学習用のベクトル化環境（gym 風の reset() / step(actions)）
+#
+# PuyoEnv / BrickEnv が 1 ゲーム分の環境で、VecEnv がそれを N 個まとめて step ごとに一斉に進める。
+# 観測は NumPy 配列で返し、描画は一切しない（pygame も PyQt5 も読み込まない）。
+#   ぷよぷよ:     (12, 6) の uint8 の盤面（0 は空、1〜4 は色番号。操作中のペアも書き込む）
+#   ブロック崩し: float32 のベクトル [パドル中心x, ボール数, ボール OBS_BALLS 個分の (x, y, vx, vy), ブロックの有無 行×列]
+# 終わったゲームはその場で reset し、最後の観測は info["terminal_observation"] に入れる。
+# workers を指定すると環境をサブプロセスに分けて持ち、各プロセスが自分の担当分を並列に進める。
+#
+# 使い方:
+#   env = VecEnv(PuyoEnv, 64, seed=0, workers=4)
+#   obs = env.reset()
+#   obs, rewards, dones, infos = env.step(actions)
+#   env.close()
+
+import multiprocessing
+import random
+import numpy as np
+
+from brick_logic import BrickGameLogic, BRICK_ROWS, BRICK_COLUMNS, PADDLE_WIDTH
+from puyo_engine import GRID_WIDTH, GRID_HEIGHT
+from puyo_logic import Action, PuyoGameLogic, PUYO_COLORS
+from puyo_sim import FRAME_TIME, advance, is_busy
+
+OBS_BALLS = 4  # ブロック崩しの観測に入れるボールの数（足りない分は 0 で埋める）
+
+PUYO_ACTIONS = (Action.LEFT, Action.RIGHT, Action.DOWN, Action.ROTATE_CW, Action.ROTATE_CCW, Action.DROP)
+
+
+# ぷよぷよ 1 ゲーム分の環境
+# 行動は PUYO_ACTIONS の番号（負の数は何もしない）。1 step で frame_skip フレーム進み、報酬は得点の増分
+class PuyoEnv:
+    observation_shape = (GRID_HEIGHT, GRID_WIDTH)
+    observation_dtype = np.uint8
+    action_count = len(PUYO_ACTIONS)
+
+    def __init__(self, seed=None, frame_time=FRAME_TIME, frame_skip=1, max_frames=60 * 60 * 30):
+        self.rng = random.Random(seed)  # ゲームごとのツモのシードを決める
+        self.frame_time = frame_time
+        self.frame_skip = frame_skip
+        self.max_frames = max_frames
+        self.logic = None
+
+    def reset(self):
+        self.logic = PuyoGameLogic(self.rng.getrandbits(32))
+        self.now = 0.0
+        self.frames = 0
+        return self.observation()
+
+    def observation(self):
+        obs = np.zeros(self.observation_shape, dtype=self.observation_dtype)
+        logic = self.logic
+        for y, row in enumerate(logic.grid):
+            for x, puyo in enumerate(row):
+                if puyo is not None:
+                    obs[y, x] = PUYO_COLORS.index(puyo.color) + 1
+        if not is_busy(logic):
+            for puyo in (logic.current_pair.puyo1, logic.current_pair.puyo2):
+                if 0 <= puyo.y < GRID_HEIGHT and 0 <= puyo.x < GRID_WIDTH:
+                    obs[puyo.y, puyo.x] = PUYO_COLORS.index(puyo.color) + 1
+        return obs
+
+    def step(self, action):
+        logic = self.logic
+        score = logic.score
+        action = PUYO_ACTIONS[action] if action >= 0 else None
+        for _ in range(self.frame_skip):
+            advance(logic, action, self.now, self.frame_time)
+            action = None  # 操作は最初のフレームだけ
+            self.now += self.frame_time
+            self.frames += 1
+            if logic.game_over:
+                break
+        done = logic.game_over or self.frames >= self.max_frames
+        info = {"score": logic.score, "next_pair": logic.pair_color_ids(logic.next_pair)}
+        return self.observation(), float(logic.score - score), done, info
+
+
+# ブロック崩し 1 ゲーム分の環境
+# 行動はパドルの中心を合わせる x 座標（NaN なら動かさない）。1 step で dt フレーム進み、報酬は得点の増分
+class BrickEnv:
+    observation_shape = (2 + OBS_BALLS * 4 + BRICK_ROWS * BRICK_COLUMNS,)
+    observation_dtype = np.float32
+
+    def __init__(self, seed=None, dt=1.0, max_frames=60 * 60 * 10):
+        self.seed_rng = np.random.default_rng(seed)  # ゲームごとのシードを決める
+        self.dt = dt
+        self.max_frames = max_frames
+        self.logic = None
+
+    def reset(self):
+        self.logic = BrickGameLogic(int(self.seed_rng.integers(2 ** 32)), self.dt)
+        return self.observation()
+
+    def observation(self):
+        logic = self.logic
+        obs = np.zeros(self.observation_shape, dtype=self.observation_dtype)
+        n = len(logic.balls)
+        obs[0] = logic.paddle_x + PADDLE_WIDTH / 2
+        obs[1] = n
+        m = min(n, OBS_BALLS)
+        balls = obs[2:2 + OBS_BALLS * 4].reshape(OBS_BALLS, 4)
+        balls[:m, :2] = logic.balls.pos[:m]
+        balls[:m, 2:] = logic.balls.vel[:m]
+        obs[2 + OBS_BALLS * 4:] = logic.bricks.alive.ravel()
+        return obs
+
+    def step(self, action):
+        logic = self.logic
+        score = logic.score
+        logic.step(None if np.isnan(action) else float(action))
+        done = logic.game_over or logic.frame >= self.max_frames
+        info = {"score": logic.score, "clear_frames": list(logic.clear_frames)}
+        return self.observation(), float(logic.score - score), done, info
+
+
+def _step_envs(envs, actions):
+    # 環境をそれぞれ 1 step 進める（終わったものは reset する）
+    results = []
+    for env, action in zip(envs, actions):
+        obs, reward, done, info = env.step(action)
+        if done:
+            info["terminal_observation"] = obs
+            obs = env.reset()
+        results.append((obs, reward, done, info))
+    return results
+
+
+def _worker(conn, make_env, seeds):
+    # サブプロセス側: 担当の環境を持ち、親からの命令を処理し続ける
+    envs = [make_env(seed) for seed in seeds]
+    try:
+        while True:
+            command, data = conn.recv()
+            if command == "reset":
+                conn.send([env.reset() for env in envs])
+            elif command == "step":
+                conn.send(_step_envs(envs, data))
+            elif command == "close":
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+
+# N 個の環境をまとめて進める
+class VecEnv:
+    def __init__(self, make_env, count, seed=None, workers=0):
+        # make_env は seed を受け取って環境を作る関数（workers を使うときは pickle できるもの）
+        if count < 1:
+            raise ValueError(f"count must be at least 1: {count}")
+        seeds = [None if seed is None else seed + i for i in range(count)]
+        self.count = count
+        self.envs = []
+        self.processes = []
+        self.connections = []
+        if workers == 0:
+            self.envs = [make_env(s) for s in seeds]
+            return
+        # 環境を workers 個のプロセスにほぼ均等に分ける
+        bounds = np.linspace(0, count, min(workers, count) + 1).astype(int)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child, make_env, seeds[start:end]), daemon=True)
+            process.start()
+            child.close()
+            self.processes.append(process)
+            self.connections.append((parent, start, end))
+
+    def __len__(self):
+        return self.count
+
+    def reset(self):
+        if self.envs:
+            return np.stack([env.reset() for env in self.envs])
+        for parent, _, _ in self.connections:
+            parent.send(("reset", None))
+        return np.stack([obs for parent, _, _ in self.connections for obs in parent.recv()])
+
+    def step(self, actions):
+        # 行動（長さ N）を入力して (観測, 報酬, 終了, info のリスト) を返す
+        if self.envs:
+            results = _step_envs(self.envs, actions)
+        else:
+            for parent, start, end in self.connections:
+                parent.send(("step", list(actions[start:end])))
+            results = [result for parent, _, _ in self.connections for result in parent.recv()]
+        obs, rewards, dones, infos = zip(*results)
+        return np.stack(obs), np.array(rewards), np.array(dones), list(infos)
+
+    def close(self):
+        for parent, _, _ in self.connections:
+            parent.send(("close", None))
+            parent.close()
+        for process in self.processes:
+            process.join()
+        self.connections = []
+        self.processes = []